@@ -0,0 +1,101 @@
+"""Recall@k versus latency of the IVF-flat index against exact search.
+
+The corpus is synthetic but clustered, like embeddings of pages about a
+handful of topics: points are drawn around `--topics` random centers.
+Queries are perturbed corpus points. For every `n_probe` the table shows
+recall@k against `FlatIndex` and query latency percentiles, to pick
+parameters before enabling the index on a large cache.
+
+    python benchmarks/bench_ann.py --size 1000000 --dimension 384 --probes 1 4 16 64
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from common import print_table, summarize
+
+
+def _corpus(size: int, dimension: int, topics: int, noise: float, rng) -> np.ndarray:
+    centers = rng.standard_normal((topics, dimension), dtype=np.float32)
+    corpus = np.empty((size, dimension), dtype=np.float32)
+    for start in range(0, size, 100_000):
+        count = min(100_000, size - start)
+        labels = rng.integers(0, topics, count)
+        corpus[start : start + count] = centers[labels]
+        corpus[start : start + count] += noise * rng.standard_normal((count, dimension), dtype=np.float32)
+    return corpus
+
+
+def _latencies(index, queries, k) -> tuple[list, list[float]]:
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        ids, _ = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(set(ids.tolist()))
+    return results, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=1.0)
+    parser.add_argument("--lists", type=int, default=None)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    from index import FlatIndex, IVFFlatIndex
+
+    rng = np.random.default_rng(0)
+    corpus = _corpus(args.size, args.dimension, args.topics, args.noise, rng)
+    picks = rng.integers(0, args.size, args.queries)
+    queries = corpus[picks] + args.noise * rng.standard_normal(
+        (args.queries, args.dimension), dtype=np.float32
+    )
+    ids = np.arange(args.size)
+
+    exact = FlatIndex(args.dimension)
+    exact.add(ids, corpus)
+    truth, exact_latencies = _latencies(exact, queries, args.k)
+
+    start = time.perf_counter()
+    ivf = IVFFlatIndex(args.dimension, n_lists=args.lists, train_size=args.size)
+    ivf.add(ids, corpus)
+    build = time.perf_counter() - start
+    n_lists = len(ivf._lists)
+
+    exact_stats = summarize(exact_latencies)
+    rows = [["exact", "-", 1.0, exact_stats["p50"], exact_stats["p95"], 1.0]]
+    for n_probe in args.probes:
+        if n_probe > n_lists:
+            continue
+        ivf.n_probe = n_probe
+        results, latencies = _latencies(ivf, queries, args.k)
+        recall = sum(len(a & b) for a, b in zip(results, truth)) / (args.k * len(truth))
+        stats = summarize(latencies)
+        rows.append(
+            [
+                "ivf",
+                n_probe,
+                recall,
+                stats["p50"],
+                stats["p95"],
+                exact_stats["p50"] / stats["p50"],
+            ]
+        )
+
+    print(
+        f"{args.size} chunks x {args.dimension} dims, {n_lists} lists, "
+        f"built in {build:.1f}s, recall@{args.k} over {args.queries} queries\n"
+    )
+    print_table(["index", "n_probe", "recall", "p50 ms", "p95 ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Runs the orchestrator end to end against local stand-in services.
+
+No network access or API keys are needed: search, the pages, embeddings and
+the LLM are served by `standins.py` with configurable latencies. Two flows
+are measured, one query at a time or `--concurrency` at once:
+
+* retriever: `Retriever.get_context` (Google API, `ScraperLocal`,
+  `NativeSplitter`, `OpenAIEmbeddings`) followed by a streamed answer from
+  `HuggingFaceClient.astream`.
+* main: `main.extract_texts_from_search_results` (Serper, threaded
+  extraction) followed by `main.interact_with_llm_huggingface_streaming`.
+
+Reports p50/p95/p99 latency per stage and queries per second per flow,
+followed by the histograms of the spans recorded by `util.tracing` (each
+page fetch, parse, split, embedding request, ...). `--trace` also writes
+every span to a JSON lines file.
+
+    python benchmarks/bench_e2e.py --queries 50 --concurrency 4 --page-latency 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import time
+
+from common import print_table, summarize
+from standins import Latency, StandInConfig, StandIns
+
+QUERIES = [
+    "cuándo podar manzanos",
+    "inflación del último mes",
+    "historia de buenos aires",
+    "cómo dividir textos largos",
+    "riego de frutales en verano",
+]
+
+
+def queries(count: int) -> list[str]:
+    return [f"{QUERIES[i % len(QUERIES)]} {i}" for i in range(count)]
+
+
+def configure(services: StandIns) -> None:
+    """Points every client at the stand-ins. Runs before the clients are imported."""
+
+    os.environ["OPENAI_API_BASE"] = services.openai_api_base
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["SERPER_API_URL"] = services.serper_url
+    os.environ["SERPER_API_KEY"] = "benchmark"
+    os.environ["HUGGING_FACE_API_URL"] = services.llm_url
+    os.environ["HUGGING_FACE_API_KEY"] = "benchmark"
+
+
+async def run_retriever(services: StandIns, args) -> tuple[dict[str, list[float]], float]:
+    from llm import HuggingFaceClient
+    from retrieval import Retriever
+    from retrieval.embeddings import OpenAIEmbeddings
+    from retrieval.scraper import ScraperLocal
+    from retrieval.search import GoogleAPI, GoogleConfig
+    from retrieval.splitter import NativeSplitter
+
+    config = GoogleConfig(
+        api_url=services.google_url,
+        api_key="benchmark",
+        cx="benchmark",
+        fields="items",
+        accept_encoding="gzip",
+        user_agent="benchmark",
+    )
+    retriever = Retriever(
+        GoogleAPI(config=config),
+        ScraperLocal(streaming=True),
+        OpenAIEmbeddings(),
+        NativeSplitter(args.chunk_size, args.overlap),
+        pipelined=args.pipelined,
+    )
+    llm = HuggingFaceClient(services.llm_url, "benchmark")
+    stages: dict[str, list[float]] = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def turn(query: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            searched = start
+            context = ""
+            async for event in retriever.get_context(query, k=args.k, deadline=args.deadline):
+                if event["event"] == "search":
+                    searched = time.perf_counter()
+                elif event["event"] == "context":
+                    context = event["data"]
+            retrieved = time.perf_counter()
+
+            stream = await llm.astream(f"Información extraída:\n{context}\n\nPregunta del usuario: {query}")
+            async for _ in stream:
+                pass
+            done = time.perf_counter()
+
+        record(stages, "search", searched - start)
+        record(stages, "scrape+embed", retrieved - searched)
+        record(stages, "llm first token", stream.stats.time_to_first_token or 0.0)
+        record(stages, "llm", done - retrieved)
+        record(stages, "total", done - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(query) for query in queries(args.queries)))
+    elapsed = time.perf_counter() - start
+    await retriever.aclose()
+    return stages, elapsed
+
+
+def run_main(services: StandIns, args) -> tuple[dict[str, list[float]], float]:
+    from concurrent.futures import ThreadPoolExecutor
+
+    import main
+
+    stages: dict[str, list[float]] = {}
+
+    def turn(query: str) -> None:
+        start = time.perf_counter()
+        texts = main.extract_texts_from_search_results(query, streaming=True)
+        extracted = time.perf_counter()
+        main.interact_with_llm_huggingface_streaming(query, texts)
+        done = time.perf_counter()
+        record(stages, "search+extract", extracted - start)
+        record(stages, "llm", done - extracted)
+        record(stages, "total", done - start)
+
+    start = time.perf_counter()
+    # main prints its progress; keep it out of the report. sys.stdout is
+    # process-wide, so it is redirected once here rather than per worker.
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(args.concurrency) as executor:
+        list(executor.map(turn, queries(args.queries)))
+    return stages, time.perf_counter() - start
+
+
+def record(stages: dict[str, list[float]], stage: str, seconds: float) -> None:
+    stages.setdefault(stage, []).append(seconds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--flows", nargs="+", default=["retriever", "main"], choices=["retriever", "main"])
+    parser.add_argument("--results", type=int, default=5, help="links per search")
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--page-latency", type=float, default=0.1)
+    parser.add_argument("--page-jitter", type=float, default=0.05)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--first-token", type=float, default=0.2)
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    parser.add_argument("--tokens", type=int, default=40)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--deadline", type=float, default=None)
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--trace", help="JSON lines file for the spans of every turn")
+    args = parser.parse_args()
+
+    from util.tracing import tracer
+
+    tracer.jsonl_path = args.trace
+
+    logging.getLogger("orchestrator").setLevel(logging.ERROR)
+    config = StandInConfig(
+        results=args.results,
+        dimension=args.dimension,
+        search=Latency(args.search_latency, args.search_latency / 5),
+        page=Latency(args.page_latency, args.page_jitter),
+        embedding=Latency(args.embedding_latency, args.embedding_latency / 5),
+        first_token=Latency(args.first_token, args.first_token / 4),
+        token_interval=args.token_interval,
+        tokens=args.tokens,
+    )
+
+    with StandIns(config) as services:
+        configure(services)
+        rows, throughput = [], []
+        for flow in args.flows:
+            if flow == "retriever":
+                stages, elapsed = asyncio.run(run_retriever(services, args))
+            else:
+                stages, elapsed = run_main(services, args)
+            for stage, values in stages.items():
+                stats = summarize(values)
+                rows.append([flow, stage] + [stats[q] * 1000 for q in ("p50", "p95", "p99", "mean")])
+            throughput.append([flow, args.queries, elapsed, args.queries / elapsed])
+
+    print(
+        f"{args.queries} queries, concurrency {args.concurrency}, {args.results} links per search, "
+        f"page latency {args.page_latency}s, {args.tokens} tokens per answer\n"
+    )
+    print_table(["flow", "stage", "p50 ms", "p95 ms", "p99 ms", "mean ms"], rows)
+    print()
+    print_table(["flow", "queries", "seconds", "queries/s"], throughput)
+    print()
+    spans = [
+        [name, stats["count"]] + [stats[q] * 1000 for q in ("p50", "p95", "p99", "mean")]
+        for name, stats in tracer.snapshot().items()
+    ]
+    print_table(["span", "count", "p50 ms", "p95 ms", "p99 ms", "mean ms"], spans)
+    print(f"\nrequests served: {services.requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compares the HTML to text engines over the recorded HTML fixtures.
+
+Reports throughput (pages/s), peak memory and how close each engine's
+output is to the BeautifulSoup reference.
+
+    python benchmarks/bench_html_engines.py --repeat 200
+"""
+
+import argparse
+import difflib
+import multiprocessing
+import resource
+import time
+import tracemalloc
+
+from common import load_fixtures, print_table
+
+REFERENCE = "beautifulsoup"
+
+
+def _run(name: str, pages: list[str], repeat: int) -> dict:
+    from extraction.engines import get_engine
+
+    engine = get_engine(name)
+    for html in pages:  # warm up imports and caches before measuring memory
+        engine.article_text(html)
+        engine.text(html)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            engine.article_text(html)
+            engine.text(html)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # tracemalloc slows pure Python parsers down, so it gets its own pass
+    tracemalloc.start()
+    for html in pages:
+        engine.article_text(html)
+        engine.text(html)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "pages_per_second": repeat * len(pages) / elapsed,
+        "python_peak_kb": python_peak / 1024,
+        "rss_growth_kb": rss_after - rss_before,
+    }
+
+
+def _measure(name: str, pages: list[str], repeat: int) -> dict:
+    """Runs one engine in a fresh interpreter so memory figures do not mix."""
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(_run, (name, pages, repeat))
+
+
+def _similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    from extraction.engines import available_engines, get_engine
+
+    fixtures = load_fixtures()
+    pages = list(fixtures.values())
+    reference = get_engine(REFERENCE)
+
+    rows = []
+    for name in available_engines():
+        engine = get_engine(name)
+        article_equal = text_equal = 0
+        similarity = []
+        for html in pages:
+            article_equal += engine.article_text(html) == reference.article_text(html)
+            text_equal += engine.text(html) == reference.text(html)
+            similarity.append(_similarity(engine.text(html), reference.text(html)))
+
+        stats = _measure(name, pages, args.repeat)
+        rows.append(
+            [
+                name,
+                stats["pages_per_second"],
+                stats["python_peak_kb"],
+                stats["rss_growth_kb"],
+                f"{article_equal}/{len(pages)}",
+                f"{text_equal}/{len(pages)}",
+                min(similarity),
+            ]
+        )
+
+    print(f"{len(pages)} fixtures x {args.repeat} repetitions\n")
+    print_table(
+        [
+            "engine",
+            "pages/s",
+            "py peak KB",
+            "RSS growth KB",
+            "article ==",
+            "text ==",
+            "min similarity",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
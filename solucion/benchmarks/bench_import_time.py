@@ -0,0 +1,61 @@
+"""Measures the cold import time of the orchestrator packages.
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+the best of `--repeat` runs is kept and the slowest dependencies it pulled
+in are listed, leaving out what the interpreter loads at startup.
+
+    python benchmarks/bench_import_time.py --repeat 5 retrieval main
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+from common import ROOT, print_table
+
+ORCHESTRATOR = ROOT / "src" / "orchestrator"
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module loaded by `module`."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ORCHESTRATOR,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=["retrieval"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    startup = import_times("sys")
+    for module in args.modules:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda times: times[module])
+        print(f"\n{module}: {best[module] / 1000:.1f} ms (best of {args.repeat})\n")
+        slowest = sorted(
+            (name for name in best if "." not in name and name not in startup and name != module),
+            key=best.get,
+            reverse=True,
+        )[: args.top]
+        print_table(["dependency", "ms"], [[name, best[name] / 1000] for name in slowest])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Measures how much logging stalls the asyncio event loop.
+
+A monitor task sleeps `--interval` seconds in a loop and records how late it
+wakes up, while `--producers` tasks log `--messages` records each. The
+records go to a stream that takes `--write-latency` seconds per write, like
+a slow terminal, a full pipe or a busy disk.
+
+* direct: the handler formats and writes on the event loop.
+* queued: `setup_logging` moves the handler behind a `QueueHandler`; the
+  writes happen on the listener thread. "drain" is the time left to write
+  the queued records once the producers finish.
+
+    python benchmarks/bench_log_stall.py --messages 200 --write-latency 0.001 --json
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import time
+
+from common import print_table, summarize
+
+LOGGER = "bench.stall"
+
+
+class SlowStream(io.TextIOBase):
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        time.sleep(self.latency)
+        self.writes += 1
+        return len(text)
+
+
+async def run(logger: logging.Logger, args) -> tuple[list[float], float]:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def monitor() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(args.interval)
+            lags.append(time.perf_counter() - start - args.interval)
+
+    async def produce(producer: int) -> None:
+        for message in range(args.messages):
+            logger.info("producer %d message %d: %s", producer, message, {"chunks": message})
+            await asyncio.sleep(0)
+
+    watcher = asyncio.create_task(monitor())
+    await asyncio.sleep(args.interval)
+    start = time.perf_counter()
+    await asyncio.gather(*(produce(i) for i in range(args.producers)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await watcher
+    return lags, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--write-latency", type=float, default=0.001)
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("--json", action="store_true", help="format records as JSON")
+    args = parser.parse_args()
+
+    from util.logger import JsonFormatter, setup_logging, shutdown_logging
+
+    rows = []
+    for mode in ("direct", "queued"):
+        stream = SlowStream(args.write_latency)
+        handler = logging.StreamHandler(stream)
+        if args.json:
+            handler.setFormatter(JsonFormatter())
+        logger = logging.getLogger(LOGGER)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+        if mode == "queued":
+            config = {
+                "version": 1,
+                "disable_existing_loggers": False,
+                "handlers": {"slow": {"()": lambda: handler}},
+                "loggers": {LOGGER: {"handlers": ["slow"], "level": "INFO", "propagate": False}},
+            }
+            setup_logging(config, json_output=args.json)
+        else:
+            logger.handlers = [handler]
+
+        lags, elapsed = asyncio.run(run(logger, args))
+        drain_start = time.perf_counter()
+        shutdown_logging()
+        drain = time.perf_counter() - drain_start if mode == "queued" else 0.0
+        logger.handlers = []
+
+        messages = args.producers * args.messages
+        assert stream.writes == messages, (mode, stream.writes)
+        stats = summarize(lags)
+        rows.append(
+            [mode, messages, elapsed, messages / elapsed]
+            + [stats[q] * 1000 for q in ("p50", "p95", "p99")]
+            + [max(lags) * 1000, drain]
+        )
+
+    print(
+        f"{args.producers} producers x {args.messages} messages, "
+        f"{args.write_latency * 1000:g} ms per write, monitor every {args.interval * 1000:g} ms\n"
+    )
+    print_table(
+        ["mode", "messages", "seconds", "messages/s", "lag p50 ms", "lag p95 ms", "lag p99 ms", "lag max ms", "drain s"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Compares top-k cosine similarity engines over random embeddings.
+
+* pandas: the previous `get_most_similar`, one sklearn call per row.
+* vectorized: the current `Retriever.get_most_similar`, from Python lists.
+* matrix: `util.similarity` on an already stacked float32 matrix, the cost
+  of a lookup in `VectorCache`.
+
+The pandas engine is only run up to `--pandas-max` chunks; past that it
+takes minutes. 10^6 chunks of 1536 dimensions need about 6 GB as float32,
+so the default dimension is smaller.
+
+    python benchmarks/bench_similarity.py --sizes 100 1000 10000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import cosine_similarity
+
+from common import ROOT, print_table
+
+
+def _pandas_most_similar(query_vector, data, k):
+    query_vector = np.array(query_vector).reshape(1, -1)
+
+    def compute_cosine_similarity(row):
+        return cosine_similarity(query_vector, row)[0][0]
+
+    df = pd.DataFrame(data)
+    df["vector"] = df["vector"].apply(lambda x: np.array(x).reshape(1, -1))
+    df["similarity"] = df["vector"].apply(compute_cosine_similarity)
+    similar = df.nlargest(k, "similarity")[["text", "url", "vector", "similarity"]]
+    similar["vector"] = similar["vector"].apply(lambda x: x[0].tolist())
+    return [row["text"] for row in similar.to_dict("records")]
+
+
+def _time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pandas-max", type=int, default=10_000)
+    parser.add_argument("--lists-max", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # The retriever is built from the test fakes; only get_most_similar is timed
+    sys.path.insert(0, str(ROOT))
+    from tests.fakes import fake_retriever
+    from util import similarity
+
+    retriever = fake_retriever()
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal(args.dimension).tolist()
+
+    rows = []
+    for size in args.sizes:
+        matrix = rng.standard_normal((size, args.dimension), dtype=np.float32)
+        normalized = similarity.normalize(matrix)
+
+        def matrix_top_k():
+            scores = similarity.cosine_scores(query, normalized, normalized=True)
+            return similarity.top_k(scores, args.k)
+
+        matrix_time = _time(matrix_top_k, args.repeat)
+        expected = set(matrix_top_k().tolist())
+
+        lists_time = pandas_time = None
+        if size <= args.lists_max:
+            data = [
+                {"text": str(i), "url": "", "vector": vector}
+                for i, vector in enumerate(matrix.tolist())
+            ]
+
+            def vectorized():
+                return asyncio.run(retriever.get_most_similar(query, data, args.k))
+
+            lists_time = _time(vectorized, args.repeat)
+            assert {int(doc.text) for doc in vectorized()} == expected
+
+            if size <= args.pandas_max:
+                pandas_time = _time(lambda: _pandas_most_similar(query, data, args.k), 1)
+                top = _pandas_most_similar(query, data, args.k)
+                assert {int(text) for text in top} == expected
+
+        rows.append(
+            [
+                size,
+                pandas_time * 1000 if pandas_time else "-",
+                lists_time * 1000 if lists_time else "-",
+                matrix_time * 1000,
+                pandas_time / lists_time if pandas_time else "-",
+                pandas_time / matrix_time if pandas_time else "-",
+            ]
+        )
+
+    print(f"dimension {args.dimension}, k={args.k}, best of {args.repeat}\n")
+    print_table(
+        [
+            "chunks",
+            "pandas ms",
+            "vectorized ms",
+            "matrix ms",
+            "speedup lists",
+            "speedup matrix",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
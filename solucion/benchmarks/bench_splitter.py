@@ -0,0 +1,99 @@
+"""Compares the text splitters over the text of the recorded HTML fixtures.
+
+* langchain per call: the previous `LangChainSplitter`, which built a new
+  `RecursiveCharacterTextSplitter` on every page.
+* langchain: `LangChainSplitter`, with the splitter built once.
+* native: `NativeSplitter`.
+
+Lengths are measured in characters, in tokens (`count_tokens`) and in
+tokens memoized with `cached_count_tokens`. Within a row every splitter gets
+the same length function, and the memo is cleared before each timed run.
+Every engine must produce the same chunks as LangChain.
+
+    python benchmarks/bench_splitter.py --repeat 50 --chunk-size 500 --overlap 50
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from common import load_fixtures, print_table
+
+
+def _langchain_per_call(chunk_size, chunk_overlap, length_function):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    def split(text):
+        return RecursiveCharacterTextSplitter(
+            separators=["\n\n", "\n", " ", ""],
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=length_function,
+        ).split_text(text)
+
+    return split
+
+
+def _run(split, texts, repeat) -> tuple[float, int]:
+    chunks = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            chunks += len(split(text))
+    return chunks / (time.perf_counter() - start), chunks // repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    args = parser.parse_args()
+
+    from extraction import get_engine
+    from retrieval.splitter import LangChainSplitter, NativeSplitter
+    from util.tokens import cached_count_tokens, count_tokens
+
+    # LangChain warns about every oversized chunk
+    logging.getLogger("langchain_text_splitters").setLevel(logging.ERROR)
+
+    engine = get_engine()
+    texts = [engine.text(html) for html in load_fixtures().values()]
+    size, overlap = args.chunk_size, args.overlap
+
+    rows = []
+    for unit, length in (
+        ("chars", len),
+        ("tokens", count_tokens),
+        ("tokens, cached", cached_count_tokens),
+    ):
+        langchain = LangChainSplitter(size, overlap, length)
+        native = NativeSplitter(size, overlap, length)
+        for text in texts:
+            expected = asyncio.run(langchain.split(text))
+            assert native.split_text(text) == expected
+
+        engines = [
+            ("langchain per call", _langchain_per_call(size, overlap, length)),
+            ("langchain", langchain.text_splitter.split_text),
+            ("native", native.split_text),
+        ]
+        baseline = None
+        for name, split in engines:
+            if length is cached_count_tokens:
+                cached_count_tokens.cache_clear()
+            rate, chunks = _run(split, texts, args.repeat)
+            baseline = baseline or rate
+            rows.append([unit, name, chunks, rate, rate / baseline])
+
+    characters = sum(len(text) for text in texts)
+    print(
+        f"{len(texts)} pages, {characters} characters, chunk size {size}, "
+        f"overlap {overlap}, {args.repeat} repetitions\n"
+    )
+    print_table(["length", "splitter", "chunks", "chunks/s", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
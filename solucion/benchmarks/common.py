@@ -0,0 +1,55 @@
+"""Helpers shared by the benchmark scripts.
+
+Run the scripts from `solucion/`, e.g. `python benchmarks/bench_html_engines.py`.
+"""
+
+import statistics
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = ROOT / "tests" / "fixtures" / "html"
+
+# The orchestrator modules import each other as top level packages
+sys.path.insert(0, str(ROOT / "src" / "orchestrator"))
+
+
+def load_fixtures() -> dict[str, str]:
+    """Recorded HTML pages, keyed by file name."""
+
+    return {
+        path.name: path.read_text(encoding="utf-8")
+        for path in sorted(FIXTURES.glob("*.html"))
+    }
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": statistics.fmean(values) if values else 0.0,
+    }
+
+
+def print_table(headers: list[str], rows: list[list]) -> None:
+    cells = [headers] + [[_format(value) for value in row] for row in rows]
+    widths = [max(len(str(row[i])) for row in cells) for i in range(len(headers))]
+    for i, row in enumerate(cells):
+        print("  ".join(str(value).rjust(width) for value, width in zip(row, widths)))
+        if i == 0:
+            print("  ".join("-" * width for width in widths))
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
@@ -0,0 +1,255 @@
+"""Local stand-ins for the external services the orchestrator calls.
+
+One threaded HTTP server answers on 127.0.0.1 as:
+
+* `GET /google?...q=`: Google Custom Search, `SearchResult` shaped JSON.
+* `POST /serper`: Serper, `organic` results as used by `main.search_google`.
+* `GET /site/<n>/<fixture>`: the recorded pages in `tests/fixtures/html`.
+* `POST /v1/embeddings`: OpenAI embeddings, as lists or base64 float32.
+* `POST /llm`: Hugging Face text-generation-inference token stream (SSE).
+
+Every answer waits for a configurable latency. Latencies, links and vectors
+are derived from the request itself rather than from a shared random
+generator, so a run is reproducible whatever the order of the requests.
+"""
+
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from common import load_fixtures
+
+ANSWER = (
+    "Según las fuentes consultadas, los manzanos se podan a fines del invierno, "
+    "antes de la brotación, quitando las ramas secas y las que se cruzan."
+).split()
+
+
+@dataclass
+class Latency:
+    """Seconds to wait: `mean` plus normal noise of `jitter`, never negative."""
+
+    mean: float = 0.0
+    jitter: float = 0.0
+
+    def sample(self, key: str) -> float:
+        if not self.mean and not self.jitter:
+            return 0.0
+        return max(0.0, _rng(key).gauss(self.mean, self.jitter))
+
+
+@dataclass
+class StandInConfig:
+    results: int = 5
+    dimension: int = 1536
+    search: Latency = field(default_factory=lambda: Latency(0.05, 0.01))
+    page: Latency = field(default_factory=lambda: Latency(0.1, 0.05))
+    # Per request, plus `embedding_per_input` seconds per input text
+    embedding: Latency = field(default_factory=lambda: Latency(0.05, 0.01))
+    embedding_per_input: float = 0.0002
+    first_token: Latency = field(default_factory=lambda: Latency(0.2, 0.05))
+    token_interval: float = 0.01
+    tokens: int = 40
+
+
+class StandIns:
+    """Runs the stand-in server in a background thread.
+
+        with StandIns(StandInConfig()) as services:
+            requests.post(services.serper_url, ...)
+    """
+
+    def __init__(self, config: StandInConfig | None = None) -> None:
+        self.config = config or StandInConfig()
+        self.pages = {name: html.encode("utf-8") for name, html in load_fixtures().items()}
+        self.requests: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    def __enter__(self) -> "StandIns":
+        handler = type("Handler", (_Handler,), {"services": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 256
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def google_url(self) -> str:
+        return f"{self.base_url}/google?"
+
+    @property
+    def serper_url(self) -> str:
+        return f"{self.base_url}/serper"
+
+    @property
+    def openai_api_base(self) -> str:
+        return f"{self.base_url}/v1"
+
+    @property
+    def llm_url(self) -> str:
+        return f"{self.base_url}/llm"
+
+    def count(self, route: str) -> None:
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def links(self, query: str) -> list[tuple[str, str]]:
+        """(title, link) of the results of `query`, spread over many paths."""
+
+        rng = _rng(f"search:{query}")
+        names = sorted(self.pages)
+        links = []
+        for _ in range(self.config.results):
+            name = rng.choice(names)
+            title = name.removesuffix(".html").replace("_", " ")
+            links.append((title, f"{self.base_url}/site/{rng.randrange(10_000)}/{name}"))
+        return links
+
+    def vector(self, text: str) -> np.ndarray:
+        rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+        vector = rng.standard_normal(self.config.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    services: StandIns
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/google":
+            self.google(parse_qs(url.query).get("q", [""])[0])
+        elif url.path.startswith("/site/"):
+            self.site(url.path)
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = urlsplit(self.path).path
+        if path == "/serper":
+            self.serper(body.get("q", ""))
+        elif path == "/v1/embeddings":
+            self.embeddings(body)
+        elif path == "/llm":
+            self.llm(body)
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def google(self, query: str) -> None:
+        self.services.count("search")
+        time.sleep(self.services.config.search.sample(f"google:{query}"))
+        items = [
+            {"title": title, "link": link, "displayLink": urlsplit(link).netloc, "snippet": title}
+            for title, link in self.services.links(query)
+        ]
+        self.send_json({"items": items})
+
+    def serper(self, query: str) -> None:
+        self.services.count("search")
+        time.sleep(self.services.config.search.sample(f"serper:{query}"))
+        organic = [{"title": title, "link": link} for title, link in self.services.links(query)]
+        self.send_json({"organic": organic})
+
+    def site(self, path: str) -> None:
+        self.services.count("site")
+        page = self.services.pages.get(path.rsplit("/", 1)[-1])
+        if page is None:
+            self.send_json({"error": "not found"}, 404)
+            return
+        time.sleep(self.services.config.page.sample(path))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def embeddings(self, body: dict) -> None:
+        self.services.count("embeddings")
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        config = self.services.config
+        delay = config.embedding.sample(_digest(inputs)) + config.embedding_per_input * len(inputs)
+        time.sleep(delay)
+
+        data = []
+        for index, text in enumerate(inputs):
+            vector = self.services.vector(text)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(len(text) // 4 for text in inputs)
+        self.send_json(
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", ""),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    def llm(self, body: dict) -> None:
+        self.services.count("llm")
+        config = self.services.config
+        max_tokens = body.get("parameters", {}).get("max_new_tokens", config.tokens)
+        tokens = [f" {ANSWER[i % len(ANSWER)]}" for i in range(min(config.tokens, max_tokens))]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        time.sleep(config.first_token.sample(_digest(body.get("inputs", ""))))
+        for i, text in enumerate(tokens):
+            if i:
+                time.sleep(config.token_interval)
+            last = i == len(tokens) - 1
+            frame = {
+                "token": {"id": i, "text": text, "special": False},
+                "generated_text": "".join(tokens) if last else None,
+            }
+            self.wfile.write(f"data:{json.dumps(frame)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def send_json(self, payload, status: int = 200) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _rng(key: str) -> random.Random:
+    return random.Random(key)
+
+
+def _digest(value) -> str:
+    return hashlib.sha1(json.dumps(value).encode("utf-8")).hexdigest()
@@ -0,0 +1,5 @@
+from cache.search import SearchCache
+from cache.page import PageCache
+from cache.vector import VectorCache
+from cache.embedding import EmbeddingCache
+from cache.negative import NegativeCache
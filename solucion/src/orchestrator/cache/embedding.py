@@ -0,0 +1,27 @@
+import hashlib
+
+import numpy as np
+
+from cache.sqlite import SQLiteCache
+
+
+class EmbeddingCache(SQLiteCache):
+    """Embedding vectors keyed by a hash of the model name and the text.
+
+    Vectors are stored as raw float32 bytes, about four bytes per dimension
+    instead of the twenty or so a JSON list takes. Embeddings of a given
+    model never change, so entries have no TTL and only LRU eviction applies.
+    """
+
+    def __init__(self, path=":memory:", max_entries: int = 200_000, **kwargs) -> None:
+        super().__init__(path, max_entries=max_entries, **kwargs)
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def encode(self, value: list[float]) -> bytes:
+        return np.asarray(value, dtype=np.float32).tobytes()
+
+    def decode(self, data: bytes) -> list[float]:
+        return np.frombuffer(data, dtype=np.float32).tolist()
@@ -0,0 +1,52 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from cache.sqlite import CacheStats
+
+
+class NegativeCache:
+    """Keys that recently failed, remembered for `ttl` seconds.
+
+    Lives only in memory: a failure is worth skipping for a few minutes, not
+    across restarts. The oldest keys are dropped beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._expires: OrderedDict[str, float] = OrderedDict()
+
+    def add(self, key: str, ttl: float | None = None) -> None:
+        """Remembers `key` for `ttl` seconds, the cache's own TTL by default."""
+
+        with self._lock:
+            self._expires.pop(key, None)
+            self._expires[key] = self.clock() + (self.ttl if ttl is None else ttl)
+            while len(self._expires) > self.max_entries:
+                self._expires.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._expires.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            expires = self._expires.get(key)
+            if expires is not None and expires <= self.clock():
+                del self._expires[key]
+                expires = None
+        self.stats.record(expires is not None)
+        return expires is not None
+
+    def __len__(self) -> int:
+        return len(self._expires)
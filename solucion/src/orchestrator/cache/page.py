@@ -0,0 +1,94 @@
+import json
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Mapping, Optional
+
+from cache.sqlite import CacheStats, SQLiteCache
+
+MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class CachedPage:
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+
+class PageCache(SQLiteCache):
+    """Extracted page text, stored with the validators needed to revalidate it.
+
+    Pages younger than `max_age` seconds are served as they are. Older ones
+    are revalidated with a conditional GET; on a 304 the stored text is
+    reused without downloading or parsing the page again. The cache is
+    bounded by `max_bytes` with LRU eviction.
+    """
+
+    def __init__(
+        self, path=":memory:", max_bytes: int = MAX_BYTES, max_age: float = 0, **kwargs
+    ) -> None:
+        kwargs.setdefault("max_entries", None)
+        super().__init__(path, max_bytes=max_bytes, **kwargs)
+        self.max_age = max_age
+        # hits: answered with 304, misses: the page had changed
+        self.revalidations = CacheStats()
+
+    @staticmethod
+    def key(url: str, variant: str = "") -> str:
+        """`variant` tells apart texts extracted from the same URL in different ways."""
+
+        return f"{variant}|{url}"
+
+    def encode(self, value: CachedPage) -> bytes:
+        return json.dumps(asdict(value), ensure_ascii=False).encode("utf-8")
+
+    def decode(self, data: bytes) -> CachedPage:
+        return CachedPage(**json.loads(data))
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return self.clock() - page.fetched_at < self.max_age
+
+    @staticmethod
+    def conditional_headers(page: Optional[CachedPage]) -> dict[str, str]:
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def store(self, key: str, text: str, headers: Mapping[str, str]) -> None:
+        self.set(
+            key,
+            CachedPage(
+                text=text,
+                etag=headers.get("ETag"),
+                last_modified=headers.get("Last-Modified"),
+                fetched_at=self.clock(),
+            ),
+        )
+
+    def not_modified(self, key: str, page: CachedPage) -> str:
+        """Records a 304 answer and returns the stored text."""
+
+        self.revalidations.record(True)
+        self.set(key, replace(page, fetched_at=self.clock()))
+        return page.text
+
+    def modified(self) -> None:
+        """Records a revalidation that returned a new version of the page."""
+
+        self.revalidations.record(False)
+
+    def metrics(self) -> dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        reused = self.stats.hits - self.revalidations.misses
+        return {
+            "lookups": lookups,
+            "hit_rate": reused / lookups if lookups else 0.0,
+            "not_modified": self.revalidations.hits,
+            "changed": self.revalidations.misses,
+            "misses": self.stats.misses,
+            "bytes": self.size,
+        }
@@ -0,0 +1,25 @@
+import json
+import unicodedata
+from typing import Any
+
+from cache.sqlite import SQLiteCache
+
+DAY = 24 * 60 * 60
+
+
+class SearchCache(SQLiteCache):
+    """Cache of search API results keyed by normalized query and locale."""
+
+    def __init__(self, path=":memory:", max_entries: int = 10_000, ttl: float = DAY, **kwargs) -> None:
+        super().__init__(path, max_entries=max_entries, ttl=ttl, **kwargs)
+
+    @staticmethod
+    def key(query: str, gl: str = "", hl: str = "", provider: str = "") -> str:
+        normalized = " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+        return f"{provider}|{gl}|{hl}|{normalized}"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
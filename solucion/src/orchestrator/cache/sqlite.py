@@ -0,0 +1,282 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+MEMORY = ":memory:"
+EVICTION_TARGET = 0.9
+
+
+class CacheStats:
+    """Hit and miss counters of a cache."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool, count: int = 1) -> None:
+        with self._lock:
+            if hit:
+                self.hits += count
+            else:
+                self.misses += count
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+
+class SQLiteCache:
+    """Persistent key/value cache with TTL and LRU eviction.
+
+    Entries live in a SQLite file so they survive restarts. The most recently
+    used ones are also kept decoded in memory, so a hot hit costs a dict
+    lookup instead of a query and a deserialization. Eviction removes the
+    least recently used entries once `max_entries` or `max_bytes` is exceeded;
+    the entry count and byte total are read once when the cache opens and
+    kept up to date afterwards, so an insert does not scan the table.
+    Subclasses define how values are stored through `encode` and `decode`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = MEMORY,
+        max_entries: Optional[int] = 10_000,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        memory_entries: int = 256,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.clock = clock
+        self.stats = CacheStats()
+        self._lock = threading.RLock()
+        self._memory: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+
+        if self.path != MEMORY:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self._load_totals()
+
+    def _load_totals(self) -> None:
+        self._count, self._size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+
+    def encode(self, value: Any) -> bytes:
+        return value
+
+    def decode(self, data: bytes) -> Any:
+        return data
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Any:
+        """Returns the cached value, or None on a miss or an expired entry."""
+
+        with self._lock:
+            return self._get(key, self.clock())
+
+    def get_many(self, keys: Iterable[str]) -> list[Any]:
+        """Values of `keys` in order, None for each miss, in a single transaction."""
+
+        now = self.clock()
+        with self._lock, self._transaction():
+            return [self._get(key, now) for key in keys]
+
+    def _get(self, key: str, now: float) -> Any:
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created = entry
+            if not self._expired(created, now):
+                self._memory.move_to_end(key)
+                self.stats.record(True)
+                return value
+            self._delete(key)
+            self.stats.record(False)
+            return None
+
+        row = self._conn.execute(
+            "SELECT value, created FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or self._expired(row[1], now):
+            if row is not None:
+                self._delete(key)
+            self.stats.record(False)
+            return None
+
+        self._conn.execute(
+            "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+        )
+        value = self.decode(row[0])
+        self._remember(key, value, row[1])
+        self.stats.record(True)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        data = self.encode(value)
+        now = self.clock()
+        with self._lock:
+            self._insert(key, data, now)
+            self._remember(key, value, now)
+            if self._over(self._count, self._size, 1.0):
+                self._evict()
+
+    def set_many(self, items: Iterable[tuple[str, Any]]) -> None:
+        """Stores (key, value) pairs in a single transaction and eviction pass."""
+
+        encoded = [(key, value, self.encode(value)) for key, value in items]
+        now = self.clock()
+        with self._lock, self._transaction():
+            for key, value, data in encoded:
+                self._insert(key, data, now)
+                self._remember(key, value, now)
+            if self._over(self._count, self._size, 1.0):
+                self._evict()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            # The totals and the memory layer may describe rolled back rows
+            self._memory.clear()
+            self._load_totals()
+            raise
+        self._conn.execute("COMMIT")
+
+    def _insert(self, key: str, data: bytes, now: float) -> None:
+        # length() of a BLOB does not read its overflow pages
+        previous = self._conn.execute(
+            "SELECT length(value) FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now, now),
+        )
+        if previous is None:
+            self._count += 1
+        else:
+            self._size -= previous[0]
+        self._size += len(data)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+
+    def _delete(self, key: str) -> None:
+        self._memory.pop(key, None)
+        row = self._conn.execute(
+            "DELETE FROM entries WHERE key = ? RETURNING size", (key,)
+        ).fetchone()
+        if row is not None:
+            self._count -= 1
+            self._size -= row[0]
+
+    def touch(self, key: str) -> None:
+        """Resets the age of an entry, e.g. after it was revalidated."""
+
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET created = ?, accessed = ? WHERE key = ?",
+                (now, now, key),
+            )
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory[key] = (entry[0], now)
+
+    def _remember(self, key: str, value: Any, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        """Drops least recently used entries down to 90% of the limits.
+
+        Entries in the memory layer are the most recently used ones; their
+        hits are not written back to disk, so they are evicted last.
+        """
+
+        sizes = dict(
+            self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed ASC"
+            ).fetchall()
+        )
+        order = [key for key in sizes if key not in self._memory]
+        order += [key for key in self._memory if key in sizes]
+
+        # Also resynchronizes the totals with the rows actually on disk
+        count, size = len(sizes), sum(sizes.values())
+        removed = []
+        for key in order:
+            if not self._over(count, size, EVICTION_TARGET):
+                break
+            removed.append(key)
+            count -= 1
+            size -= sizes[key]
+
+        self._conn.executemany(
+            "DELETE FROM entries WHERE key = ?", [(key,) for key in removed]
+        )
+        for key in removed:
+            self._memory.pop(key, None)
+        self._count, self._size = count, size
+
+    def _over(self, count: int, size: int, fraction: float) -> bool:
+        return (self.max_entries is not None and count > self.max_entries * fraction) or (
+            self.max_bytes is not None and size > self.max_bytes * fraction
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def size(self) -> int:
+        """Bytes stored on disk."""
+
+        return self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM entries")
+            self._count = self._size = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,181 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from index.base import VectorIndex
+from models.document import Document, DocumentBatch
+from util import similarity
+
+
+class VectorCache:
+    """Chunks already retrieved from the web, with their embeddings.
+
+    Vectors are kept normalized in a float32 matrix, so a lookup is one
+    matrix-vector product. With an `index` (e.g. `IVFFlatIndex`) lookups go
+    through it instead, which scales to millions of chunks at the cost of
+    exactness. The oldest chunks are dropped past `max_entries`.
+    `save` and `load` persist the cache as `<path>.npy` plus `<path>.json`.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        max_entries: int = 100_000,
+        path: Optional[str | Path] = None,
+        index: Optional[VectorIndex] = None,
+    ) -> None:
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self.index = index
+        # Ring buffer: the matrix grows up to `max_entries` rows, then new
+        # chunks overwrite the oldest ones starting at `_head`. The rows in
+        # use are always `[0, _size)`, and a row's number is its id in the
+        # index, so evicting never moves or renumbers the other rows.
+        self._head = 0
+        self._texts: list[str] = []
+        self._urls: list[str] = []
+        self._keys: set[str] = set()
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._size = 0
+        if self.path is not None and self.path.with_suffix(".npy").exists():
+            self.load()
+
+    @staticmethod
+    def _key(url: str, text: str) -> str:
+        return hashlib.sha1(f"{url}\0{text}".encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _order(self) -> np.ndarray:
+        """Rows in use, oldest first."""
+
+        return (self._head + np.arange(self._size)) % max(len(self._vectors), 1)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[self._order()]
+
+    @property
+    def texts(self) -> list[str]:
+        return self._texts[self._head : self._size] + self._texts[: self._head]
+
+    @property
+    def urls(self) -> list[str]:
+        return self._urls[self._head : self._size] + self._urls[: self._head]
+
+    def add(self, documents: DocumentBatch | list[dict]) -> int:
+        """Adds a batch or `{"text", "url", "vector"}` documents, skipping known chunks."""
+
+        if not isinstance(documents, DocumentBatch):
+            documents = DocumentBatch.from_records(documents)
+
+        rows, keys = [], []
+        for i, (url, text) in enumerate(zip(documents.urls, documents.texts)):
+            key = self._key(url, text)
+            if key not in self._keys:
+                self._keys.add(key)
+                rows.append(i)
+                keys.append(key)
+        if not rows:
+            return 0
+        added = len(rows)
+
+        # Chunks that would be evicted by the rest of the batch are not stored
+        skipped = max(0, len(rows) - self.max_entries)
+        self._keys.difference_update(keys[:skipped])
+        rows = rows[skipped:]
+
+        self._reserve(min(self._size + len(rows), self.max_entries))
+        overflow = self._size + len(rows) - self.max_entries
+        if overflow > 0:
+            self._drop_oldest(overflow)
+
+        slots = (self._head + self._size + np.arange(len(rows))) % len(self._vectors)
+        vectors = similarity.normalize(documents.vectors[rows])
+        self._vectors[slots] = vectors
+        for slot, i in zip(slots.tolist(), rows):
+            self._texts[slot] = documents.texts[i]
+            self._urls[slot] = documents.urls[i]
+        if self.index is not None:
+            self.index.add(slots, vectors)
+        self._size += len(rows)
+        return added
+
+    def _reserve(self, size: int) -> None:
+        # Only grows before the first eviction, while `_head` is 0, so rows
+        # keep their numbers.
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        capacity = min(max(size, capacity * 2, 64), self.max_entries)
+        grown = np.empty((capacity, self.dimension), dtype=np.float32)
+        grown[: self._size] = self._vectors[: self._size]
+        self._vectors = grown
+        self._texts.extend([""] * (capacity - len(self._texts)))
+        self._urls.extend([""] * (capacity - len(self._urls)))
+
+    def _drop_oldest(self, count: int) -> None:
+        slots = (self._head + np.arange(count)) % len(self._vectors)
+        for slot in slots.tolist():
+            self._keys.discard(self._key(self._urls[slot], self._texts[slot]))
+        if self.index is not None:
+            self.index.remove(slots)
+        self._head = (self._head + count) % len(self._vectors)
+        self._size -= count
+
+    def search(
+        self, query_vector, k: int = 10, include_vectors: bool = True
+    ) -> list[Document]:
+        """The `k` cached chunks most similar to `query_vector`, best first.
+
+        Returned vectors are copies, so later evictions do not change them.
+        """
+
+        if not self._size:
+            return []
+        if self.index is not None:
+            rows, scores = self.index.search(query_vector, k)
+        else:
+            scores = similarity.cosine_scores(
+                query_vector, self._vectors[: self._size], normalized=True
+            )
+            rows = similarity.top_k(scores, k)
+            scores = scores[rows]
+        return [
+            Document(
+                text=self._texts[i],
+                url=self._urls[i],
+                vector=self._vectors[i].copy() if include_vectors else None,
+                similarity=float(score),
+            )
+            for i, score in zip(rows, scores)
+        ]
+
+    def save(self) -> None:
+        if self.path is None:
+            raise ValueError("VectorCache has no path to save to")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        np.save(self.path.with_suffix(".npy"), self.vectors)
+        self.path.with_suffix(".json").write_text(
+            json.dumps({"texts": self.texts, "urls": self.urls}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+
+    def load(self) -> None:
+        if self.index is not None and self._size:
+            self.index.remove(np.arange(self._size))
+        vectors = np.load(self.path.with_suffix(".npy"))[-self.max_entries :]
+        metadata = json.loads(self.path.with_suffix(".json").read_text(encoding="utf-8"))
+        self._vectors = vectors.astype(np.float32, copy=False)
+        self._size = len(vectors)
+        self._head = 0
+        self._texts = metadata["texts"][-self.max_entries :]
+        self._urls = metadata["urls"][-self.max_entries :]
+        self._keys = {self._key(u, t) for u, t in zip(self._urls, self._texts)}
+        if self.index is not None:
+            self.index.add(np.arange(self._size), self._vectors)
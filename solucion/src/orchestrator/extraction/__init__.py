@@ -0,0 +1,3 @@
+from extraction.stream import StreamingExtractor, is_html, charset
+from extraction.engines import HtmlEngine, get_engine
+from extraction.boilerplate import extract_main_content
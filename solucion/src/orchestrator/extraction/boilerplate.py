@@ -0,0 +1,212 @@
+"""Main-content extraction.
+
+Splits the page into text blocks and keeps the article body, dropping
+navigation, cookie banners, footers, sidebars and link lists. Blocks are
+scored by how much text they hold and how much of it is link text; the
+container that collects the highest score is taken as the article and only
+its dense, low-link blocks are kept.
+"""
+
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Optional
+
+SKIPPED_TAGS = {"script", "style", "template", "noscript", "svg", "iframe", "button", "select"}
+BOILERPLATE_TAGS = {"nav", "footer", "aside", "form"}
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "dd", "details", "div", "dl",
+    "dt", "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "li", "main", "ol", "p", "pre", "section", "summary", "table", "td", "th",
+    "tr", "ul", *BOILERPLATE_TAGS,
+}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+# Matched against whole class/id words, as split by "-", "_" and spaces, so
+# "nav" does not match "canvas" nor "share" "shared-content"
+NEGATIVE = re.compile(
+    r"(?<![a-z0-9])(?:"
+    r"ads?|advert\w*|banners?|breadcrumbs?|catlinks|comments?|consent|cookies?|"
+    r"footer|gdpr|menu|nav|navbar|navigation|newsletter|pagination|paywall|"
+    r"popup|promo\w*|related|share|sharing|sidebar|social|sponsor\w*|"
+    r"subscri\w*|toc|toolbar|widgets?"
+    r")(?![a-z0-9])",
+    re.IGNORECASE,
+)
+POSITIVE = re.compile(
+    r"article|body|content|entry|main|nota|post|story|text", re.IGNORECASE
+)
+CLASS_WEIGHT = 25.0
+
+# A block is kept when it is inside the article container and passes these
+MAX_LINK_DENSITY = 0.5
+MIN_WORDS = 3
+
+
+@dataclass
+class _Node:
+    tag: str
+    parent: Optional[int]
+    weight: float
+    boilerplate: bool
+    score: float = 0.0
+
+
+@dataclass
+class Block:
+    tag: str
+    ancestors: tuple[int, ...]
+    boilerplate: bool
+    parts: list[str] = field(default_factory=list)
+    words: int = 0
+    link_words: int = 0
+
+    @property
+    def text(self) -> str:
+        return " ".join("".join(self.parts).split())
+
+    @property
+    def link_density(self) -> float:
+        return self.link_words / self.words if self.words else 0.0
+
+
+class MainContentParser(HTMLParser):
+    """Incremental block segmenter; call `text()` once the whole page is fed."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.nodes: list[_Node] = []
+        self.blocks: list[Block] = []
+        self.chars = 0
+        self._stack: list[tuple[str, int]] = []
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._block: Optional[Block] = None
+
+    # Parsing
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        if self._skip_depth or tag in SKIPPED_TAGS:
+            self._skip_depth += tag in SKIPPED_TAGS
+            self._stack.append((tag, -1))
+            return
+        if tag == "a":
+            self._link_depth += 1
+            self._stack.append((tag, -1))
+            return
+        if tag not in BLOCK_TAGS:
+            self._stack.append((tag, -1))
+            return
+
+        attributes = dict(attrs)
+        names = f"{attributes.get('class') or ''} {attributes.get('id') or ''}"
+        weight = 0.0
+        if NEGATIVE.search(names):
+            weight -= CLASS_WEIGHT
+        if POSITIVE.search(names):
+            weight += CLASS_WEIGHT
+        parent = self._parent()
+        boilerplate = (
+            tag in BOILERPLATE_TAGS
+            or weight < 0
+            or (parent is not None and self.nodes[parent].boilerplate)
+        )
+        self.nodes.append(_Node(tag, parent, weight, boilerplate))
+        self._stack.append((tag, len(self.nodes) - 1))
+        self._block = None
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, node = self._stack.pop()
+            if open_tag in SKIPPED_TAGS and self._skip_depth:
+                self._skip_depth -= 1
+            elif open_tag == "a" and not self._skip_depth:
+                self._link_depth = max(self._link_depth - 1, 0)
+            if node >= 0:
+                self._block = None
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._skip_depth or not data:
+            return
+        if self._block is None:
+            if not data.strip():
+                return
+            parent = self._parent()
+            ancestors = self._ancestors(parent)
+            tag = self.nodes[parent].tag if parent is not None else "body"
+            boilerplate = parent is not None and self.nodes[parent].boilerplate
+            self._block = Block(tag, ancestors, boilerplate)
+            self.blocks.append(self._block)
+        words = len(data.split())
+        self._block.parts.append(data)
+        self._block.words += words
+        if self._link_depth:
+            self._block.link_words += words
+        self.chars += len(data)
+
+    def _parent(self) -> Optional[int]:
+        for _, node in reversed(self._stack):
+            if node >= 0:
+                return node
+        return None
+
+    def _ancestors(self, node: Optional[int]) -> tuple[int, ...]:
+        ancestors = []
+        while node is not None:
+            ancestors.append(node)
+            node = self.nodes[node].parent
+        return tuple(ancestors)
+
+    # Scoring
+
+    def _best_container(self) -> Optional[int]:
+        for node in self.nodes:
+            node.score = node.weight
+        for block in self.blocks:
+            if block.boilerplate or block.words < MIN_WORDS:
+                continue
+            score = (1 + min(block.words / 10, 10)) * (1 - block.link_density)
+            # The score goes up the tree, fading with every level
+            for level, node in enumerate(block.ancestors[:3]):
+                self.nodes[node].score += score / (1 + level)
+        candidates = [i for i, node in enumerate(self.nodes) if not node.boilerplate]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda i: self.nodes[i].score)
+
+    def main_blocks(self) -> list[Block]:
+        best = self._best_container()
+        if best is None:
+            return []
+        kept = []
+        for block in self.blocks:
+            if block.boilerplate or best not in block.ancestors:
+                continue
+            if block.link_density > MAX_LINK_DENSITY:
+                continue
+            if block.words < MIN_WORDS and block.tag not in HEADINGS:
+                continue
+            kept.append(block)
+        return kept
+
+    def text(self) -> str:
+        return "\n".join(block.text for block in self.main_blocks())
+
+
+def extract_main_content(html: str) -> str:
+    """Text of the article body of `html`, one block per line."""
+
+    parser = MainContentParser()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
@@ -0,0 +1,158 @@
+"""HTML to text engines.
+
+All engines expose the same two views of a page: the text of its <p>
+elements and its stripped text nodes (script, style and template contents
+excluded), matching what the BeautifulSoup code did. BeautifulSoup with
+"html.parser" is always available; lxml and selectolax are optional and
+much faster.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional
+
+SKIPPED_TAGS = ("script", "style", "template")
+NO_CONTENT = "No se pudo extraer contenido relevante."
+
+
+class HtmlEngine(ABC):
+    name: str
+
+    @abstractmethod
+    def paragraphs(self, html: str) -> list[str]:
+        """Text of every <p> element."""
+
+    @abstractmethod
+    def strings(self, html: str) -> list[str]:
+        """Every non empty text node, stripped."""
+
+    def text(self, html: str) -> str:
+        """All the text of the page, like `soup.get_text(" ", strip=True)`."""
+
+        return " ".join(self.strings(html))
+
+    def article_text(self, html: str) -> str:
+        """Paragraph text, falling back to every text node when there are no paragraphs."""
+
+        article_text = "\n".join(self.paragraphs(html))
+        if not article_text.strip():
+            article_text = "\n".join(self.strings(html))
+        return article_text.strip() if article_text else NO_CONTENT
+
+
+class BeautifulSoupEngine(HtmlEngine):
+    name = "beautifulsoup"
+
+    def __init__(self, features: str = "html.parser") -> None:
+        from bs4 import BeautifulSoup
+
+        self._soup = BeautifulSoup
+        self.features = features
+
+    def paragraphs(self, html: str) -> list[str]:
+        soup = self._soup(html, self.features)
+        return [p.get_text() for p in soup.find_all("p")]
+
+    def strings(self, html: str) -> list[str]:
+        return list(self._soup(html, self.features).stripped_strings)
+
+
+class LxmlEngine(HtmlEngine):
+    name = "lxml"
+
+    def __init__(self) -> None:
+        from lxml import etree, html as lxml_html
+
+        self._etree = etree
+        self._parser = lxml_html.HTMLParser(remove_comments=True, remove_pis=True)
+        self._fromstring = lxml_html.document_fromstring
+
+    def _tree(self, html: str):
+        if not html or not html.strip():
+            return None
+        try:
+            tree = self._fromstring(html, parser=self._parser)
+        except (self._etree.ParserError, ValueError):
+            return None
+        self._etree.strip_elements(tree, *SKIPPED_TAGS, with_tail=False)
+        return tree
+
+    def paragraphs(self, html: str) -> list[str]:
+        tree = self._tree(html)
+        if tree is None:
+            return []
+        return ["".join(p.itertext()) for p in tree.iter("p")]
+
+    def strings(self, html: str) -> list[str]:
+        tree = self._tree(html)
+        if tree is None:
+            return []
+        return [s for s in (t.strip() for t in tree.itertext()) if s]
+
+
+class SelectolaxEngine(HtmlEngine):
+    name = "selectolax"
+
+    def __init__(self) -> None:
+        try:
+            from selectolax.lexbor import LexborHTMLParser as parser
+        except ImportError:
+            from selectolax.parser import HTMLParser as parser
+
+        self._parser = parser
+
+    def _tree(self, html: str):
+        tree = self._parser(html)
+        tree.strip_tags(list(SKIPPED_TAGS))
+        return tree
+
+    def paragraphs(self, html: str) -> list[str]:
+        return [p.text(deep=True) for p in self._tree(html).css("p")]
+
+    def strings(self, html: str) -> list[str]:
+        root = self._tree(html).root
+        if root is None:
+            return []
+        return [s for s in (t.strip() for t in root.text(separator="\x00").split("\x00")) if s]
+
+
+ENGINES: dict[str, type[HtmlEngine]] = {
+    SelectolaxEngine.name: SelectolaxEngine,
+    LxmlEngine.name: LxmlEngine,
+    BeautifulSoupEngine.name: BeautifulSoupEngine,
+}
+
+_instances: dict[str, HtmlEngine] = {}
+
+
+def available_engines() -> list[str]:
+    """Names of the engines whose backend is installed, fastest first."""
+
+    names = []
+    for name in ENGINES:
+        try:
+            get_engine(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_engine(name: Optional[str] = None) -> HtmlEngine:
+    """Returns the named engine, or the fastest installed one if no name is given.
+
+    Raises ImportError when a named engine's backend is not installed.
+    """
+
+    if name is None:
+        for candidate in ENGINES:
+            try:
+                return get_engine(candidate)
+            except ImportError:
+                continue
+        raise ImportError("No HTML engine available")
+
+    if name not in ENGINES:
+        raise ValueError(f"Unknown HTML engine: {name}")
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
@@ -0,0 +1,150 @@
+import codecs
+from html.parser import HTMLParser
+from typing import Optional
+
+from extraction.boilerplate import MainContentParser
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+SKIPPED_TAGS = {"script", "style", "template"}
+
+CHUNK_SIZE = 16 * 1024
+MAX_BYTES = 2 * 1024 * 1024
+MAX_CHARS = 200_000
+
+
+def is_html(content_type: Optional[str]) -> bool:
+    """True for HTML responses; a missing Content-Type is given the benefit of the doubt."""
+
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def charset(content_type: Optional[str], default: str = "utf-8") -> str:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value.strip():
+            encoding = value.strip().strip("\"'")
+            try:
+                codecs.lookup(encoding)
+            except LookupError:
+                break
+            return encoding
+    return default
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.strings: list[str] = []
+        self.paragraphs: list[str] = []
+        self.chars = 0
+        self._skip_depth = 0
+        self._paragraph: Optional[list[str]] = None
+        # A text node can arrive split across several feeds
+        self._pending: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "p":
+            self._close_paragraph()
+            self._paragraph = []
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag == "p":
+            self._close_paragraph()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._paragraph is not None:
+            self._paragraph.append(data)
+        self._pending.append(data)
+        self.chars += len(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def _flush(self):
+        if self._pending:
+            stripped = "".join(self._pending).strip()
+            if stripped:
+                self.strings.append(stripped)
+            self._pending = []
+
+    def _close_paragraph(self):
+        if self._paragraph is not None:
+            self.paragraphs.append("".join(self._paragraph))
+            self._paragraph = None
+
+    def close(self):
+        super().close()
+        self._flush()
+        self._close_paragraph()
+
+
+class StreamingExtractor:
+    """Extracts text from HTML fed in chunks, as the body is downloaded.
+
+    `feed` returns False once `max_bytes` of HTML have been read or
+    `max_chars` of text have been collected, so callers can stop the
+    download early instead of holding the whole page in memory. With
+    `main_content=True` only the article body is kept (see `main_text`).
+    """
+
+    def __init__(
+        self,
+        encoding: str = "utf-8",
+        max_bytes: int = MAX_BYTES,
+        max_chars: int = MAX_CHARS,
+        main_content: bool = False,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.bytes_read = 0
+        self.truncated = False
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.main_content = main_content
+        self._parser = MainContentParser() if main_content else _TextCollector()
+        self._closed = False
+
+    def feed(self, chunk: bytes) -> bool:
+        if self._closed:
+            return False
+        self.bytes_read += len(chunk)
+        self._parser.feed(self._decoder.decode(chunk))
+        if self.bytes_read >= self.max_bytes or self._parser.chars >= self.max_chars:
+            self.truncated = True
+            return False
+        return True
+
+    def close(self) -> None:
+        if not self._closed:
+            self._parser.feed(self._decoder.decode(b"", final=True))
+            self._parser.close()
+            self._closed = True
+
+    @property
+    def main_text(self) -> str:
+        """Article body, only available with `main_content=True`."""
+
+        if not self.main_content:
+            raise ValueError("StreamingExtractor was created without main_content")
+        return self._parser.text()
+
+    @property
+    def paragraphs(self) -> list[str]:
+        """Text of every <p> element, like `soup.find_all('p')`."""
+
+        return self._parser.paragraphs
+
+    @property
+    def strings(self) -> list[str]:
+        """Every non empty text node, like `soup.stripped_strings`."""
+
+        return self._parser.strings
@@ -0,0 +1,3 @@
+from index.base import VectorIndex
+from index.flat import FlatIndex
+from index.ivf import IVFFlatIndex
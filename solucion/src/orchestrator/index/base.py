@@ -0,0 +1,89 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from util import similarity
+
+
+class VectorIndex(ABC):
+    """Nearest-neighbor index over cosine similarity.
+
+    Vectors are identified by integer ids chosen by the caller. `search`
+    returns the ids of the `k` closest vectors and their similarity, best
+    first.
+    """
+
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+
+    @abstractmethod
+    def add(self, ids, vectors) -> None:
+        pass
+
+    @abstractmethod
+    def remove(self, ids) -> None:
+        pass
+
+    @abstractmethod
+    def search(self, query_vector, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def _prepare(self, ids, vectors) -> tuple[np.ndarray, np.ndarray]:
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        vectors = similarity.normalize(similarity.as_matrix(vectors))
+        if len(ids) != len(vectors):
+            raise ValueError(f"{len(ids)} ids for {len(vectors)} vectors")
+        if len(vectors) and vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}"
+            )
+        return ids, vectors
+
+
+class VectorList:
+    """Growable float32 matrix of unit vectors with their ids."""
+
+    def __init__(self, dimension: int) -> None:
+        self.ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: self._size]
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        size = self._size + len(ids)
+        if size > len(self._vectors):
+            capacity = max(size, 2 * len(self._vectors), 16)
+            grown = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+            grown[: self._size] = self.vectors
+            self._vectors = grown
+            grown_ids = np.empty(capacity, dtype=np.int64)
+            grown_ids[: self._size] = self.ids[: self._size]
+            self.ids = grown_ids
+        self._vectors[self._size : size] = vectors
+        self.ids[self._size : size] = ids
+        self._size = size
+
+    def remove(self, ids: np.ndarray) -> int:
+        """Drops the given ids, keeping the order of the rest. Returns the count removed."""
+
+        keep = ~np.isin(self.ids[: self._size], ids)
+        removed = self._size - int(keep.sum())
+        if removed:
+            kept = int(keep.sum())
+            self._vectors[:kept] = self.vectors[keep]
+            self.ids[:kept] = self.ids[: self._size][keep]
+            self._size = kept
+        return removed
+
+    def scores(self, query: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return self.ids[: self._size], self.vectors @ query
@@ -0,0 +1,27 @@
+import numpy as np
+
+from index.base import VectorIndex, VectorList
+from util import similarity
+
+
+class FlatIndex(VectorIndex):
+    """Exact search: every query is compared against every vector."""
+
+    def __init__(self, dimension: int) -> None:
+        super().__init__(dimension)
+        self._list = VectorList(dimension)
+
+    def __len__(self) -> int:
+        return len(self._list)
+
+    def add(self, ids, vectors) -> None:
+        self._list.add(*self._prepare(ids, vectors))
+
+    def remove(self, ids) -> None:
+        self._list.remove(np.asarray(ids, dtype=np.int64).reshape(-1))
+
+    def search(self, query_vector, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        query = similarity.normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+        ids, scores = self._list.scores(query)
+        top = similarity.top_k(scores, k)
+        return ids[top], scores[top]
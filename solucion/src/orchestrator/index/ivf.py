@@ -0,0 +1,143 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from index.base import VectorIndex, VectorList
+from util import logger, similarity
+
+TRAIN_SIZE = 10_000
+SAMPLES_PER_LIST = 64
+KMEANS_ITERATIONS = 10
+RETRAIN_GROWTH = 4
+ASSIGN_BATCH = 65_536
+
+
+class IVFFlatIndex(VectorIndex):
+    """Inverted-file index: vectors are grouped around k-means centroids.
+
+    A query is compared against the centroids first and then only against
+    the vectors of the `n_probe` closest lists, so a search touches roughly
+    `n_probe / n_lists` of the corpus. More probes means better recall and
+    slower queries; `benchmarks/bench_ann.py` measures the trade-off.
+
+    Below `train_size` vectors the index answers with an exact scan. It is
+    trained, with `n_lists = 4 * sqrt(n)` unless given, once it reaches that
+    size, and retrained whenever it has grown `RETRAIN_GROWTH` times since.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        train_size: int = TRAIN_SIZE,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(dimension)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size
+        self._rng = np.random.default_rng(seed)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: list[VectorList] = []
+        self._pending = VectorList(dimension)
+        self._trained_on = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._pending) + sum(len(inverted) for inverted in self._lists)
+
+    def add(self, ids, vectors) -> None:
+        ids, vectors = self._prepare(ids, vectors)
+        if not self.is_trained:
+            self._pending.add(ids, vectors)
+            if len(self._pending) >= self.train_size:
+                self.train()
+            return
+
+        self._assign(ids, vectors)
+        if len(self) >= RETRAIN_GROWTH * self._trained_on:
+            self.train()
+
+    def remove(self, ids) -> None:
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        self._pending.remove(ids)
+        for inverted in self._lists:
+            inverted.remove(ids)
+
+    def train(self) -> None:
+        """Clusters every stored vector and rebuilds the inverted lists."""
+
+        ids, vectors = self._all()
+        if not len(ids):
+            return
+        n_lists = self.n_lists or max(1, int(4 * math.sqrt(len(ids))))
+        n_lists = min(n_lists, len(ids))
+
+        sample_size = min(len(ids), n_lists * SAMPLES_PER_LIST)
+        sample = vectors[self._rng.choice(len(ids), sample_size, replace=False)]
+        self._centroids = self._kmeans(sample, n_lists)
+        self._lists = [VectorList(self.dimension) for _ in range(n_lists)]
+        self._pending = VectorList(self.dimension)
+        self._assign(ids, vectors)
+        self._trained_on = len(ids)
+        logger.info(f"IVF INDEX TRAINED: {len(ids)} vectors, {n_lists} lists")
+
+    def _all(self) -> tuple[np.ndarray, np.ndarray]:
+        parts = [self._pending] + self._lists
+        ids = np.concatenate([part.ids[: len(part)] for part in parts])
+        vectors = np.concatenate([part.vectors for part in parts])
+        return ids, vectors
+
+    def _kmeans(self, sample: np.ndarray, n_lists: int) -> np.ndarray:
+        """Spherical k-means: centroids are kept at unit length."""
+
+        centroids = sample[self._rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = self._nearest(sample, centroids)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums[~empty] = np.add.reduceat(sample[order], starts[~empty])
+            if empty.any():
+                sums[empty] = sample[self._rng.choice(len(sample), int(empty.sum()))]
+            centroids = similarity.normalize(sums)
+        return centroids
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.intp)
+        for start in range(0, len(vectors), ASSIGN_BATCH):
+            batch = vectors[start : start + ASSIGN_BATCH]
+            labels[start : start + ASSIGN_BATCH] = np.argmax(batch @ centroids.T, axis=1)
+        return labels
+
+    def _assign(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        labels = self._nearest(vectors, self._centroids)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(len(self._lists) + 1))
+        for label in np.flatnonzero(np.diff(bounds)):
+            rows = order[bounds[label] : bounds[label + 1]]
+            self._lists[label].add(ids[rows], vectors[rows])
+
+    def search(self, query_vector, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        query = similarity.normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+        if self.is_trained:
+            probes = similarity.top_k(self._centroids @ query, self.n_probe)
+            parts = [self._lists[i] for i in probes] + [self._pending]
+        else:
+            parts = [self._pending]
+
+        scored = [part.scores(query) for part in parts if len(part)]
+        if not scored:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = np.concatenate([part_ids for part_ids, _ in scored])
+        scores = np.concatenate([part_scores for _, part_scores in scored])
+        top = similarity.top_k(scores, k)
+        return ids[top], scores[top]
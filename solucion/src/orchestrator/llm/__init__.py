@@ -0,0 +1,2 @@
+from llm.huggingface import HuggingFaceClient
+from llm.streaming import StreamError, TokenStream
@@ -0,0 +1,114 @@
+import time
+from typing import Any
+
+from llm.streaming import AsyncTokenStream, StreamError, TokenStream, aiter_tokens, iter_tokens
+from util.http import get_async_session, get_session
+
+CONNECT_TIMEOUT = 10
+# Longest wait for the next bytes of the answer, the first token included
+READ_TIMEOUT = 120
+
+
+class HuggingFaceClient:
+    """Streaming client for the Hugging Face text-generation inference API."""
+
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str | None,
+        max_new_tokens: int = 500,
+        temperature: float = 0.7,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+    ) -> None:
+        self.api_url = api_url
+        self.api_key = api_key
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def payload(self, prompt: str) -> dict[str, Any]:
+        return {
+            "inputs": prompt,
+            "stream": True,
+            "parameters": {
+                "max_new_tokens": self.max_new_tokens,
+                "temperature": self.temperature,
+            },
+        }
+
+    def stream(self, prompt: str) -> TokenStream:
+        """Sends the prompt and returns a stream of decoded tokens.
+
+        The pooled connection is given back once the stream ends, fails or
+        is rejected; network errors and timeouts are raised as `StreamError`.
+        """
+
+        import requests
+
+        started = time.perf_counter()
+        try:
+            response = get_session().post(
+                self.api_url,
+                headers=self.headers(),
+                json=self.payload(prompt),
+                stream=True,
+                timeout=(self.connect_timeout, self.read_timeout),
+            )
+        except requests.RequestException as error:
+            raise StreamError(f"Error en la solicitud: {error}") from error
+        if response.status_code != 200:
+            response.close()
+            raise StreamError(
+                f"Error en la solicitud: {response.status_code}", response.status_code
+            )
+
+        def lines():
+            try:
+                yield from response.iter_lines()
+            except requests.RequestException as error:
+                raise StreamError(f"Error en la solicitud: {error}") from error
+            finally:
+                response.close()
+
+        return TokenStream(iter_tokens(lines()), started)
+
+    async def astream(self, prompt: str) -> AsyncTokenStream:
+        """Async counterpart of `stream`, backed by the shared aiohttp session."""
+
+        import asyncio
+
+        import aiohttp
+
+        started = time.perf_counter()
+        session = get_async_session()
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=self.connect_timeout, sock_read=self.read_timeout
+        )
+        try:
+            response = await session.post(
+                self.api_url, headers=self.headers(), json=self.payload(prompt), timeout=timeout
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise StreamError(f"Error en la solicitud: {error!r}") from error
+        if response.status != 200:
+            response.release()
+            raise StreamError(f"Error en la solicitud: {response.status}", response.status)
+
+        async def lines():
+            try:
+                async for line in response.content:
+                    yield line
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                raise StreamError(f"Error en la solicitud: {error!r}") from error
+            finally:
+                response.release()
+
+        return AsyncTokenStream(aiter_tokens(lines()), started)
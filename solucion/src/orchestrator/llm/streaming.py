@@ -0,0 +1,148 @@
+import json
+import time
+from dataclasses import dataclass
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional, Union
+
+from util.tracing import tracer
+
+Line = Union[bytes, str]
+
+
+class StreamError(Exception):
+    """Raised when the LLM endpoint rejects the request or reports an error."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class StreamStats:
+    """Latency figures of a single streamed generation."""
+
+    tokens: int = 0
+    time_to_first_token: Optional[float] = None
+    total_time: float = 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.time_to_first_token is None:
+            return 0.0
+        generation_time = self.total_time - self.time_to_first_token
+        if generation_time <= 0:
+            return float(self.tokens)
+        return self.tokens / generation_time
+
+
+def parse_line(line: Line) -> Optional[str]:
+    """Parses one line of a streamed response into the text it carries.
+
+    Handles text-generation-inference SSE frames (`data:{"token": ...}`),
+    non streaming JSON answers (`[{"generated_text": ...}]`) and, as a last
+    resort, plain text lines. Returns None for frames without text.
+    """
+
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    line = line.rstrip("\r\n")
+    if not line or line.startswith(":") or line.startswith("event:"):
+        return None
+
+    if line.startswith("data:"):
+        payload = line[5:].strip()
+        if not payload or payload == "[DONE]":
+            return None
+        try:
+            frame = json.loads(payload)
+        except ValueError as error:
+            raise StreamError(f"Frame inválido: {payload[:100]}") from error
+        if not isinstance(frame, dict):
+            raise StreamError(f"Frame inválido: {payload[:100]}")
+        if "error" in frame:
+            raise StreamError(frame["error"])
+        token = frame.get("token") or {}
+        if not isinstance(token, dict):
+            raise StreamError(f"Frame inválido: {payload[:100]}")
+        if token.get("special"):
+            return None
+        return token.get("text") or None
+
+    try:
+        body = json.loads(line)
+    except ValueError:
+        return line + "\n"
+    if isinstance(body, list) and body and isinstance(body[0], dict):
+        return body[0].get("generated_text")
+    if isinstance(body, dict) and "error" in body:
+        raise StreamError(body["error"])
+    return line + "\n"
+
+
+def iter_tokens(lines: Iterable[Line]) -> Iterator[str]:
+    """Yields decoded tokens from an iterable of response lines."""
+
+    for line in lines:
+        token = parse_line(line)
+        if token:
+            yield token
+
+
+async def aiter_tokens(lines: AsyncIterable[Line]) -> AsyncIterator[str]:
+    """Async counterpart of `iter_tokens`."""
+
+    async for line in lines:
+        token = parse_line(line)
+        if token:
+            yield token
+
+
+class TokenStream:
+    """Iterates over generated tokens while recording `StreamStats`.
+
+    Tokens are kept in a list and joined once, so building the final answer
+    is linear in its length.
+    """
+
+    def __init__(self, tokens: Iterable[str], started: Optional[float] = None) -> None:
+        self._tokens = tokens
+        self._started = started if started is not None else time.perf_counter()
+        self._parts: list[str] = []
+        self.stats = StreamStats()
+
+    def __iter__(self) -> Iterator[str]:
+        for token in self._tokens:
+            self._record(token)
+            yield token
+        self._finish()
+
+    def _record(self, token: str) -> None:
+        if self.stats.time_to_first_token is None:
+            self.stats.time_to_first_token = time.perf_counter() - self._started
+        self.stats.tokens += 1
+        self._parts.append(token)
+
+    def _finish(self) -> None:
+        self.stats.total_time = time.perf_counter() - self._started
+        if self.stats.time_to_first_token is not None:
+            tracer.record("llm_first_token", self.stats.time_to_first_token)
+        tracer.record("llm", self.stats.total_time, tokens=self.stats.tokens)
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+
+class AsyncTokenStream(TokenStream):
+    """`TokenStream` over an async iterable of tokens."""
+
+    def __init__(
+        self, tokens: AsyncIterable[str], started: Optional[float] = None
+    ) -> None:
+        super().__init__([], started)
+        self._atokens = tokens
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        async for token in self._atokens:
+            self._record(token)
+            yield token
+        self._finish()
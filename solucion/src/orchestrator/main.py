@@ -1,9 +1,22 @@
 import requests
-from bs4 import BeautifulSoup
+import contextvars
 import json
+import math
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from dotenv import load_dotenv
 
+from cache import PageCache, SearchCache
+from cache.page import CachedPage
+from extraction import StreamingExtractor, charset, get_engine, is_html
+from llm import HuggingFaceClient, StreamError
+from memory import ConversationMemory
+from prompt import pack_context
+from util.http import get_session
+from util.logger import logger, setup_logging
+from util.tracing import tracer
+
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
 
@@ -11,8 +24,48 @@ load_dotenv()
 serper_api_key = os.getenv("SERPER_API_KEY")
 huggingface_api_key = os.getenv("HUGGING_FACE_API_KEY")
 
-def search_google(query: str):
-    url = "https://google.serper.dev/search"
+# Motor de extracción de HTML (selectolax, lxml o beautifulsoup); por defecto el más rápido instalado.
+# "beautifulsoup" reproduce el comportamiento anterior en HTML mal formado (ver README)
+HTML_ENGINE = os.getenv("HTML_ENGINE")
+
+# Endpoints de búsqueda y del modelo; se pueden reemplazar, por ejemplo por los servicios locales de benchmarks/standins.py
+SERPER_API_URL = os.getenv("SERPER_API_URL", "https://google.serper.dev/search")
+HUGGING_FACE_API_URL = os.getenv(
+    "HUGGING_FACE_API_URL", "https://api-inference.huggingface.co/models/mistralai/Mistral-7B"
+)
+
+# Extracción concurrente: cantidad de páginas en paralelo y tiempo máximo por URL (segundos)
+EXTRACTION_WORKERS = 5
+EXTRACTION_TIMEOUT = 10
+
+# Extracción por streaming: tamaño de cada lectura y límites de bytes descargados y caracteres de texto
+EXTRACTION_CHUNK_SIZE = 16 * 1024
+EXTRACTION_MAX_BYTES = 2 * 1024 * 1024
+EXTRACTION_MAX_CHARS = 200_000
+
+# Tokens máximos del contenido extraído que se envían al modelo
+CONTEXT_MAX_TOKENS = 3000
+
+# Directorio de las cachés persistentes (búsquedas, páginas)
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+# Tiempos por etapa: cada turno se agrega como líneas JSON a TRACE_FILE y, al salir, los histogramas se escriben en formato Prometheus en METRICS_FILE
+TRACE_FILE = os.getenv("TRACE_FILE")
+METRICS_FILE = os.getenv("METRICS_FILE")
+
+# Configuración de logging: un archivo como logging.conf (por defecto util.logger.logging_config) y salida JSON opcional
+LOG_CONFIG = os.getenv("LOG_CONFIG")
+LOG_JSON = os.getenv("LOG_JSON", "").lower() in ("1", "true", "yes")
+
+def search_google(query: str, cache: SearchCache | None = None):
+    # Las consultas repetidas se responden desde la caché sin llamar a la API
+    cache_key = SearchCache.key(query, gl="ar", hl="es", provider="serper")
+    if cache is not None:
+        cached_links = cache.get(cache_key)
+        if cached_links is not None:
+            return cached_links
+
+    url = SERPER_API_URL
     headers = {
         "X-API-KEY": serper_api_key,
         "Content-Type": "application/json"
@@ -23,42 +76,115 @@ def search_google(query: str):
         "hl": "es"   # Idioma Español
     })
 
-    response = requests.post(url, headers=headers, data=data)
+    response = get_session().post(url, headers=headers, data=data)
     if response.status_code == 200:
         search_results = response.json()
         links = [{"title": result['title'], "link": result['link']} for result in search_results.get('organic', [])][:5]
+        if cache is not None:
+            cache.set(cache_key, links)
         return links
     else:
-        print(f"Error en la búsqueda: {response.status_code} - {response.text}")
+        logger.warning(f"Error en la búsqueda: {response.status_code} - {response.text}")
         return []
 
-def extract_text_from_url(url: str) -> str:
+def extract_text_from_url(url: str, timeout: float | None = EXTRACTION_TIMEOUT, streaming: bool = False, page_cache: PageCache | None = None) -> str:
     if not url:
         return "No se pudo extraer contenido relevante."
+
+    # Las páginas guardadas se revalidan con un GET condicional; un 304 reutiliza el texto sin volver a parsear
+    cache_key = PageCache.key(url, "article")
+    cached = page_cache.get(cache_key) if page_cache is not None else None
+    if cached is not None and page_cache.is_fresh(cached):
+        return cached.text
+    headers = PageCache.conditional_headers(cached)
+
+    if streaming:
+        return _extract_text_streaming(url, timeout, headers, page_cache, cached)
     try:
-        response = requests.get(url)
+        response = get_session().get(url, timeout=timeout, headers=headers)
+        if cached is not None and response.status_code == 304:
+            return page_cache.not_modified(cache_key, cached)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        paragraphs = soup.find_all('p')
-        article_text = "\n".join([para.get_text() for para in paragraphs])
-        if not article_text.strip():
-            article_text = "\n".join(soup.stripped_strings)
-        return article_text.strip() if article_text else "No se pudo extraer contenido relevante."
+        with tracer.span("parse"):
+            text = get_engine(HTML_ENGINE).article_text(response.text)
+        _store_page(page_cache, url, cached, text, response.headers)
+        return text
     
     except requests.RequestException as e:
-        print(f"Error al acceder a la URL {url}: {str(e)}")
+        logger.warning(f"Error al acceder a la URL {url}: {str(e)}")
         return "Error al extraer el contenido."
 
-def extract_texts_from_search_results(query: str):
-    search_results = search_google(query)
+def _extract_text_streaming(url: str, timeout: float | None, headers: dict | None = None, page_cache: PageCache | None = None, cached: CachedPage | None = None) -> str:
+    """Descarga la página por partes y deja de leer al llegar al límite de bytes, texto o tiempo."""
+    try:
+        deadline = time.monotonic() + timeout if timeout else None
+        with get_session().get(url, timeout=timeout, stream=True, headers=headers) as response:
+            if cached is not None and response.status_code == 304:
+                return page_cache.not_modified(PageCache.key(url, "article"), cached)
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type")
+            if not is_html(content_type):
+                return "No se pudo extraer contenido relevante."
 
-    if not search_results:
-        return []
+            # La descarga y el parseo se intercalan: el span "parse" suma solo el tiempo del extractor
+            extractor = StreamingExtractor(charset(content_type), EXTRACTION_MAX_BYTES, EXTRACTION_MAX_CHARS)
+            parse_time = 0.0
+            for chunk in response.iter_content(chunk_size=EXTRACTION_CHUNK_SIZE):
+                started = time.perf_counter()
+                more = extractor.feed(chunk)
+                parse_time += time.perf_counter() - started
+                if not more or (deadline and time.monotonic() > deadline):
+                    break
+            started = time.perf_counter()
+            extractor.close()
+            tracer.record("parse", parse_time + time.perf_counter() - started)
+
+        article_text = "\n".join(extractor.paragraphs)
+        if not article_text.strip():
+            article_text = "\n".join(extractor.strings)
+        if not article_text.strip():
+            return "No se pudo extraer contenido relevante."
+        _store_page(page_cache, url, cached, article_text.strip(), response.headers)
+        return article_text.strip()
+
+    except requests.RequestException as e:
+        logger.warning(f"Error al acceder a la URL {url}: {str(e)}")
+        return "Error al extraer el contenido."
+
+def _store_page(page_cache: PageCache | None, url: str, cached: CachedPage | None, text: str, headers) -> None:
+    if page_cache is None:
+        return
+    if cached is not None:
+        page_cache.modified()
+    page_cache.store(PageCache.key(url, "article"), text, headers)
+
+def extract_texts_from_search_results(
+    query: str,
+    concurrent: bool = True,
+    max_workers: int = EXTRACTION_WORKERS,
+    timeout: float = EXTRACTION_TIMEOUT,
+    streaming: bool = False,
+    search_cache: SearchCache | None = None,
+    page_cache: PageCache | None = None,
+):
+    with tracer.span("extract", query=query):
+        with tracer.span("search"):
+            search_results = search_google(query, search_cache)
+
+        if not search_results:
+            return []
+
+        if concurrent:
+            contents = _extract_concurrently(search_results, max_workers, timeout, streaming, page_cache)
+        else:
+            contents = []
+            for result in search_results:
+                contents.append(_extract_page(result['link'], timeout, streaming, page_cache))
+                # Como en el camino concurrente, cada página se informa al terminar
+                print(f"Extrayendo contenido de: {result['link']}")
 
     extracted_texts = []
-    for result in search_results:
-        print(f"Extrayendo contenido de: {result['link']}")
-        text = extract_text_from_url(result['link'])
+    for result, text in zip(search_results, contents):
         extracted_texts.append({
             "title": result['title'],
             "link": result['link'],
@@ -67,56 +193,109 @@ def extract_texts_from_search_results(query: str):
     
     return extracted_texts
 
-def interact_with_llm_huggingface_streaming(user_input: str, extracted_texts: list):
+def _extract_page(url: str, timeout: float | None, streaming: bool, page_cache: PageCache | None) -> str:
+    with tracer.span("fetch", url=url):
+        return extract_text_from_url(url, timeout, streaming, page_cache)
+
+def _extract_concurrently(search_results: list, max_workers: int, timeout: float, streaming: bool = False, page_cache: PageCache | None = None) -> list:
+    """Extrae las páginas en paralelo y devuelve los textos en el orden del ranking.
+
+    `timeout` se aplica a cada URL; como las páginas se procesan en tandas de
+    `max_workers`, el tiempo total nunca supera `timeout` por tanda.
+    """
+    contents = ["Error al extraer el contenido."] * len(search_results)
+    deadline = timeout * math.ceil(len(search_results) / max_workers)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {
+        # Cada hilo recibe una copia del contexto para que sus tiempos queden dentro del turno
+        executor.submit(contextvars.copy_context().run, _extract_page, result['link'], timeout, streaming, page_cache): rank
+        for rank, result in enumerate(search_results)
+    }
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            rank = futures[future]
+            print(f"Extrayendo contenido de: {search_results[rank]['link']}")
+            contents[rank] = future.result()
+    except FuturesTimeoutError:
+        for future, rank in futures.items():
+            if not future.done():
+                logger.warning(f"Tiempo de espera agotado para: {search_results[rank]['link']}")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return contents
+
+def interact_with_llm_huggingface_streaming(user_input: str, extracted_texts: list, memory: ConversationMemory | None = None):
     if not user_input.strip():
         print("La entrada del usuario está vacía. No se realizará la solicitud.")
         return None
 
-    extracted_info = "\n\n".join([f"Título: {item['title']}\nEnlace: {item['link']}\nContenido:\n{item.get('content', 'Contenido no disponible.')}" for item in extracted_texts])
+    # Solo se envían al modelo los fragmentos más relevantes para la pregunta
+    with tracer.span("pack_context"):
+        packed = pack_context(user_input, extracted_texts, CONTEXT_MAX_TOKENS)
+    extracted_info = packed.text
+    print(f"Contexto enviado: {packed.tokens_used} de {packed.tokens_available} tokens disponibles")
 
-    prompt = f"Información extraída:\n{extracted_info}\n\nPregunta del usuario: {user_input}\n\nGenera una respuesta basada en la información anterior."
-    
-    api_url = "https://api-inference.huggingface.co/models/mistralai/Mistral-7B"
-    
-    headers = {
-        "Authorization": f"Bearer {huggingface_api_key}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "inputs": prompt,
-        "stream": True,
-        "parameters": {
-            "max_new_tokens": 500,
-            "temperature": 0.7
-        }
-    }
+    history = memory.render() if memory else ""
+    history_section = f"Historial de la conversación:\n{history}\n\n" if history else ""
 
-    response = requests.post(api_url, headers=headers, json=data, stream=True)
+    prompt = f"Información extraída:\n{extracted_info}\n\n{history_section}Pregunta del usuario: {user_input}\n\nGenera una respuesta basada en la información anterior."
 
-    if response.status_code != 200:
-        print(f"Error en la solicitud: {response.status_code}")
+    client = HuggingFaceClient(HUGGING_FACE_API_URL, huggingface_api_key)
+    try:
+        stream = client.stream(prompt)
+        print("Generando respuesta en tiempo real:\n")
+        for token in stream:
+            print(token, end="", flush=True)  # Mostrar cada token apenas llega
+        print()
+    except StreamError as e:
+        logger.error(str(e))
         return None
 
-    print("Generando respuesta en tiempo real:\n")
-    generated_response = ""
-    for line in response.iter_lines():
-        if line:  # Verificar si la línea no está vacía
-            print(line.decode('utf-8'))  # Imprimir la línea decodificada
-            generated_response += line.decode('utf-8') + "\n"  # Agregar la línea directamente
+    stats = stream.stats
+    if stats.time_to_first_token is not None:
+        print(f"\n[Primer token: {stats.time_to_first_token:.2f}s | {stats.tokens_per_second:.1f} tokens/s]")
+
+    if packed.sources:
+        print("\nReferencias:")
+        for source in packed.sources:
+            print(f"- [{source['title']}]({source['link']})")
 
-    return generated_response
+    if memory is not None:
+        memory.add(user_input, stream.text)
+
+    return stream.text
 
 if __name__ == "__main__":
-    query = input("Ingrese su consulta: ")
-    extracted_texts = extract_texts_from_search_results(query)
+    setup_logging(LOG_CONFIG, json_output=LOG_JSON)
+    tracer.jsonl_path = TRACE_FILE
+    memory = ConversationMemory()
+    search_cache = SearchCache(os.path.join(CACHE_DIR, "search.sqlite3"))
+    page_cache = PageCache(os.path.join(CACHE_DIR, "pages.sqlite3"))
 
-    # Mostrar los textos extraídos
-    for i, text_data in enumerate(extracted_texts, 1):
-        print(f"\nResultado {i}: {text_data['title']} ({text_data['link']})")
-        print(f"Contenido extraído:\n{text_data['content'][:1000]}...")  # Limitar a los primeros 1000 caracteres
+    try:
+        while True:
+            query = input("Ingrese su consulta (o 'salir' para terminar): ")
+            if query.strip().lower() == "salir":
+                break
+            # Cada vuelta es una sola traza: la búsqueda, las páginas y la respuesta cuelgan de "turn"
+            with tracer.span("turn"):
+                extracted_texts = extract_texts_from_search_results(query, streaming=True, search_cache=search_cache, page_cache=page_cache)
 
-    user_input = input("\nHaz una pregunta basada en la información extraída: ")
-    response = interact_with_llm_huggingface_streaming(user_input, extracted_texts)
-    
-    if response:
-        print("\nRespuesta generada por el modelo:\n", response)
+                # Mostrar los textos extraídos
+                for i, text_data in enumerate(extracted_texts, 1):
+                    print(f"\nResultado {i}: {text_data['title']} ({text_data['link']})")
+                    print(f"Contenido extraído:\n{text_data['content'][:1000]}...")  # Limitar a los primeros 1000 caracteres
+
+                user_input = input("\nHaz una pregunta basada en la información extraída: ")
+                with tracer.span("answer"):
+                    response = interact_with_llm_huggingface_streaming(user_input, extracted_texts, memory)
+
+                if response:
+                    print("\nRespuesta generada por el modelo:\n", response)
+    finally:
+        # También al salir con Ctrl-C o fin de entrada
+        if METRICS_FILE:
+            with open(METRICS_FILE, "w", encoding="utf-8") as metrics_file:
+                metrics_file.write(tracer.prometheus())
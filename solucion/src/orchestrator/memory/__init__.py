@@ -0,0 +1 @@
+from memory.conversation import ConversationMemory
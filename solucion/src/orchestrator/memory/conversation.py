@@ -0,0 +1,128 @@
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from util.tokens import count_tokens, truncate_to_tokens
+
+
+@dataclass
+class Turn:
+    user: str
+    assistant: str
+    tokens: int
+
+    def render(self) -> str:
+        return f"Usuario: {self.user}\nAsistente: {self.assistant}"
+
+
+# Receives the current summary and the turns that just left the verbatim
+# window, and returns the new summary.
+Summarizer = Callable[[str, list[Turn]], str]
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+SUMMARY_SENTENCE_TOKENS = 40
+
+
+def _first_sentence(text: str) -> str:
+    sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    return truncate_to_tokens(sentence, SUMMARY_SENTENCE_TOKENS)
+
+
+def extractive_summarizer(summary: str, turns: list[Turn]) -> str:
+    """Appends one line per evicted turn; earlier lines are left untouched."""
+
+    lines = [summary] if summary else []
+    for turn in turns:
+        lines.append(
+            f"- El usuario preguntó: {_first_sentence(turn.user)} "
+            f"Respuesta: {_first_sentence(turn.assistant)}"
+        )
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """Conversation history with a fixed token budget.
+
+    The most recent turns are kept verbatim within `max_tokens`; the latest
+    one is always kept, cut to that budget when it is larger. Turns that
+    fall out of that window are folded into a rolling summary of at most
+    `summary_max_tokens`; only the evicted turns are passed to the summarizer,
+    so earlier turns are never summarized twice. The rendered history never
+    exceeds `max_tokens + summary_max_tokens`, however long the session runs.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1000,
+        summary_max_tokens: int = 250,
+        summarizer: Optional[Summarizer] = None,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer or extractive_summarizer
+        self.summary = ""
+        self.turns: deque[Turn] = deque()
+        self._turn_tokens = 0
+
+    def add(self, user: str, assistant: str) -> None:
+        """Adds a turn; the latest turn is always kept, cut to `max_tokens` if needed."""
+
+        turn = self._fit(Turn(user, assistant, 0))
+        self.turns.append(turn)
+        self._turn_tokens += turn.tokens
+
+        evicted = []
+        while self._turn_tokens > self.max_tokens and len(self.turns) > 1:
+            oldest = self.turns.popleft()
+            self._turn_tokens -= oldest.tokens
+            evicted.append(oldest)
+
+        if evicted:
+            self.summary = self._clip_summary(self.summarizer(self.summary, evicted))
+
+    def _fit(self, turn: Turn) -> Turn:
+        """Cuts the answer, and a question longer than half the budget, to fit in `max_tokens`."""
+
+        turn.tokens = count_tokens(turn.render())
+        if turn.tokens <= self.max_tokens:
+            return turn
+        if count_tokens(turn.user) > self.max_tokens // 2:
+            turn.user = truncate_to_tokens(turn.user, self.max_tokens // 2)
+            turn.tokens = count_tokens(turn.render())
+        while turn.tokens > self.max_tokens and (turn.assistant or turn.user):
+            overflow = turn.tokens - self.max_tokens
+            if turn.assistant:
+                turn.assistant = truncate_to_tokens(
+                    turn.assistant, count_tokens(turn.assistant) - overflow
+                )
+            else:
+                turn.user = truncate_to_tokens(turn.user, count_tokens(turn.user) - overflow)
+            turn.tokens = count_tokens(turn.render())
+        return turn
+
+    def _clip_summary(self, summary: str) -> str:
+        """Drops the oldest summary lines until it fits in its budget."""
+
+        lines = summary.splitlines()
+        while lines and count_tokens("\n".join(lines)) > self.summary_max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    @property
+    def tokens(self) -> int:
+        return count_tokens(self.summary) + self._turn_tokens
+
+    def render(self) -> str:
+        sections = []
+        if self.summary:
+            sections.append(f"Resumen de la conversación anterior:\n{self.summary}")
+        if self.turns:
+            recent = "\n".join(turn.render() for turn in self.turns)
+            sections.append(f"Historial reciente:\n{recent}")
+        return "\n\n".join(sections)
+
+    def clear(self) -> None:
+        self.summary = ""
+        self.turns.clear()
+        self._turn_tokens = 0
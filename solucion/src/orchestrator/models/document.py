@@ -1,9 +1,87 @@
-from pydantic import BaseModel
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Sequence
 
+import numpy as np
+
+from util import similarity
+
+
+@dataclass(slots=True)
+class Document:
+    """A retrieved chunk.
+
+    `vector` is a float32 row, usually a view into the matrix of the batch
+    the chunk came from, or None when the caller asked to leave it out.
+    """
 
-class Document(BaseModel):
     text: str
     url: str
-    vector: list[float]
-    similarity: float
+    vector: Optional[np.ndarray] = None
+    similarity: float = 0.0
+
+    def to_dict(self, include_vector: bool = False) -> dict[str, Any]:
+        data: dict[str, Any] = {"text": self.text, "url": self.url, "similarity": self.similarity}
+        if include_vector and self.vector is not None:
+            data["vector"] = self.vector.tolist()
+        return data
+
+
+class DocumentBatch:
+    """Chunks of one retrieval, with their vectors stacked in one float32 matrix.
+
+    The batch is validated once as a whole instead of chunk by chunk, and
+    `documents` only builds `Document` objects for the rows a caller asks for.
+    """
+
+    __slots__ = ("texts", "urls", "vectors")
+
+    def __init__(
+        self,
+        texts: Sequence[str],
+        urls: Sequence[str],
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+    ) -> None:
+        self.texts = list(texts)
+        self.urls = list(urls)
+        self.vectors = similarity.as_matrix(vectors) if len(self.texts) else np.empty((0, 0), np.float32)
+        self._validate()
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "DocumentBatch":
+        """Builds a batch from `{"text", "url", "vector"}` dicts."""
+
+        records = list(records)
+        return cls(
+            [record["text"] for record in records],
+            [record["url"] for record in records],
+            [record["vector"] for record in records],
+        )
+
+    def _validate(self) -> None:
+        if not len(self.texts) == len(self.urls) == len(self.vectors):
+            raise ValueError(
+                f"{len(self.texts)} texts, {len(self.urls)} urls and "
+                f"{len(self.vectors)} vectors in one batch"
+            )
+        if not all(isinstance(text, str) for text in self.texts):
+            raise TypeError("Document texts must be strings")
+        if not all(isinstance(url, str) for url in self.urls):
+            raise TypeError("Document urls must be strings")
+        if not np.isfinite(self.vectors).all():
+            raise ValueError("Document vectors must be finite")
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def documents(
+        self, rows: Iterable[int], scores: Iterable[float], include_vectors: bool = True
+    ) -> list[Document]:
+        return [
+            Document(
+                text=self.texts[i],
+                url=self.urls[i],
+                vector=self.vectors[i] if include_vectors else None,
+                similarity=float(score),
+            )
+            for i, score in zip(rows, scores)
+        ]
@@ -1 +1,2 @@
 from prompt.prompt import rag
+from prompt.packing import pack_context
@@ -0,0 +1,157 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+
+from util.tokens import count_tokens, split_offset
+
+NO_CONTENT = "Contenido no disponible."
+
+_WORD = re.compile(r"\w+")
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+@dataclass
+class Chunk:
+    source: int
+    position: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+@dataclass
+class PackedContext:
+    """Context selected for the prompt and how much of the budget it uses."""
+
+    text: str
+    sources: list[dict] = field(default_factory=list)
+    tokens_used: int = 0
+    tokens_available: int = 0
+
+
+def _terms(text: str) -> list[str]:
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    ascii_text = "".join(c for c in normalized if not unicodedata.combining(c))
+    return _WORD.findall(ascii_text)
+
+
+def _paragraphs(text: str, chunk_tokens: int):
+    """Yields the paragraphs of `text`, cutting the ones above `chunk_tokens`."""
+
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        while count_tokens(paragraph) > chunk_tokens:
+            offset = split_offset(paragraph, chunk_tokens)
+            # Cut at the last space that fits, so words stay whole
+            cut = paragraph.rfind(" ", 0, offset)
+            offset = cut if cut > 0 else max(offset, 1)
+            yield paragraph[:offset]
+            paragraph = paragraph[offset:].strip()
+        if paragraph:
+            yield paragraph
+
+
+def split_into_chunks(text: str, chunk_tokens: int) -> list[str]:
+    """Groups consecutive paragraphs into chunks of about `chunk_tokens`."""
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for paragraph in _paragraphs(text, chunk_tokens):
+        tokens = count_tokens(paragraph)
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def score_chunks(question: str, chunks: list[Chunk]) -> None:
+    """Scores every chunk against the question with BM25."""
+
+    query_terms = set(_terms(question))
+    if not chunks or not query_terms:
+        return
+
+    chunk_terms = [Counter(_terms(chunk.text)) for chunk in chunks]
+    average_length = sum(sum(terms.values()) for terms in chunk_terms) / len(chunks) or 1
+    document_frequency = Counter(
+        term for terms in chunk_terms for term in query_terms if term in terms
+    )
+
+    for chunk, terms in zip(chunks, chunk_terms):
+        length = sum(terms.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = terms.get(term)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (len(chunks) - df + 0.5) / (df + 0.5))
+            score += idf * frequency * (K1 + 1) / (
+                frequency + K1 * (1 - B + B * length / average_length)
+            )
+        chunk.score = score
+
+
+def _header(item: dict) -> str:
+    return f"Título: {item['title']}\nEnlace: {item['link']}\nContenido:\n"
+
+
+def pack_context(
+    question: str, extracted_texts: list, max_tokens: int = 3000, chunk_tokens: int = 200
+) -> PackedContext:
+    """Packs the chunks most relevant to `question` into `max_tokens`.
+
+    Chunks are picked by BM25 score (search rank and position break ties)
+    and then rendered grouped by source, in rank order, under the same
+    "Título/Enlace/Contenido" headers, so every piece of text keeps its
+    attribution.
+    """
+
+    chunks: list[Chunk] = []
+    for source, item in enumerate(extracted_texts):
+        content = item.get("content") or NO_CONTENT
+        for position, text in enumerate(split_into_chunks(content, chunk_tokens)):
+            chunks.append(Chunk(source, position, text, count_tokens(text)))
+
+    header_tokens = [count_tokens(_header(item)) for item in extracted_texts]
+    available = sum(chunk.tokens for chunk in chunks) + sum(header_tokens)
+
+    score_chunks(question, chunks)
+    ranked = sorted(chunks, key=lambda c: (-c.score, c.source, c.position))
+
+    selected: list[Chunk] = []
+    used = 0
+    opened: set[int] = set()
+    for chunk in ranked:
+        cost = chunk.tokens + (0 if chunk.source in opened else header_tokens[chunk.source])
+        if used + cost > max_tokens:
+            continue
+        selected.append(chunk)
+        opened.add(chunk.source)
+        used += cost
+
+    selected.sort(key=lambda c: (c.source, c.position))
+    sections = []
+    sources = []
+    for source in sorted(opened):
+        item = extracted_texts[source]
+        body = "\n...\n".join(c.text for c in selected if c.source == source)
+        sections.append(_header(item) + body)
+        sources.append({"title": item["title"], "link": item["link"]})
+
+    return PackedContext(
+        text="\n\n".join(sections),
+        sources=sources,
+        tokens_used=used,
+        tokens_available=available,
+    )
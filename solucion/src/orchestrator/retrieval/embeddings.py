@@ -1,8 +1,62 @@
 from abc import ABC, abstractmethod
+import asyncio
 import json
-import aiohttp
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Iterator, Optional
 
-import openai
+from cache.embedding import EmbeddingCache
+from util import logger
+from util.tokens import count_tokens
+from util.tracing import tracer
+
+# Provider limits per request
+MAX_BATCH_TOKENS = 8_000
+MAX_BATCH_INPUTS = 2_048
+MAX_CONCURRENCY = 4
+MAX_RETRIES = 5
+BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+
+
+def retryable_errors() -> tuple[type[Exception], ...]:
+    """Provider errors worth retrying. openai is only imported when embedding."""
+
+    import openai
+
+    return (
+        openai.error.RateLimitError,
+        openai.error.ServiceUnavailableError,
+        openai.error.Timeout,
+    )
+
+
+@dataclass
+class EmbeddingStats:
+    """Cache and API counters of the embedding calls of one turn.
+
+    `hits` and `misses` count chunks. `saved_inputs` and `saved_tokens` count
+    the inputs that were not sent to the API because the cache (or a
+    duplicate in the same call) answered them, including in calls that still
+    sent the rest; `saved_calls` only counts calls that sent nothing.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    api_calls: int = 0
+    saved_calls: int = 0
+    saved_inputs: int = 0
+    saved_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        return {**asdict(self), "hit_rate": self.hit_rate}
 
 
 class Embeddings(ABC):
@@ -12,15 +66,187 @@ class Embeddings(ABC):
     async def run(self, chunks: list[str]) -> list[list[float]]:
         pass
 
+    @contextmanager
+    def track_stats(self) -> Iterator[None]:
+        """Keeps the statistics of the calls made inside the block apart, e.g. one turn."""
+
+        yield
+
+    def pop_stats(self) -> dict | None:
+        """Cache statistics since the last call, if the client keeps any."""
+
+        return None
+
 
 class OpenAIEmbeddings(Embeddings):
-    """OpenAI embeddings client wrapper"""
+    """OpenAI embeddings client wrapper
+
+    With a cache, only the chunks it does not know yet are sent to the API.
+    Chunks are sent in batches of at most `max_batch_tokens` tokens, with up
+    to `max_concurrency` requests in flight; rate-limited requests are retried
+    with exponential backoff. Vectors come back in the order of `chunks`.
+
+    Statistics are kept per `track_stats` block, which follows the asyncio
+    tasks started inside it, so concurrent turns sharing a client do not mix
+    their counts. Calls outside any block share one `EmbeddingStats`.
+    """
 
     vector_dimension = 1536
 
+    def __init__(
+        self,
+        cache: EmbeddingCache | None = None,
+        max_batch_tokens: int = MAX_BATCH_TOKENS,
+        max_batch_inputs: int = MAX_BATCH_INPUTS,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF,
+    ) -> None:
+        self.cache = cache
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._shared_stats = EmbeddingStats()
+        self._tracked: ContextVar[Optional[EmbeddingStats]] = ContextVar(
+            f"embedding_stats_{id(self)}", default=None
+        )
+
+    @property
+    def stats(self) -> EmbeddingStats:
+        """Statistics of the current `track_stats` block, or the shared ones."""
+
+        return self._tracked.get() or self._shared_stats
+
+    @property
+    def api_calls(self) -> int:
+        return self.stats.api_calls
+
+    @contextmanager
+    def track_stats(self) -> Iterator[EmbeddingStats]:
+        token = self._tracked.set(EmbeddingStats())
+        try:
+            yield self._tracked.get()
+        finally:
+            try:
+                self._tracked.reset(token)
+            except ValueError:
+                # An async generator closed from another context
+                self._tracked.set(None)
+
     async def run(
         self, chunks: list[str], model="text-embedding-ada-002"
     ) -> list[list[float]]:
-        response = await openai.Embedding.acreate(input=chunks, model=model)
-        vectors = map(lambda x: x["embedding"], response["data"])  # type: ignore
-        return list(vectors)
+        stats = self.stats
+        if self.cache is None:
+            return await self.request(chunks, model)
+
+        # SQLite calls block, so they run in a thread, one batch each way
+        loop = asyncio.get_running_loop()
+        keys = [self.cache.key(model, chunk) for chunk in chunks]
+        vectors = await loop.run_in_executor(None, self.cache.get_many, keys)
+        missing: dict[str, list[int]] = {}
+        for i, (chunk, vector) in enumerate(zip(chunks, vectors)):
+            if vector is None:
+                missing.setdefault(chunk, []).append(i)
+            else:
+                stats.saved_tokens += count_tokens(chunk)
+        for text, indices in missing.items():
+            if len(indices) > 1:
+                stats.saved_tokens += count_tokens(text) * (len(indices) - 1)
+        misses = sum(map(len, missing.values()))
+        stats.hits += len(chunks) - misses
+        stats.misses += misses
+        stats.saved_inputs += len(chunks) - len(missing)
+
+        if not missing:
+            stats.saved_calls += 1
+            return vectors
+
+        texts = list(missing)
+        computed = await self.request(texts, model)
+        for text, vector in zip(texts, computed):
+            for i in missing[text]:
+                vectors[i] = vector
+        items = [(self.cache.key(model, text), vector) for text, vector in zip(texts, computed)]
+        await loop.run_in_executor(None, self.cache.set_many, items)
+        return vectors
+
+    def batches(self, chunks: list[str]) -> list[list[int]]:
+        """Groups chunk indices into batches within the provider limits.
+
+        A chunk bigger than `max_batch_tokens` gets a batch of its own.
+        """
+
+        batches: list[list[int]] = []
+        batch: list[int] = []
+        tokens = 0
+        for i, chunk in enumerate(chunks):
+            size = count_tokens(chunk)
+            if batch and (
+                tokens + size > self.max_batch_tokens
+                or len(batch) >= self.max_batch_inputs
+            ):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(i)
+            tokens += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def request(self, chunks: list[str], model: str) -> list[list[float]]:
+        """Embeds `chunks` with concurrent, token-sized batch requests."""
+
+        if not chunks:
+            return []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        batches = self.batches(chunks)
+
+        async def run_batch(batch: list[int]) -> list[list[float]]:
+            async with semaphore:
+                return await self.request_batch([chunks[i] for i in batch], model)
+
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+        vectors: list = [None] * len(chunks)
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    async def request_batch(self, chunks: list[str], model: str) -> list[list[float]]:
+        import openai
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.stats.api_calls += 1
+                with tracer.span("embedding_request", inputs=len(chunks), attempt=attempt):
+                    response = await openai.Embedding.acreate(input=chunks, model=model)
+                break
+            except retryable_errors() as error:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_delay(error, attempt)
+                logger.warning(f"EMBEDDING RETRY {attempt + 1} in {delay:.2f}s: {error}")
+                await asyncio.sleep(delay)
+
+        data = sorted(response["data"], key=lambda x: x.get("index", 0))  # type: ignore
+        return [item["embedding"] for item in data]
+
+    def retry_delay(self, error: Exception, attempt: int) -> float:
+        """Honors Retry-After when the provider sends it, else full-jitter backoff."""
+
+        retry_after = (getattr(error, "headers", None) or {}).get("retry-after")
+        try:
+            return min(float(retry_after), MAX_BACKOFF)
+        except (TypeError, ValueError):
+            return random.uniform(0, min(self.backoff * 2**attempt, MAX_BACKOFF))
+
+    def pop_stats(self) -> dict | None:
+        stats = self.stats
+        snapshot = stats.snapshot()
+        for name in asdict(stats):
+            setattr(stats, name, 0)
+        return snapshot
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from cache.vector import VectorCache
+from models.document import Document, DocumentBatch
+from retrieval.embeddings import Embeddings
+from retrieval.scraper import Scraper
+from retrieval.splitter import Splitter
+from util import logger, similarity
+from util.deadline import Deadline, remaining
+from util.tracing import tracer
+
+MICRO_BATCH = 64
+EMBED_WORKERS = 2
+QUEUE_SIZE = 8
+
+
+class StageTimes:
+    """When each pipeline stage first started and last finished."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.spans: dict[str, list[float]] = {}
+
+    def start(self, stage: str) -> None:
+        now = self.clock()
+        span = self.spans.setdefault(stage, [now, now])
+        span[0] = min(span[0], now)
+
+    def stop(self, stage: str) -> None:
+        self.spans[stage][1] = max(self.spans[stage][1], self.clock())
+
+    def duration(self, stage: str) -> float:
+        start, end = self.spans.get(stage, (0.0, 0.0))
+        return end - start
+
+    def overlap(self, first: str, second: str) -> float:
+        """Seconds during which both stages were running."""
+
+        if first not in self.spans or second not in self.spans:
+            return 0.0
+        (a_start, a_end), (b_start, b_end) = self.spans[first], self.spans[second]
+        return max(0.0, min(a_end, b_end) - max(a_start, b_start))
+
+
+class RetrievalPipeline:
+    """Scrape, split and embed stages connected by bounded queues.
+
+    Each page is split as soon as it is downloaded and its chunks are
+    embedded in micro-batches of up to `micro_batch` chunks, so embedding
+    starts with the first page instead of after the slowest one. A batch is
+    also sent early when no other page is waiting. Scores are folded into a
+    running top-k as vectors come back.
+
+    With a `deadline`, every stage is cancelled when it arrives and the
+    result is built from the chunks embedded so far. Links whose pages were
+    not fully embedded by then are reported as dropped.
+    """
+
+    def __init__(
+        self,
+        scraper: Scraper,
+        splitter: Splitter,
+        embeddings: Embeddings,
+        cache: Optional[VectorCache] = None,
+        micro_batch: int = MICRO_BATCH,
+        embed_workers: int = EMBED_WORKERS,
+        queue_size: int = QUEUE_SIZE,
+    ) -> None:
+        self.scraper = scraper
+        self.splitter = splitter
+        self.embeddings = embeddings
+        self.cache = cache
+        self.micro_batch = micro_batch
+        self.embed_workers = embed_workers
+        self.queue_size = queue_size
+
+    async def run(
+        self,
+        links: list[str],
+        query_vector,
+        k: int,
+        include_vectors: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> tuple[list[Document], StageTimes, list[str]]:
+        pages: asyncio.Queue = asyncio.Queue(self.queue_size)
+        batches: asyncio.Queue = asyncio.Queue(self.queue_size)
+        times = StageTimes()
+        best = similarity.TopK(k)
+        counts = {"pages": 0, "chunks": 0, "embedded": 0}
+        # Pages already split, and chunks of each page still waiting for a vector
+        split_pages: set[str] = set()
+        unembedded: dict[str, int] = {}
+
+        async def timed(stage: str, work: Awaitable, span: Optional[str] = None, **attributes):
+            times.start(stage)
+            try:
+                with tracer.span(span or stage, **attributes):
+                    return await work
+            finally:
+                times.stop(stage)
+
+        async def scrape(link: str) -> None:
+            try:
+                page = await timed("scrape", self.scraper.fetch(link), "fetch", url=link)
+            except Exception as error:
+                logger.warning(f"SCRAPE FAILED: {link} {error!r}")
+                page = {"url": link, "text": None}
+            await pages.put(page)
+
+        async def scrape_all() -> None:
+            await asyncio.gather(*(scrape(link) for link in links))
+            await pages.put(None)
+
+        async def split() -> None:
+            texts: list[str] = []
+            urls: list[str] = []
+            while (page := await pages.get()) is not None:
+                if not page["text"]:
+                    split_pages.add(page["url"])
+                    continue
+                counts["pages"] += 1
+                chunks = await timed("split", self.splitter.split(page["text"]))
+                counts["chunks"] += len(chunks)
+                unembedded[page["url"]] = unembedded.get(page["url"], 0) + len(chunks)
+                split_pages.add(page["url"])
+                texts.extend(chunks)
+                urls.extend([page["url"]] * len(chunks))
+                while len(texts) >= self.micro_batch:
+                    await batches.put((texts[: self.micro_batch], urls[: self.micro_batch]))
+                    del texts[: self.micro_batch], urls[: self.micro_batch]
+                if texts and pages.empty():
+                    await batches.put((texts, urls))
+                    texts, urls = [], []
+            if texts:
+                await batches.put((texts, urls))
+            for _ in range(self.embed_workers):
+                await batches.put(None)
+
+        async def embed() -> None:
+            while (batch := await batches.get()) is not None:
+                texts, urls = batch
+                vectors = await timed("embed", self.embeddings.run(texts), chunks=len(texts))
+                documents = DocumentBatch(texts, urls, vectors)
+                counts["embedded"] += len(documents)
+                if self.cache is not None:
+                    self.cache.add(documents)
+                scores = similarity.cosine_scores(query_vector, documents.vectors)
+                best.extend(scores, [(documents, i) for i in range(len(documents))])
+                for url in urls:
+                    unembedded[url] -= 1
+
+        try:
+            async with asyncio.timeout(remaining(deadline)) as limit:
+                with tracer.span("pipeline", pages=len(links)):
+                    await self._run_stages(
+                        scrape_all(), split(), *(embed() for _ in range(self.embed_workers))
+                    )
+        except TimeoutError:
+            # Only the deadline's own timeout; a client timeout is an error
+            if not limit.expired():
+                raise
+            logger.warning(f"DEADLINE REACHED after {deadline.seconds}s")
+
+        dropped = [
+            link for link in links if link not in split_pages or unembedded.get(link, 0) > 0
+        ]
+
+        logger.info(f"SCRAPE TIME: {times.duration('scrape')}")
+        logger.info(f"SCRAPED PAGES: {counts['pages']}")
+        logger.info(f"SPLIT COUNT: {counts['chunks']}")
+        logger.info(f"EMBEDDED CHUNKS: {counts['embedded']}")
+        logger.info(f"EMBEDDING TIME: {times.duration('embed')}")
+        logger.info(f"SCRAPE/EMBEDDING OVERLAP: {times.overlap('scrape', 'embed')}")
+        if dropped:
+            logger.info(f"DROPPED SOURCES: {len(dropped)}")
+
+        documents = [
+            batch.documents([row], [score], include_vectors)[0]
+            for score, (batch, row) in best.items()
+        ]
+        return documents, times, dropped
+
+    @staticmethod
+    async def _run_stages(*stages: Awaitable) -> None:
+        """Runs the stages in a task group, raising a stage's error as is.
+
+        A single failure comes out of the group as the exception itself, as
+        it would from the sequential retriever, instead of an ExceptionGroup.
+        """
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                for stage in stages:
+                    group.create_task(stage)
+        except BaseExceptionGroup as errors:
+            if len(errors.exceptions) == 1:
+                raise errors.exceptions[0]
+            raise
@@ -1,17 +1,20 @@
 import asyncio
 import json
-import time
-from typing import Any, AsyncGenerator
-import numpy as np
-import pandas as pd
-from util import logger
-from models.document import Document
+from typing import AsyncGenerator
+from util import http, logger, similarity
+from models.document import Document, DocumentBatch
 from retrieval.search import Searcher
 from retrieval.splitter import Splitter
 from retrieval.scraper import Scraper
 from retrieval.embeddings import Embeddings
-from sklearn.metrics.pairwise import cosine_similarity
+from retrieval.pipeline import RetrievalPipeline
 from models.search import SearchDoc, SearchResult
+from cache.vector import VectorCache
+from util.deadline import Deadline, remaining
+from util.tracing import tracer
+
+# Share of a deadline kept for splitting and embedding once scraping stops
+EMBEDDING_RESERVE = 0.25
 
 
 class Retriever:
@@ -21,87 +24,226 @@ class Retriever:
         scraper: Scraper,
         embeddings: Embeddings,
         splitter: Splitter,
+        cache: VectorCache | None = None,
+        include_vectors: bool = False,
+        pipelined: bool = False,
     ) -> None:
         self.searcher = searcher
         self.scraper = scraper
         self.embeddings = embeddings
         self.splitter = splitter
+        self.cache = cache
+        # Whether the documents handed back keep their embedding
+        self.include_vectors = include_vectors
+        # Scrape, split and embed stages overlap instead of running in turn
+        self.pipeline = (
+            RetrievalPipeline(scraper, splitter, embeddings, cache) if pipelined else None
+        )
 
     async def get_context(
-        self, query: str, cache_treshold: float = 0.85, k: int = 10
+        self,
+        query: str,
+        cache_treshold: float = 0.85,
+        k: int = 10,
+        deadline: float | None = None,
     ) -> AsyncGenerator[dict, None]:
-        """Generates context based on query. It can retrieve from cache or from internet."""
+        """Generates context based on query. It can retrieve from cache or from internet.
+
+        With a `deadline` in seconds, search, scraping and embedding all share
+        that budget. When it runs out, outstanding work is cancelled, the
+        context is built from what finished and a "dropped" event lists the
+        stage that was cut and the sources left out.
+        """
+
+        with tracer.span("retrieval", query=query) as turn, self.embeddings.track_stats():
+            budget = Deadline(deadline) if deadline is not None else None
+
+            # Only the budget's own timeout counts as a deadline; a client
+            # timeout raised inside the stage propagates as any other error
+            try:
+                async with asyncio.timeout(remaining(budget)) as limit:
+                    with tracer.span("query_embedding"):
+                        query_vector = await self.embeddings.run([query])
+            except TimeoutError:
+                if not limit.expired():
+                    raise
+                for event in self.dropped_events("query", []):
+                    yield event
+                return
+
+            if self.cache is not None:
+                cached_documents = self.cache.search(
+                    query_vector[0], k, include_vectors=self.include_vectors
+                )
+                if await self.evaluate_retrieval(cached_documents, cache_treshold):
+                    turn.set(source="cache")
+                    yield {"event": "source", "data": "cache"}
+                    self.log_embedding_stats()
+                    context = "\n".join([doc.text for doc in cached_documents])
+                    yield {"event": "context", "data": context}
+                    return
+
+            try:
+                async with asyncio.timeout(remaining(budget)) as limit:
+                    with tracer.span("search"):
+                        search_results = await self.searcher.run(query)
+            except TimeoutError:
+                if not limit.expired():
+                    raise
+                for event in self.dropped_events("search", []):
+                    yield event
+                return
+
+            yield {"event": "search", "data": json.dumps(search_results.model_dump())}
+
+            documents, dropped = await self.fetch_documents(
+                search_results, query_vector, k, budget
+            )
 
-        query_vector = await self.embeddings.run([query])
+            turn.set(source="web", dropped=len(dropped))
+            yield {"event": "source", "data": "web"}
+            self.log_embedding_stats()
+            if dropped:
+                yield {"event": "dropped", "data": json.dumps({"stage": "retrieval", "urls": dropped})}
+            context = "\n".join([doc.text for doc in documents])
+            yield {"event": "context", "data": context}
 
-        search_results = await self.searcher.run(query)
+    async def aclose(self) -> None:
+        """Closes the pooled HTTP connections used by the searcher and the scraper.
 
-        yield {"event": "search", "data": json.dumps(search_results.model_dump())}
+        Call it when the retriever is no longer needed, before the event loop
+        stops; the next request opens a new session.
+        """
 
-        documents = await self.search_for_documents(search_results, query_vector, k)
+        await http.aclose()
 
-        context = "\n".join([doc.text for doc in documents])
-        yield {"event": "context", "data": context}
+    def dropped_events(self, stage: str, urls: list[str]) -> list[dict]:
+        """Events of a turn whose deadline ran out before there was any context."""
+
+        logger.warning(f"DEADLINE REACHED during {stage}")
+        return [
+            {"event": "dropped", "data": json.dumps({"stage": stage, "urls": urls})},
+            {"event": "context", "data": ""},
+        ]
+
+    def log_embedding_stats(self) -> None:
+        """Logs the embedding cache hit rate and the API work it saved in the turn."""
+
+        stats = self.embeddings.pop_stats()
+        if stats is not None:
+            logger.info(
+                f"EMBEDDING CACHE: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%}), {stats['api_calls']} API calls, "
+                f"{stats['saved_inputs']} inputs and {stats['saved_tokens']} tokens saved"
+            )
 
     async def search_for_documents(
-        self, search_results, query_vector, k
+        self, search_results, query_vector, k, deadline: Deadline | None = None
     ) -> list[Document]:
         """Searches for relevant information on the internet."""
 
-        start = time.perf_counter()
+        documents, _ = await self.fetch_documents(
+            search_results, query_vector, k, deadline
+        )
+        return documents
+
+    async def fetch_documents(
+        self, search_results, query_vector, k, deadline: Deadline | None = None
+    ) -> tuple[list[Document], list[str]]:
+        """Most relevant documents, and the links dropped when the deadline ran out."""
 
-        results = search_results.model_dump()
-        tasks = [self.scraper.fetch(item["link"]) for item in results["items"]]
-        pages = await asyncio.gather(*tasks)
+        links = [item.link for item in search_results.items]
 
-        end = time.perf_counter()
-        logger.info(f"SCRAPE TIME: {end - start}")
+        if self.pipeline is not None:
+            documents, _, dropped = await self.pipeline.run(
+                links, query_vector, k, self.include_vectors, deadline
+            )
+            logger.info(f"RETRIEVAL SCORE: {await self.get_mean_similarity(documents)}")
+            return documents, dropped
 
-        documents = []
+        with tracer.span("scrape", pages=len(links)) as scrape:
+            tasks = [asyncio.create_task(self.fetch_page(link)) for link in links]
+            reserve = deadline.seconds * EMBEDDING_RESERVE if deadline is not None else 0
+            done, pending = set(), set()
+            if tasks:
+                done, pending = await asyncio.wait(tasks, timeout=remaining(deadline, reserve))
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                logger.warning(f"DEADLINE REACHED: {len(pending)} pages cancelled")
+        dropped = [link for link, task in zip(links, tasks) if task in pending]
+        pages = []
+        for link, task in zip(links, tasks):
+            if task not in done:
+                continue
+            if task.exception() is not None:
+                logger.warning(f"SCRAPE FAILED: {link} {task.exception()!r}")
+                continue
+            pages.append(task.result())
+
+        logger.info(f"SCRAPE TIME: {scrape.duration}")
+
+        texts, urls = [], []
         page_count = 0
-        for page in pages:
-            if page["text"]:
-                page_count += 1
-                splits = await self.splitter.split(page["text"])
-                for split in splits:
-                    documents.append({"text": split, "url": page["url"]})
+        with tracer.span("split") as split:
+            for page in pages:
+                if page["text"]:
+                    page_count += 1
+                    splits = await self.splitter.split(page["text"])
+                    texts.extend(splits)
+                    urls.extend([page["url"]] * len(splits))
+            split.set(pages=page_count, chunks=len(texts))
 
         logger.info(f"SCRAPED PAGES: {page_count}")
-        logger.info(f"SPLIT COUNT: {len(documents)}")
+        logger.info(f"SPLIT COUNT: {len(texts)}")
 
-        embedding_start_time = time.perf_counter()
-        texts = [doc["text"] for doc in documents]
-        embeddings = await self.embeddings.run(texts)
+        try:
+            async with asyncio.timeout(remaining(deadline)) as limit:
+                with tracer.span("embed", chunks=len(texts)) as embed:
+                    embeddings = await self.embeddings.run(texts)
+        except TimeoutError:
+            if not limit.expired():
+                raise
+            logger.warning("DEADLINE REACHED during embedding")
+            return [], links
+        documents = DocumentBatch(texts, urls, embeddings)
 
-        for i, vector in enumerate(embeddings):
-            documents[i]["vector"] = vector
+        logger.info(f"EMBEDDING TIME: {embed.duration}")
 
-        embedding_time = time.perf_counter() - embedding_start_time
-        logger.info(f"EMBEDDING TIME: {embedding_time}")
+        if self.cache is not None:
+            added = self.cache.add(documents)
+            logger.info(f"CACHED CHUNKS: {added} new, {len(self.cache)} total")
 
-        relevant_documents = await self.get_most_similar(query_vector, documents, k)
+        with tracer.span("rank"):
+            relevant_documents = await self.get_most_similar(
+                query_vector, documents, k, include_vectors=self.include_vectors
+            )
         mean_score = await self.get_mean_similarity(relevant_documents)
 
         logger.info(f"RETRIEVAL SCORE: {mean_score}")
-        return relevant_documents
+        return relevant_documents, dropped
 
-    async def get_most_similar(self, query_vector, data, k=5) -> list[Document]:
-        """Get most relevant texts based on cosine similarity"""
+    async def fetch_page(self, link: str) -> dict:
+        with tracer.span("fetch", url=link):
+            return await self.scraper.fetch(link)
 
-        query_vector = np.array(query_vector).reshape(1, -1)
-
-        def compute_cosine_similarity(row):
-            return cosine_similarity(query_vector, row)[0][0]
+    async def get_most_similar(
+        self, query_vector, data, k=5, include_vectors=True
+    ) -> list[Document]:
+        """Get most relevant texts based on cosine similarity
 
-        df: Any = pd.DataFrame(data)
-        df["vector"] = df["vector"].apply(lambda x: np.array(x).reshape(1, -1))
-        df["similarity"] = df["vector"].apply(compute_cosine_similarity)
-        similar = df.nlargest(k, "similarity")[["text", "url", "vector", "similarity"]]
-        similar["vector"] = similar["vector"].apply(lambda x: x[0].tolist())
+        `data` is a `DocumentBatch` or a list of `{"text", "url", "vector"}` dicts.
+        """
 
-        json_docs = similar.to_dict("records")
+        if not isinstance(data, DocumentBatch):
+            data = DocumentBatch.from_records(data)
+        if not len(data):
+            return []
 
-        return [Document(**json_doc) for json_doc in json_docs]
+        scores = similarity.cosine_scores(query_vector, data.vectors)
+        top = similarity.top_k(scores, k)
+        return data.documents(top, scores[top], include_vectors)
 
     async def evaluate_retrieval(
         self, documents: list[Document], treshold: float
@@ -1,48 +1,397 @@
 from abc import ABC, abstractmethod
+import asyncio
+import random
 import re
-from typing import Any
+import time
+from typing import Any, Callable
+from urllib.parse import urlsplit
 
-import aiohttp
-from bs4 import BeautifulSoup
+from extraction import (
+    StreamingExtractor,
+    charset,
+    extract_main_content,
+    get_engine,
+    is_html,
+)
+from extraction.stream import CHUNK_SIZE, MAX_BYTES, MAX_CHARS
+from cache import NegativeCache, PageCache
+from util import logger
+from util.breaker import CircuitBreaker
+from util.http import get_async_session
+from util.metrics import WindowedHistogram
+from util.tracing import tracer
+
+# Seconds allowed for one page, including the body download
+TIMEOUT = 10
+# Hedged requests: the second backend is tried after the primary's p95
+HEDGE_PERCENTILE = 95
+HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+HEDGE_MIN_SAMPLES = 20
+# Seconds of latencies the hedge delay is computed from
+HEDGE_WINDOW = 60.0
+# Answers worth retrying; the scrapers raise on them instead of parsing the error page
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 2
+MAX_BACKOFF = 2.0
 
 
 class Scraper(ABC):
+    def __init__(
+        self,
+        engine: str | None = None,
+        main_content: bool = False,
+        page_cache: PageCache | None = None,
+    ) -> None:
+        self.engine = get_engine(engine)
+        self.main_content = main_content
+        self.page_cache = page_cache
+
+    def cache_key(self, url: str) -> str:
+        return PageCache.key(url, "main" if self.main_content else "text")
+
     @abstractmethod
     async def fetch(self, url: str) -> dict[str, Any]:
         pass
 
     async def parse(self, body):
-        """Parses all the text from the html."""
+        """Parses all the text from the html, or only the article body in main content mode."""
+
+        with tracer.span("parse"):
+            if self.main_content:
+                return extract_main_content(body)
+            raw_text = self.engine.text(body)
+            return self.normalize(raw_text)
 
-        soup = BeautifulSoup(body, "html.parser")
-        raw_text = soup.get_text(separator=" ", strip=True)
-        text = re.sub(r"\n{3,}|\s{2,}", "\n", raw_text)
-        return text
+    def normalize(self, raw_text: str) -> str:
+        return re.sub(r"\n{3,}|\s{2,}", "\n", raw_text)
 
 
 class ScraperRemote(Scraper):
-    def __init__(self, host: str = "http://lb-scraper/scrape/?url=") -> None:
+    def __init__(
+        self,
+        host: str = "http://lb-scraper/scrape/?url=",
+        engine: str | None = None,
+        main_content: bool = False,
+        page_cache: PageCache | None = None,
+        timeout: float = TIMEOUT,
+    ) -> None:
+        super().__init__(engine, main_content, page_cache)
         self.host = host
+        self.timeout = timeout
 
     async def fetch(self, url: str) -> dict[str, Any]:
-        async with aiohttp.ClientSession() as session:
-            query_url = self.host + url
-            async with session.post(query_url) as response:
-                if response.status == 200:
-                    body = await response.json()
-                    text = await self.parse(body["html"])
-                    if text:
-                        return {"url": url, "text": text}
-            return {"url": url, "text": None}
+        # The scraping service does not forward validators, so cached pages
+        # are only reused while they are younger than the cache's max_age.
+        if self.page_cache is not None:
+            cached = self.page_cache.get(self.cache_key(url))
+            if cached is not None and self.page_cache.is_fresh(cached):
+                return {"url": url, "text": cached.text}
+
+        import aiohttp
+
+        session = get_async_session()
+        query_url = self.host + url
+        async with session.post(
+            query_url, timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as response:
+            if response.status in RETRY_STATUSES:
+                response.raise_for_status()
+            if response.status == 200:
+                body = await response.json()
+                text = await self.parse(body["html"])
+                if text:
+                    if self.page_cache is not None:
+                        self.page_cache.store(self.cache_key(url), text, {})
+                    return {"url": url, "text": text}
+        return {"url": url, "text": None}
 
 
 class ScraperLocal(Scraper):
+    def __init__(
+        self,
+        streaming: bool = False,
+        max_bytes: int = MAX_BYTES,
+        max_chars: int = MAX_CHARS,
+        engine: str | None = None,
+        main_content: bool = False,
+        page_cache: PageCache | None = None,
+        timeout: float = TIMEOUT,
+    ) -> None:
+        super().__init__(engine, main_content, page_cache)
+        self.timeout = timeout
+        self.streaming = streaming
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+
     async def fetch(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url, timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
+        cached = None
+        if self.page_cache is not None:
+            cached = self.page_cache.get(self.cache_key(url))
+            if cached is not None and self.page_cache.is_fresh(cached):
+                return {"url": url, "text": cached.text}
+
+        import aiohttp
+
+        session = get_async_session()
+        async with session.get(
+            url,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=PageCache.conditional_headers(cached),
+        ) as response:
+            if response.status in RETRY_STATUSES:
+                response.raise_for_status()
+            if cached is not None and response.status == 304:
+                text = self.page_cache.not_modified(self.cache_key(url), cached)
+                return {"url": url, "text": text}
+
+            if self.streaming:
+                text = await self.parse_stream(response)
+            else:
                 html = await response.text()
                 text = await self.parse(html)
 
-                return {"url": url, "text": text}
+            if self.page_cache is not None and text and response.status == 200:
+                if cached is not None:
+                    self.page_cache.modified()
+                self.page_cache.store(self.cache_key(url), text, response.headers)
+
+            return {"url": url, "text": text}
+
+    async def parse_stream(self, response) -> str | None:
+        """Parses the body while it downloads, stopping at the byte or text budget.
+
+        Non HTML responses are skipped without reading their body.
+        """
+
+        content_type = response.headers.get("Content-Type")
+        if not is_html(content_type):
+            return None
+
+        extractor = StreamingExtractor(
+            charset(content_type), self.max_bytes, self.max_chars, self.main_content
+        )
+        # Parsing is interleaved with the download; the span covers both
+        with tracer.span("parse_stream"):
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                if not extractor.feed(chunk):
+                    break
+            extractor.close()
+        if self.main_content:
+            return extractor.main_text
+        return self.normalize(" ".join(extractor.strings))
+
+
+class HedgedScraper(Scraper):
+    """Races two scrapers, e.g. `ScraperRemote` and `ScraperLocal`.
+
+    Each page is requested from `primary` first. If it has not answered
+    after the hedge delay, the same page is requested from `secondary` and
+    whichever returns text first wins; the other request is cancelled. The
+    delay is the `percentile` of the primary's latencies over the last
+    `window` seconds, so only the slowest few requests are duplicated and
+    the delay follows a backend that slows down or recovers. A cancelled
+    request counts with the time it had already taken. A primary that fails
+    or returns no text is hedged at once.
+    """
+
+    def __init__(
+        self,
+        primary: Scraper,
+        secondary: Scraper,
+        percentile: float = HEDGE_PERCENTILE,
+        default_delay: float = HEDGE_DELAY,
+        min_delay: float = MIN_HEDGE_DELAY,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        window: float = HEDGE_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.latencies = {
+            "primary": WindowedHistogram(window, clock=clock),
+            "secondary": WindowedHistogram(window, clock=clock),
+        }
+        self.hedged = 0
+        self.secondary_wins = 0
+
+    def hedge_delay(self) -> float:
+        recent = self.latencies["primary"].recent()
+        if recent.count < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, recent.percentile(self.percentile))
+
+    async def _timed_fetch(self, name: str, url: str) -> dict[str, Any]:
+        scraper = self.primary if name == "primary" else self.secondary
+        start = time.perf_counter()
+        try:
+            result = await scraper.fetch(url)
+        except asyncio.CancelledError:
+            # The loser of a race is the slow one; leaving it out would pull
+            # the percentile, and so the hedge delay, down
+            self.latencies[name].record(time.perf_counter() - start)
+            raise
+        self.latencies[name].record(time.perf_counter() - start)
+        return result
+
+    async def fetch(self, url: str) -> dict[str, Any]:
+        primary = asyncio.create_task(self._timed_fetch("primary", url))
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+            if done and self._has_text(primary):
+                return primary.result()
+
+            self.hedged += 1
+            secondary = asyncio.create_task(self._timed_fetch("secondary", url))
+            tasks[secondary] = "secondary"
+            pending = {task for task in tasks if not task.done()}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if self._has_text(task):
+                        if tasks[task] == "secondary":
+                            self.secondary_wins += 1
+                        return task.result()
+            # Neither returned text: report the primary's answer or error
+            for task in tasks:
+                if not task.exception():
+                    return task.result()
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _has_text(task: asyncio.Task) -> bool:
+        return task.done() and not task.exception() and bool(task.result()["text"])
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hedged": self.hedged,
+            "secondary_wins": self.secondary_wins,
+            "hedge_delay": self.hedge_delay(),
+            "primary": self.latencies["primary"].snapshot(),
+            "secondary": self.latencies["secondary"].snapshot(),
+        }
+
+
+class ResilientScraper(Scraper):
+    """Keeps failing sites from costing a timeout on every turn.
+
+    Wraps another scraper with:
+
+    - a circuit breaker per domain: after a few consecutive failures the
+      domain is skipped until the breaker's cooldown lets a probe through;
+    - retries with full-jitter backoff for connection errors and 429/5xx
+      answers. A Retry-After is waited for when it fits in `MAX_BACKOFF`;
+      a longer one fails the page at once, and the URL is kept out for at
+      least that long. Timeouts are not retried, since the page already
+      used its whole budget;
+    - a negative cache of URLs that failed recently.
+
+    Failures never raise: the page comes back without text, like any other
+    page that could not be scraped.
+    """
+
+    def __init__(
+        self,
+        scraper: Scraper,
+        breaker: CircuitBreaker | None = None,
+        negative_cache: NegativeCache | None = None,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = 0.2,
+    ) -> None:
+        super().__init__()
+        self.scraper = scraper
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.negative_cache = negative_cache if negative_cache is not None else NegativeCache()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.skipped = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def fetch(self, url: str) -> dict[str, Any]:
+        domain = urlsplit(url).hostname or url
+        if url in self.negative_cache or not self.breaker.allow(domain):
+            self.skipped += 1
+            return {"url": url, "text": None}
+
+        try:
+            result = await self.fetch_with_retries(url)
+        except asyncio.CancelledError:
+            self.breaker.release(domain)
+            raise
+        except Exception as error:
+            self.failures += 1
+            self.breaker.failure(domain)
+            retry_after = self.retry_after(error) or 0.0
+            self.negative_cache.add(url, max(self.negative_cache.ttl, retry_after))
+            logger.warning(f"SCRAPE FAILED: {url} {error!r}")
+            return {"url": url, "text": None}
+
+        self.breaker.success(domain)
+        return result
+
+    async def fetch_with_retries(self, url: str) -> dict[str, Any]:
+        attempt = 0
+        while True:
+            try:
+                return await self.scraper.fetch(url)
+            except Exception as error:
+                if attempt == self.max_retries or not self.is_transient(error):
+                    raise
+                delay = self.retry_delay(error, attempt)
+                if delay is None:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        import aiohttp
+
+        if isinstance(error, asyncio.TimeoutError):
+            return False
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status in RETRY_STATUSES
+        return isinstance(error, aiohttp.ClientConnectionError)
+
+    def retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """Seconds to wait before the next attempt.
+
+        Retry-After is honored up to `MAX_BACKOFF`; a longer one gives None,
+        as the page is not worth waiting for in this turn. Without it,
+        full-jitter backoff.
+        """
+
+        retry_after = self.retry_after(error)
+        if retry_after is None:
+            return random.uniform(0, min(self.backoff * 2**attempt, MAX_BACKOFF))
+        return retry_after if retry_after <= MAX_BACKOFF else None
+
+    @staticmethod
+    def retry_after(error: Exception) -> float | None:
+        """Retry-After of an HTTP error in seconds, if it has one in that form."""
+
+        retry_after = (getattr(error, "headers", None) or {}).get("Retry-After")
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "skipped": self.skipped,
+            "retries": self.retries,
+            "failures": self.failures,
+            "open_circuits": self.breaker.open_circuits(),
+        }
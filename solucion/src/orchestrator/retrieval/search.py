@@ -1,21 +1,40 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 import os
+from typing import Optional
 from urllib.parse import urlencode
+from cache import SearchCache
 from models.search import SearchResult
-import aiohttp
+from util import logger
+from util.http import get_async_session
 
-from mocks.test_dict import provisional_search_result
+# Seconds allowed for one search request
+TIMEOUT = 10
 
-GOOGLE_API_URL = os.environ["GOOGLE_API_HOST"]
-GOOGLE_API_KEY = os.environ["GOOGLE_API_KEY"]
-GOOGLE_CX = os.environ["GOOGLE_CX"]
-GOOGLE_FIELDS = os.environ["GOOGLE_FIELDS"]
-HEADER_ACCEPT_ENCODING = os.environ["HEADER_ACCEPT_ENCODING"]
-HEADER_USER_AGENT = os.environ["HEADER_USER_AGENT"]
-REQUEST_HEADERS = {
-    "Accept-Encoding": HEADER_ACCEPT_ENCODING,
-    "User-Agent": HEADER_USER_AGENT,
-}
+
+@dataclass(frozen=True)
+class GoogleConfig:
+    api_url: str
+    api_key: str
+    cx: str
+    fields: str
+    accept_encoding: str
+    user_agent: str
+
+    @classmethod
+    def from_env(cls) -> "GoogleConfig":
+        return cls(
+            api_url=os.environ["GOOGLE_API_HOST"],
+            api_key=os.environ["GOOGLE_API_KEY"],
+            cx=os.environ["GOOGLE_CX"],
+            fields=os.environ["GOOGLE_FIELDS"],
+            accept_encoding=os.environ["HEADER_ACCEPT_ENCODING"],
+            user_agent=os.environ["HEADER_USER_AGENT"],
+        )
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Accept-Encoding": self.accept_encoding, "User-Agent": self.user_agent}
 
 
 class Searcher(ABC):
@@ -25,28 +44,64 @@ class Searcher(ABC):
 
 
 class GoogleAPI(Searcher):
-    def __init__(self) -> None:
+    """Google Custom Search client.
+
+    The settings are read from the environment on the first search unless a
+    `config` is given, so importing this module needs no configuration.
+    """
+
+    def __init__(
+        self,
+        cache: SearchCache | None = None,
+        timeout: float = TIMEOUT,
+        config: Optional[GoogleConfig] = None,
+    ) -> None:
         super().__init__()
+        self.cache = cache
+        self.timeout = timeout
+        self._config = config
+
+    @property
+    def config(self) -> GoogleConfig:
+        if self._config is None:
+            self._config = GoogleConfig.from_env()
+        return self._config
 
     async def run(self, query: str) -> SearchResult:
+        import aiohttp
+
+        config = self.config
+        cache_key = SearchCache.key(query, provider=f"google:{config.cx}")
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return SearchResult(**cached)
+
         query_params = urlencode(
             {
-                "key": GOOGLE_API_KEY,
-                "fields": GOOGLE_FIELDS,
-                "cx": GOOGLE_CX,
+                "key": config.api_key,
+                "fields": config.fields,
+                "cx": config.cx,
                 "q": query,
             }
         )
-        url = f"{GOOGLE_API_URL}{query_params}"
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url,
-                headers=REQUEST_HEADERS,
-            ) as response:
-                r = await response.json()
-                try:
-                    return SearchResult(**r)
-                except Exception as e:
-                    print("SEARCHER", e)
-                    return SearchResult(**provisional_search_result)
+        url = f"{config.api_url}{query_params}"
+
+        session = get_async_session()
+        async with session.get(
+            url,
+            headers=config.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as response:
+            r = await response.json()
+            try:
+                result = SearchResult(**r)
+            except Exception as e:
+                from mocks.test_dict import provisional_search_result
+
+                logger.warning(f"SEARCH RESULT INVALID, using provisional results: {e}")
+                return SearchResult(**provisional_search_result)
+
+        if self.cache is not None:
+            self.cache.set(cache_key, result.model_dump())
+        return result
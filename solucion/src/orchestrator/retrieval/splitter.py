@@ -1,6 +1,14 @@
 from abc import ABC, abstractmethod
+import asyncio
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor
+from itertools import accumulate
+from typing import Callable, Optional
 import numpy as np
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+SEPARATORS = ["\n\n", "\n", " ", ""]
+# Pages longer than this are split in an executor instead of on the event loop
+OFFLOAD_CHARS = 50_000
 
 
 class Splitter(ABC):
@@ -11,19 +19,160 @@ class Splitter(ABC):
 
 class LangChainSplitter(Splitter):
     def __init__(self, chunk_size, chunk_overlap, length_function) -> None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.length_function = length_function
-
-    async def split(self, text: str) -> list[str]:
-        text_splitter = RecursiveCharacterTextSplitter(
-            # Set a really small chunk size, just to show.
-            separators=["\n\n", "\n", " ", ""],
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            separators=SEPARATORS,
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
             length_function=self.length_function,
             # is_separator_regex=False,
         )
-        chunks = text_splitter.split_text(text)
+
+    async def split(self, text: str) -> list[str]:
+        chunks = self.text_splitter.split_text(text)
 
         return chunks
+
+
+class NativeSplitter(Splitter):
+    """Splitter with the same chunk boundaries as `LangChainSplitter`.
+
+    It follows the recursive separator rules of LangChain's
+    `RecursiveCharacterTextSplitter` (separators kept at the start of each
+    piece, whitespace stripped from the chunks) but works on offsets into the
+    page: every separator level scans only the spans that are still too long,
+    each piece is measured once, chunk ends are found by bisecting running
+    totals, and a chunk is a single slice of the page.
+
+    With no `length_function` lengths are characters and cost nothing to
+    measure. For token lengths pass `util.tokens.cached_count_tokens`.
+    Pages over `offload_chars` characters are split in `executor` (the
+    loop's default thread pool if None) so a big page does not stall the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        length_function: Optional[Callable[[str], int]] = None,
+        separators: list[str] = SEPARATORS,
+        offload_chars: int = OFFLOAD_CHARS,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size "
+                f"({chunk_size}), should be smaller."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_function = None if length_function is len else length_function
+        self.separators = separators
+        self.offload_chars = offload_chars
+        self.executor = executor
+
+    async def split(self, text: str) -> list[str]:
+        if len(text) > self.offload_chars:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self.split_text, text)
+        return self.split_text(text)
+
+    def split_text(self, text: str) -> list[str]:
+        chunks: list[str] = []
+        self._split_span(text, 0, len(text), 0, chunks)
+        return chunks
+
+    def _split_span(
+        self, text: str, start: int, end: int, level: int, chunks: list[str]
+    ) -> None:
+        """Splits `text[start:end]` with the first separator from `level` on found in it.
+
+        Runs of pieces shorter than `chunk_size` are merged into chunks; a
+        longer piece is split again with the next separators.
+        """
+
+        separators = self.separators[level:]
+        separator = separators[-1]
+        next_level = len(self.separators)
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                next_level = level + i + 1
+                break
+
+        bounds = self._bounds(text, start, end, separator)
+        if self.length_function is None:
+            lengths = [b - a for a, b in zip(bounds, bounds[1:])]
+        else:
+            lengths = [self.length_function(text[a:b]) for a, b in zip(bounds, bounds[1:])]
+        # totals[i] is the length of pieces 0..i-1
+        totals = list(accumulate(lengths, initial=0))
+
+        run_start = 0
+        for i in [i for i, length in enumerate(lengths) if length >= self.chunk_size]:
+            self._merge(text, bounds, totals, run_start, i, chunks)
+            if next_level >= len(self.separators):
+                chunks.append(text[bounds[i] : bounds[i + 1]])
+            else:
+                self._split_span(text, bounds[i], bounds[i + 1], next_level, chunks)
+            run_start = i + 1
+        self._merge(text, bounds, totals, run_start, len(lengths), chunks)
+
+    @staticmethod
+    def _bounds(text: str, start: int, end: int, separator: str) -> list[int]:
+        """Offsets where the pieces of `text[start:end]` begin, plus `end`.
+
+        Every piece but the first starts with its separator.
+        """
+
+        if separator == "":
+            return list(range(start, end + 1))
+        parts = text[start:end].split(separator)
+        width = len(separator)
+        sizes = [len(parts[0])] + [len(part) + width for part in parts[1:]]
+        bounds = list(accumulate(sizes, initial=start))
+        return bounds[1:] if sizes[0] == 0 else bounds
+
+    def _merge(
+        self,
+        text: str,
+        bounds: list[int],
+        totals: list[int],
+        first: int,
+        stop: int,
+        chunks: list[str],
+    ) -> None:
+        """Packs pieces `first..stop-1` into chunks of at most `chunk_size`, with overlap.
+
+        Each chunk takes as many pieces as fit. The next one starts from the
+        latest pieces of the previous chunk that add up to at most
+        `chunk_overlap` and still leave room for the next piece.
+        """
+
+        if first >= stop:
+            return
+        while True:
+            # Pieces first..last-1 fit in a chunk; piece `last` does not
+            last = bisect_right(totals, totals[first] + self.chunk_size, first, stop + 1) - 1
+            if last >= stop:
+                self._emit(text, bounds[first], bounds[stop], chunks)
+                return
+            self._emit(text, bounds[first], bounds[last], chunks)
+            overlap = bisect_left(totals, totals[last] - self.chunk_overlap, first, last + 1)
+            room = bisect_left(totals, totals[last + 1] - self.chunk_size, first, last + 1)
+            empty = bisect_left(totals, totals[last], first, last + 1)
+            first = max(overlap, min(room, empty))
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, chunks: list[str]) -> None:
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
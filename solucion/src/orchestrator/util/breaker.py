@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """One circuit per key, e.g. per domain.
+
+    A circuit opens after `threshold` consecutive failures and then rejects
+    calls without trying them. After `cooldown` seconds it lets a single
+    probe through (half-open): a success closes it again, a failure keeps it
+    open for another cooldown.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 3,
+        cooldown: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._probing: set[str] = set()
+
+    def state(self, key: str) -> str:
+        opened_at = self._opened_at.get(key)
+        if opened_at is None:
+            return CLOSED
+        if self.clock() - opened_at >= self.cooldown:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self, key: str) -> bool:
+        """Whether a call for `key` may go ahead; claims the probe when half-open."""
+
+        with self._lock:
+            state = self.state(key)
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and key not in self._probing:
+                self._probing.add(key)
+                return True
+            return False
+
+    def success(self, key: str) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+            self._opened_at.pop(key, None)
+            self._probing.discard(key)
+
+    def failure(self, key: str) -> None:
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if key in self._probing or self._failures[key] >= self.threshold:
+                self._opened_at[key] = self.clock()
+            self._probing.discard(key)
+
+    def release(self, key: str) -> None:
+        """Gives back a probe whose call was cancelled before it finished."""
+
+        with self._lock:
+            self._probing.discard(key)
+
+    def open_circuits(self) -> list[str]:
+        return [key for key in list(self._opened_at) if self.state(key) != CLOSED]
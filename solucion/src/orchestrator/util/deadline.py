@@ -0,0 +1,26 @@
+import time
+from typing import Callable, Optional
+
+
+class Deadline:
+    """Time budget of a turn, shared by the stages that run inside it."""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.seconds = seconds
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left, keeping `reserve` seconds back for later stages."""
+
+        return max(0.0, self.expires_at - self.clock() - reserve)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def remaining(deadline: Optional[Deadline], reserve: float = 0.0) -> Optional[float]:
+    """`deadline.remaining()`, or None (no limit) without a deadline."""
+
+    return None if deadline is None else deadline.remaining(reserve)
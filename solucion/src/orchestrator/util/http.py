@@ -0,0 +1,218 @@
+"""Process-wide HTTP clients.
+
+Every outbound call (search APIs, page downloads, LLM and embeddings) goes
+through one of the two clients below so TCP/TLS connections and DNS lookups
+are reused across calls instead of being paid on every request.
+"""
+
+import asyncio
+import atexit
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+# requests and aiohttp are imported on first use: a process that only needs
+# one of the clients does not pay for loading the other.
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
+
+MAX_CONNECTIONS = 100
+MAX_CONNECTIONS_PER_HOST = 10
+POOL_HOSTS = 20
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+
+class ConnectionStats:
+    """Counts requests and the connections opened to serve them."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new = 0
+
+    @property
+    def reused(self) -> int:
+        return max(self.requests - self.new, 0)
+
+    def record_request(self, new_connection: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            if new_connection:
+                self.new += 1
+
+    def record_new(self) -> None:
+        with self._lock:
+            self.new += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.new = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return {"requests": self.requests, "new": self.new, "reused": self.reused}
+
+
+sync_stats = ConnectionStats()
+async_stats = ConnectionStats()
+
+
+# Sync client (requests)
+
+
+@lru_cache(maxsize=None)
+def _pooled_adapter_class():
+    """`HTTPAdapter` whose pools count the connections they open."""
+
+    from requests.adapters import HTTPAdapter
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class CountingHTTPConnectionPool(HTTPConnectionPool):
+        def _new_conn(self):
+            sync_stats.record_new()
+            return super()._new_conn()
+
+    class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+        def _new_conn(self):
+            sync_stats.record_new()
+            return super()._new_conn()
+
+    class PooledAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": CountingHTTPConnectionPool,
+                "https": CountingHTTPSConnectionPool,
+            }
+
+        def send(self, request, **kwargs):
+            sync_stats.record_request()
+            return super().send(request, **kwargs)
+
+    return PooledAdapter
+
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """Returns the shared keep-alive `requests.Session`."""
+
+    import requests
+
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                adapter = _pooled_adapter_class()(
+                    pool_connections=POOL_HOSTS,
+                    pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                    pool_block=True,
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def close() -> None:
+    """Closes the shared sync session and its pooled connections."""
+
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+atexit.register(close)
+
+
+# Async client (aiohttp)
+
+
+async def _on_connection_create_end(session, context, params) -> None:
+    async_stats.record_request(new_connection=True)
+
+
+async def _on_connection_reuseconn(session, context, params) -> None:
+    async_stats.record_request()
+
+
+# One session per event loop: sessions are bound to the loop they were
+# created on, and several loops may run at once in different threads. The
+# loops are held strongly so that the session of a closed loop is still
+# found, and closed, when the next session is created.
+_async_sessions: dict[asyncio.AbstractEventLoop, "aiohttp.ClientSession"] = {}
+_async_lock = threading.Lock()
+# Closing tasks of sessions left by closed loops, kept so they are not garbage collected
+_closing: set[asyncio.Future] = set()
+
+
+def get_async_session() -> "aiohttp.ClientSession":
+    """Returns the shared `aiohttp.ClientSession` of the running event loop.
+
+    Must be called from inside a coroutine. Each loop gets its own session;
+    sessions left behind by loops that have been closed are closed when a
+    new one is created. Call `aclose` before the loop stops.
+    """
+
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        session = _async_sessions.get(loop)
+        if session is not None and not session.closed:
+            return session
+        for old_loop, old_session in list(_async_sessions.items()):
+            if old_loop.is_closed():
+                del _async_sessions[old_loop]
+                _discard_async_session(old_session, loop)
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(_on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        session = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        _async_sessions[loop] = session
+        return session
+
+
+def _discard_async_session(
+    session: "aiohttp.ClientSession", loop: asyncio.AbstractEventLoop
+) -> None:
+    """Closes, on the running `loop`, a session whose own loop is closed.
+
+    Its sockets went away with that loop; closing only marks the connector
+    closed, so it can run on any loop.
+    """
+
+    if session.closed:
+        return
+    task = loop.create_task(session.close())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+async def aclose() -> None:
+    """Closes the session of the running event loop. Call it before the loop stops."""
+
+    with _async_lock:
+        session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def connection_stats() -> dict[str, dict[str, int]]:
+    """New versus reused connections for both clients."""
+
+    return {"sync": sync_stats.snapshot(), "async": async_stats.snapshot()}
@@ -1,13 +1,53 @@
+"""Logging of the orchestrator.
+
+`logger` is the logger every module writes to. `setup_logging` applies the
+per-logger levels and handlers, from `logging_config` or from a file such as
+`logging.conf`, and then puts every handler behind a `QueueHandler`: the
+calling thread, usually the event loop, only enqueues the record, and a
+`QueueListener` thread formats it and does the console or file I/O.
+"""
+
+import atexit
+import configparser
+import copy
+import json
+import logging
+import logging.config
+import logging.handlers
+import queue
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Union
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
 LOG_LEVEL: str = "DEBUG"
 FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 logging_config = {
     "version": 1,  # mandatory field
-    # if you want to overwrite existing loggers' configs
-    # "disable_existing_loggers": False,
+    # loggers created before the setup (aiohttp, openai, ...) keep working
+    "disable_existing_loggers": False,
     "formatters": {
         "basic": {
             "format": FORMAT,
-        }
+        },
+        "json": {
+            "()": JsonFormatter,
+        },
     },
     "handlers": {
         "console": {
@@ -18,15 +58,103 @@ logging_config = {
         }
     },
     "loggers": {
-        "simple_example": {
+        "orchestrator": {
             "handlers": ["console"],
             "level": LOG_LEVEL,
-            # "propagate": False
+            "propagate": False,
         }
     },
 }
 
-import logging
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with their message resolved but not yet formatted.
+
+    The stock `QueueHandler` formats the whole record, traceback included,
+    in the calling thread. Here only `msg % args` is resolved, so later
+    changes to the arguments cannot alter the message; the timestamp,
+    traceback and JSON are left to the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+# (logger, queue handler, handlers moved behind it, listener) of the current setup
+_queued: list[tuple[logging.Logger, logging.Handler, list[logging.Handler], Any]] = []
+
+
+def setup_logging(
+    config: Union[str, Path, dict, None] = None, json_output: bool = False
+) -> None:
+    """Configures logging and moves every handler to a background thread.
+
+    `config` is a `dictConfig` dict (`logging_config` by default) or the path
+    of a `fileConfig` file like `logging.conf`. With `json_output` every
+    handler writes JSON lines instead of its configured format.
+    """
+
+    shutdown_logging()
+    if isinstance(config, (str, Path)):
+        logging.config.fileConfig(config, disable_existing_loggers=False)
+    else:
+        # dictConfig replaces the entries of the dict it is given
+        config = copy.deepcopy(config if config is not None else logging_config)
+        logging.config.dictConfig(config)
+
+    for name in configured_loggers(config):
+        target = logging.getLogger(name)
+        handlers = [
+            handler
+            for handler in target.handlers
+            if not isinstance(handler, (logging.NullHandler, logging.handlers.QueueHandler))
+        ]
+        if not handlers:
+            continue
+        if json_output:
+            for handler in handlers:
+                handler.setFormatter(JsonFormatter())
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        queue_handler = DeferredQueueHandler(records)
+        for handler in handlers:
+            target.removeHandler(handler)
+        target.addHandler(queue_handler)
+        listener.start()
+        _queued.append((target, queue_handler, handlers, listener))
+
+
+def configured_loggers(config: Union[str, Path, dict]) -> list[str]:
+    """Names of the loggers a config sets up, "" being the root logger.
+
+    Only those are moved behind a queue; handlers added by other code, such
+    as a test runner, are left alone.
+    """
+
+    if isinstance(config, dict):
+        names = list(config.get("loggers", {}))
+        return names + [""] if "root" in config else names
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(config, encoding="utf-8")
+    keys = [key.strip() for key in parser["loggers"]["keys"].split(",")]
+    return ["" if key == "root" else parser[f"logger_{key}"]["qualname"] for key in keys]
+
+
+def shutdown_logging() -> None:
+    """Writes out the queued records and gives the handlers back to their loggers."""
+
+    while _queued:
+        target, queue_handler, handlers, listener = _queued.pop()
+        for handler in handlers:
+            target.addHandler(handler)
+        target.removeHandler(queue_handler)
+        listener.stop()
+
+
+atexit.register(shutdown_logging)
 
 # create logger
-logger = logging.getLogger("uvicorn")
+logger = logging.getLogger("orchestrator")
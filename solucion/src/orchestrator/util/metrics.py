@@ -0,0 +1,164 @@
+"""Latency histograms with fixed, log-spaced buckets.
+
+Recording is O(1) and memory does not grow with the number of samples, so
+one histogram can stay alive for the whole process. Percentiles are read
+from the bucket bounds, accurate to the bucket width (about 10%).
+`WindowedHistogram` only keeps the samples of the last minute or so, for
+decisions that must follow a backend whose latency changes.
+"""
+
+import bisect
+import itertools
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+MIN_LATENCY = 0.001
+MAX_LATENCY = 60.0
+BUCKETS_PER_DOUBLING = 7
+
+
+def _bounds() -> list[float]:
+    count = math.ceil(math.log2(MAX_LATENCY / MIN_LATENCY) * BUCKETS_PER_DOUBLING)
+    return [MIN_LATENCY * 2 ** (i / BUCKETS_PER_DOUBLING) for i in range(count + 1)]
+
+
+BOUNDS = _bounds()
+
+
+class LatencyHistogram:
+    """Latencies in seconds; the last bucket also takes everything slower."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts = [0] * len(BOUNDS)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = min(bisect.bisect_left(BOUNDS, seconds), len(BOUNDS) - 1)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the `q`-th percentile, 0 when empty."""
+
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(q / 100 * self.count))
+            seen = 0
+            for bound, count in zip(BOUNDS, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return BOUNDS[-1]
+
+    def cumulative(self, every: int = BUCKETS_PER_DOUBLING) -> list[tuple[float, int]]:
+        """(bound, samples at or below it) at every `every`-th bound, for exporters.
+
+        The overflow bucket is left out; its samples only appear in `count`.
+        """
+
+        with self._lock:
+            counts = list(self.counts)
+        totals = list(itertools.accumulate(counts))
+        return [(BOUNDS[i], totals[i]) for i in range(0, len(BOUNDS) - 1, every)]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Adds the samples of `other` to this histogram."""
+
+        with other._lock:
+            counts, count, total = list(other.counts), other.count, other.total
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.count += count
+            self.total += total
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * len(BOUNDS)
+            self.count = 0
+            self.total = 0.0
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class WindowedHistogram:
+    """Latencies of the last `window` seconds.
+
+    Samples go to one of `slices` histograms, each covering `window / slices`
+    seconds; a slice is emptied when its turn comes round again. Reads merge
+    the slices still inside the window, so percentiles forget old samples
+    within one slice of `window`.
+    """
+
+    def __init__(
+        self, window: float = 60.0, slices: int = 6, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.window = window
+        self.clock = clock
+        self._slice = window / slices
+        self._lock = threading.Lock()
+        self._histograms = [LatencyHistogram() for _ in range(slices)]
+        # Slice number (time // slice length) each histogram currently holds
+        self._epochs: list[Optional[int]] = [None] * slices
+
+    def record(self, seconds: float) -> None:
+        epoch = int(self.clock() // self._slice)
+        index = epoch % len(self._histograms)
+        with self._lock:
+            histogram = self._histograms[index]
+            if self._epochs[index] != epoch:
+                histogram.reset()
+                self._epochs[index] = epoch
+            histogram.record(seconds)
+
+    def recent(self) -> LatencyHistogram:
+        """The samples still inside the window, merged into one histogram."""
+
+        oldest = int(self.clock() // self._slice) - len(self._histograms) + 1
+        merged = LatencyHistogram()
+        with self._lock:
+            live = [
+                histogram
+                for histogram, epoch in zip(self._histograms, self._epochs)
+                if epoch is not None and epoch >= oldest
+            ]
+        for histogram in live:
+            merged.merge(histogram)
+        return merged
+
+    @property
+    def count(self) -> int:
+        return self.recent().count
+
+    def percentile(self, q: float) -> float:
+        return self.recent().percentile(q)
+
+    @property
+    def mean(self) -> float:
+        return self.recent().mean
+
+    def reset(self) -> None:
+        with self._lock:
+            for histogram in self._histograms:
+                histogram.reset()
+            self._epochs = [None] * len(self._histograms)
+
+    def snapshot(self) -> dict[str, float]:
+        return self.recent().snapshot()
@@ -0,0 +1,99 @@
+"""Vectorized cosine similarity and top-k selection.
+
+Vectors are stacked into one float32 matrix and normalized once, so scoring
+n chunks is a single matrix-vector product and picking the best k is an
+`argpartition` instead of a full sort.
+"""
+
+import heapq
+import itertools
+from typing import Any, Sequence
+
+import numpy as np
+
+
+def as_matrix(vectors: Sequence[Sequence[float]] | np.ndarray) -> np.ndarray:
+    """Stacks `vectors` into a 2D float32 matrix."""
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix.reshape(len(matrix), -1) if matrix.ndim != 2 else matrix
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scales every row to unit length. Zero rows are left as they are."""
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def cosine_scores(query, matrix: np.ndarray, normalized: bool = False) -> np.ndarray:
+    """Cosine similarity of `query` against every row of `matrix`.
+
+    Pass `normalized=True` when the rows are already unit length.
+    """
+
+    query = normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+    if not normalized:
+        matrix = normalize(matrix)
+    return matrix @ query
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first."""
+
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class TopK:
+    """Running top-k over scores that arrive in batches.
+
+    A min-heap of the best `k` items seen so far: each new batch only has to
+    beat the current k-th score.
+    """
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self._heap: list[tuple[float, int, Any]] = []
+        self._order = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def threshold(self) -> float:
+        """Score a new item must beat to enter, -inf while there is room."""
+
+        if self.k <= 0:
+            return float("inf")
+        return self._heap[0][0] if len(self._heap) >= self.k else float("-inf")
+
+    def push(self, score: float, item: Any) -> None:
+        # The counter breaks ties in arrival order, so items are never compared
+        entry = (score, -next(self._order), item)
+        if self.k <= 0:
+            return
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def extend(self, scores: np.ndarray, items: Sequence[Any]) -> None:
+        """Pushes a batch, skipping scores that cannot make it into the top k."""
+
+        for i in top_k(scores, self.k):
+            if scores[i] <= self.threshold:
+                break
+            self.push(float(scores[i]), items[i])
+
+    def items(self) -> list[tuple[float, Any]]:
+        """`(score, item)` pairs, best first."""
+
+        return [(score, item) for score, _, item in sorted(self._heap, reverse=True)]
@@ -0,0 +1,64 @@
+"""Token counting used to keep prompts inside a budget.
+
+Uses the `tiktoken` encoder when it is installed and falls back to the usual
+four-characters-per-token estimate otherwise.
+"""
+
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    return tiktoken.get_encoding(ENCODING) if tiktoken else None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in `text` (exact with tiktoken, estimated otherwise)."""
+
+    if not text:
+        return 0
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_offset(text: str, max_tokens: int) -> int:
+    """Length of the longest prefix of `text` that fits in `max_tokens`.
+
+    The cut falls on a token boundary, moved back to the start of a
+    character when a token ends inside one, so `text[:offset]` is always an
+    exact prefix and `text[offset:]` the rest.
+    """
+
+    if max_tokens <= 0:
+        return 0
+    encoder = _encoder()
+    if encoder is not None:
+        tokens = encoder.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return len(text)
+        head = encoder.decode_bytes(tokens[:max_tokens])
+        return len(head.decode("utf-8", errors="ignore"))
+    return min(len(text), max_tokens * CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts `text` so that it fits in `max_tokens`."""
+
+    return text[: split_offset(text, max_tokens)]
+
+
+@lru_cache(maxsize=65_536)
+def cached_count_tokens(text: str) -> int:
+    """`count_tokens` memoized, for splitters that measure the same pieces again."""
+
+    return count_tokens(text)
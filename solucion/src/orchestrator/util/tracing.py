@@ -0,0 +1,155 @@
+"""Timing spans for the stages of a turn.
+
+    with tracer.span("search", query=query):
+        ...
+
+Spans opened inside another span become its children, also across asyncio
+tasks created inside it (the current span lives in a `ContextVar`). Every
+finished span is recorded in a per-name `LatencyHistogram`, which
+`prometheus()` exports in the Prometheus text format. With `jsonl_path` set,
+each finished turn (a span without parent) is appended to that file, one
+JSON line per span.
+"""
+
+import itertools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from util.metrics import LatencyHistogram
+
+METRIC = "orchestrator_span_seconds"
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: int
+    parent_id: Optional[int]
+    start: float
+    timestamp: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    duration: Optional[float] = None
+    # Finished spans of the whole turn, shared with the root span
+    trace: list["Span"] = field(default_factory=list, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+class Tracer:
+    def __init__(self, jsonl_path: str | Path | None = None, clock=time.perf_counter) -> None:
+        self.jsonl_path = jsonl_path
+        self.clock = clock
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current.get()
+
+    def start(self, name: str, **attributes: Any) -> Span:
+        """A span child of the current one; `finish` must be called on it."""
+
+        parent = _current.get()
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=next(self._ids),
+            parent_id=parent.span_id if parent else None,
+            start=self.clock(),
+            timestamp=time.time(),
+            attributes=attributes,
+            trace=parent.trace if parent else [],
+        )
+
+    def finish(self, span: Span, duration: Optional[float] = None) -> None:
+        span.duration = self.clock() - span.start if duration is None else duration
+        self.histogram(span.name).record(span.duration)
+        span.trace.append(span)
+        if span.parent_id is None and self.jsonl_path:
+            self.write_jsonl(span.trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = self.start(name, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as error:
+            span.attributes["error"] = type(error).__name__
+            raise
+        finally:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # An async generator closed from another context
+                _current.set(None)
+            self.finish(span)
+
+    def record(self, name: str, seconds: float, **attributes: Any) -> None:
+        """Adds a span measured elsewhere, e.g. the time to the first LLM token."""
+
+        span = self.start(name, **attributes)
+        span.start -= seconds
+        self.finish(span, seconds)
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def write_jsonl(self, spans: list[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), ensure_ascii=False) + "\n" for span in spans)
+        with self._lock, open(self.jsonl_path, "a", encoding="utf-8") as file:
+            file.write(lines)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())}
+
+    def prometheus(self) -> str:
+        """Span durations as Prometheus histograms, one series per span name."""
+
+        lines = [
+            f"# HELP {METRIC} Duration of the orchestrator stages.",
+            f"# TYPE {METRIC} histogram",
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            label = f'span="{name}"'
+            for bound, count in histogram.cumulative():
+                lines.append(f'{METRIC}_bucket{{{label},le="{bound:.6g}"}} {count}')
+            lines.append(f'{METRIC}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f"{METRIC}_sum{{{label}}} {histogram.total:.6f}")
+            lines.append(f"{METRIC}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms = {}
+
+
+tracer = Tracer()
@@ -4,6 +4,8 @@ import pytest
 
 # Agregar la carpeta src al PYTHONPATH
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+# Los módulos de orchestrator se importan entre sí como paquetes de primer nivel (util, retrieval, ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src' / 'orchestrator'))
 
 # Ejecutar todas las pruebas de los módulos de prueba
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""In-memory stand-ins for the retrieval stages, shared by the retriever tests.
+
+Pages are described as `{url: (seconds to answer, text)}`: the searcher
+returns their links and the scraper serves their text after the delay. The
+dict is read on every call, so a test can `mocker.patch.dict` it.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from models.search import SearchDoc, SearchResult
+from retrieval.embeddings import Embeddings
+from retrieval.retriever import Retriever
+from retrieval.scraper import Scraper
+from retrieval.search import Searcher
+from retrieval.splitter import Splitter
+
+
+def random_vector(text):
+    return np.random.default_rng(len(text)).standard_normal(4).tolist()
+
+
+class FakeSearcher(Searcher):
+    def __init__(self, pages, delay=0.0):
+        self.pages = pages
+        self.delay = delay
+        self.calls = 0
+
+    async def run(self, query):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return SearchResult(items=[SearchDoc(link=link) for link in self.pages])
+
+
+class FakeScraper(Scraper):
+    def __init__(self, pages):
+        self.pages = pages
+        self.cancelled = []
+
+    async def fetch(self, url):
+        delay, text = self.pages[url]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(url)
+            raise
+        return {"url": url, "text": text}
+
+
+class LineSplitter(Splitter):
+    async def split(self, text):
+        return text.split("\n")
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeds each chunk with `embed`; `calls` keeps (time, chunks) of every call."""
+
+    def __init__(self, embed=random_vector, delay=0.0):
+        self.embed = embed
+        self.delay = delay
+        self.calls = []
+
+    async def run(self, chunks):
+        self.calls.append((time.perf_counter(), list(chunks)))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return [self.embed(chunk) for chunk in chunks]
+
+
+def fake_retriever(pages=None, **options) -> Retriever:
+    """A Retriever built with the fakes above, over `pages` (none by default)."""
+
+    pages = {} if pages is None else pages
+    return Retriever(FakeSearcher(pages), FakeScraper(pages), FakeEmbeddings(), LineSplitter(), **options)
@@ -0,0 +1,129 @@
+import numpy as np
+
+from cache import VectorCache
+from index import FlatIndex, IVFFlatIndex
+
+
+def clustered(count, dimension=16, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension))
+    labels = rng.integers(0, clusters, count)
+    return (centers[labels] + 0.1 * rng.standard_normal((count, dimension))).astype(np.float32)
+
+
+def recall(index, exact, queries, k):
+    found = 0
+    for query in queries:
+        expected = set(exact.search(query, k)[0].tolist())
+        found += len(expected & set(index.search(query, k)[0].tolist()))
+    return found / (k * len(queries))
+
+
+class TestFlatIndex:
+    # Exact search returns ids ordered by similarity
+    def test_search(self):
+        index = FlatIndex(2)
+        index.add([10, 11, 12], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+
+        ids, scores = index.search([0.0, 2.0], k=2)
+
+        assert ids.tolist() == [11, 12]
+        assert abs(scores[0] - 1.0) < 1e-6
+
+    # Removed ids are no longer returned
+    def test_remove(self):
+        index = FlatIndex(2)
+        index.add([1, 2], [[1.0, 0.0], [0.0, 1.0]])
+        index.remove([2])
+
+        assert len(index) == 1
+        assert index.search([0.0, 1.0], k=5)[0].tolist() == [1]
+
+
+class TestIVFFlatIndex:
+    # Before training the index answers with an exact scan
+    def test_untrained_is_exact(self):
+        vectors = clustered(100)
+        index = IVFFlatIndex(16, train_size=1000)
+        exact = FlatIndex(16)
+        index.add(np.arange(100), vectors)
+        exact.add(np.arange(100), vectors)
+
+        assert not index.is_trained
+        assert recall(index, exact, vectors[:10], k=5) == 1.0
+
+    # Probing every list gives the same results as the exact search
+    def test_full_probe_is_exact(self):
+        vectors = clustered(2000)
+        index = IVFFlatIndex(16, n_lists=16, n_probe=16, train_size=500)
+        exact = FlatIndex(16)
+        index.add(np.arange(2000), vectors)
+        exact.add(np.arange(2000), vectors)
+
+        assert index.is_trained
+        assert len(index) == 2000
+        assert recall(index, exact, vectors[:20], k=10) == 1.0
+
+    # A few probes keep a high recall on clustered data
+    def test_partial_probe_recall(self):
+        vectors = clustered(5000)
+        index = IVFFlatIndex(16, n_lists=32, n_probe=4, train_size=1000)
+        exact = FlatIndex(16)
+        index.add(np.arange(5000), vectors)
+        exact.add(np.arange(5000), vectors)
+
+        assert recall(index, exact, vectors[::100], k=10) >= 0.9
+
+    # Removal works both before and after training
+    def test_remove(self):
+        vectors = clustered(600)
+        index = IVFFlatIndex(16, n_lists=8, n_probe=8, train_size=500)
+        index.add(np.arange(400), vectors[:400])
+        index.remove([0])
+        index.add(np.arange(400, 600), vectors[400:])
+        index.remove([500])
+
+        assert len(index) == 598
+        assert 0 not in index.search(vectors[0], k=5)[0].tolist()
+        assert 500 not in index.search(vectors[500], k=5)[0].tolist()
+
+
+class TestVectorCacheWithIndex:
+    # Lookups through an index match the brute-force cache, including after eviction
+    def test_matches_brute_force(self):
+        vectors = clustered(1500)
+        documents = [{"text": str(i), "url": "u", "vector": v} for i, v in enumerate(vectors.tolist())]
+        plain = VectorCache(16, max_entries=1000)
+        indexed = VectorCache(16, max_entries=1000, index=IVFFlatIndex(16, n_lists=8, n_probe=8, train_size=500))
+        for start in range(0, 1500, 100):
+            plain.add(documents[start : start + 100])
+            indexed.add(documents[start : start + 100])
+
+        assert len(indexed.index) == len(indexed) == 1000
+        for query in vectors[-10:]:
+            assert [d.text for d in indexed.search(query, 5)] == [d.text for d in plain.search(query, 5)]
+
+    # Eviction removes only the evicted id, and the other chunks keep theirs
+    def test_eviction_keeps_ids_stable(self, mocker):
+        index = FlatIndex(2)
+        cache = VectorCache(2, max_entries=4, index=index)
+        cache.add([{"text": str(i), "url": "u", "vector": [1.0, float(i)]} for i in range(4)])
+        remove = mocker.spy(index, "remove")
+        add = mocker.spy(index, "add")
+
+        cache.add([{"text": "4", "url": "u", "vector": [1.0, 4.0]}])
+
+        assert remove.call_args[0][0].tolist() == [0]
+        assert add.call_args[0][0].tolist() == [0]
+        assert index.search([0.0, 1.0], k=4)[0].tolist() == [0, 3, 2, 1]
+
+    # A reloaded cache rebuilds its index
+    def test_reload_rebuilds_index(self, tmp_path):
+        cache = VectorCache(2, path=tmp_path / "vectors")
+        cache.add([{"text": "a", "url": "u", "vector": [1.0, 0.0]}])
+        cache.save()
+
+        reloaded = VectorCache(2, path=tmp_path / "vectors", index=FlatIndex(2))
+
+        assert len(reloaded.index) == 1
+        assert reloaded.search([1.0, 0.0], k=1)[0].text == "a"
@@ -0,0 +1,79 @@
+import pytest
+
+from memory import ConversationMemory
+from util.tokens import count_tokens
+
+
+def long_turn(i):
+    user = f"Pregunta número {i}. " + "detalle " * 20
+    assistant = f"Respuesta número {i}. " + "explicación " * 40
+    return user, assistant
+
+
+class TestConversationMemory:
+    # Recent turns are kept verbatim while they fit in the budget
+    def test_keeps_recent_turns_verbatim(self):
+        memory = ConversationMemory(max_tokens=500)
+        memory.add("¿Cuál es la capital de Francia?", "París.")
+
+        rendered = memory.render()
+        assert "Usuario: ¿Cuál es la capital de Francia?" in rendered
+        assert "Asistente: París." in rendered
+        assert memory.summary == ""
+
+    # Prompt size stays flat no matter how long the session runs
+    def test_size_stays_bounded(self):
+        memory = ConversationMemory(max_tokens=300, summary_max_tokens=100)
+        for i in range(200):
+            memory.add(*long_turn(i))
+            assert memory.tokens <= 400
+        assert count_tokens(memory.render()) <= 450
+
+    # Evicted turns go to the summary and the newest turn stays verbatim
+    def test_old_turns_are_summarized(self):
+        memory = ConversationMemory(max_tokens=300, summary_max_tokens=200)
+        for i in range(5):
+            memory.add(*long_turn(i))
+
+        assert "Pregunta número 0." in memory.summary
+        assert "Usuario: Pregunta número 4." in memory.render()
+
+    # The summarizer only ever receives the turns that just left the window
+    def test_turns_are_summarized_once(self):
+        seen = []
+
+        def summarizer(summary, turns):
+            seen.extend(turn.user for turn in turns)
+            return summary + "".join(f"\n- {turn.user[:18]}" for turn in turns)
+
+        memory = ConversationMemory(max_tokens=300, summarizer=summarizer)
+        for i in range(10):
+            memory.add(*long_turn(i))
+
+        assert len(seen) == len(set(seen))
+        assert len(seen) + len(memory.turns) == 10
+
+    # A turn larger than the budget is cut instead of being evicted right away
+    def test_keeps_oversized_latest_turn(self):
+        memory = ConversationMemory(max_tokens=100, summary_max_tokens=100)
+        memory.add(*long_turn(0))
+        memory.add("¿Y las heladas?", "Las heladas tardías dañan las flores. " + "detalle " * 200)
+
+        assert len(memory.turns) == 1
+        assert memory.turns[0].tokens <= 100
+        assert "Usuario: ¿Y las heladas?\nAsistente: Las heladas tardías" in memory.render()
+        assert "Pregunta número 0." in memory.summary
+
+    # A very long question is cut to half the budget so part of the answer stays
+    def test_long_question_keeps_part_of_answer(self):
+        memory = ConversationMemory(max_tokens=100)
+        memory.add("pregunta " * 200, "La respuesta corta.")
+
+        assert memory.turns[0].tokens <= 100
+        assert memory.turns[0].assistant == "La respuesta corta."
+
+    # Empty memory renders nothing
+    def test_empty_memory(self):
+        memory = ConversationMemory()
+        assert memory.render() == ""
+        assert memory.tokens == 0
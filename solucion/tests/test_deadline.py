@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from retrieval.retriever import Retriever
+from retrieval.search import Searcher
+from util.deadline import Deadline
+
+from tests.fakes import FakeEmbeddings, FakeScraper, FakeSearcher, LineSplitter
+
+# Demoras simuladas por página: la última no responde a tiempo
+PAGES = {
+    "http://example.com/rapida": (0.01, "poda de manzanos\nriego en verano"),
+    "http://example.com/media": (0.05, "plagas del manzano"),
+    "http://example.com/colgada": (5.0, "nunca llega"),
+}
+
+
+def collect(retriever, deadline):
+    async def run():
+        return [event async for event in retriever.get_context("manzanos", k=5, deadline=deadline)]
+
+    start = time.perf_counter()
+    events = asyncio.run(run())
+    return events, time.perf_counter() - start
+
+
+def event(events, name):
+    return next(e["data"] for e in events if e["event"] == name)
+
+
+class TestDeadline:
+    # Slow pages are cancelled and context is built from the ones that finished
+    @pytest.mark.parametrize("pipelined", [False, True])
+    def test_partial_results(self, pipelined):
+        scraper = FakeScraper(PAGES)
+        retriever = Retriever(
+            FakeSearcher(PAGES), scraper, FakeEmbeddings(), LineSplitter(), pipelined=pipelined
+        )
+
+        events, elapsed = collect(retriever, deadline=0.5)
+
+        assert elapsed < 1.0
+        assert json.loads(event(events, "dropped")) == {
+            "stage": "retrieval",
+            "urls": ["http://example.com/colgada"],
+        }
+        assert scraper.cancelled == ["http://example.com/colgada"]
+        context = event(events, "context")
+        assert "poda de manzanos" in context
+        assert "plagas del manzano" in context
+
+    # A search that does not answer in time ends the turn with an empty context
+    def test_search_timeout(self):
+        retriever = Retriever(FakeSearcher(PAGES, delay=5), FakeScraper(PAGES), FakeEmbeddings(), LineSplitter())
+
+        events, elapsed = collect(retriever, deadline=0.2)
+
+        assert elapsed < 1.0
+        assert json.loads(event(events, "dropped")) == {"stage": "search", "urls": []}
+        assert event(events, "context") == ""
+
+    # Without a deadline nothing is dropped and every page is waited for
+    def test_no_deadline(self, mocker):
+        mocker.patch.dict(PAGES, {"http://example.com/colgada": (0.1, "llega tarde")})
+        retriever = Retriever(FakeSearcher(PAGES), FakeScraper(PAGES), FakeEmbeddings(), LineSplitter())
+
+        events, _ = collect(retriever, deadline=None)
+
+        assert all(e["event"] != "dropped" for e in events)
+        assert "llega tarde" in event(events, "context")
+
+    # A client timeout is an error, not a deadline, even when a deadline is set
+    @pytest.mark.parametrize("pipelined", [False, True])
+    @pytest.mark.parametrize("deadline", [None, 5.0])
+    def test_client_timeout_is_raised(self, mocker, deadline, pipelined):
+        mocker.patch.dict(PAGES, {"http://example.com/colgada": (0.01, "llega")})
+
+        class TimingOutSearcher(Searcher):
+            async def run(self, query):
+                raise asyncio.TimeoutError("search API timed out")
+
+        class TimingOutEmbeddings(FakeEmbeddings):
+            async def run(self, chunks):
+                if chunks != ["manzanos"]:
+                    raise asyncio.TimeoutError("embedding API timed out")
+                return await super().run(chunks)
+
+        searcher = Retriever(
+            TimingOutSearcher(), FakeScraper(PAGES), FakeEmbeddings(), LineSplitter(), pipelined=pipelined
+        )
+        embedder = Retriever(
+            FakeSearcher(PAGES), FakeScraper(PAGES), TimingOutEmbeddings(), LineSplitter(), pipelined=pipelined
+        )
+
+        with pytest.raises(TimeoutError, match="search API"):
+            collect(searcher, deadline=deadline)
+        with pytest.raises(TimeoutError, match="embedding API"):
+            collect(embedder, deadline=deadline)
+
+
+class TestDeadlineBudget:
+    # The remaining time shrinks with the clock and never goes negative
+    def test_remaining(self):
+        now = [100.0]
+        deadline = Deadline(2.0, clock=lambda: now[0])
+
+        assert deadline.remaining() == 2.0
+        assert deadline.remaining(reserve=0.5) == 1.5
+        now[0] = 103.0
+        assert deadline.remaining() == 0.0
+        assert deadline.expired
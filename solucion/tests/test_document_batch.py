@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from models.document import Document, DocumentBatch
+
+from tests.fakes import fake_retriever
+
+
+def batch(count=4, dimension=3):
+    vectors = np.arange(count * dimension, dtype=np.float32).reshape(count, dimension) + 1
+    return DocumentBatch([f"t{i}" for i in range(count)], ["u"] * count, vectors)
+
+
+class TestDocumentBatch:
+    # Vectors are stacked once in a float32 matrix
+    def test_vectors_are_one_matrix(self):
+        documents = DocumentBatch.from_records(
+            [{"text": "a", "url": "u", "vector": [1, 2]}, {"text": "b", "url": "u", "vector": [3, 4]}]
+        )
+
+        assert documents.vectors.dtype == np.float32
+        assert documents.vectors.shape == (2, 2)
+
+    # Returned documents share the batch matrix instead of copying rows
+    def test_documents_are_views(self):
+        documents = batch()
+
+        selected = documents.documents([2, 0], [0.9, 0.5])
+
+        assert [doc.text for doc in selected] == ["t2", "t0"]
+        assert np.shares_memory(selected[0].vector, documents.vectors)
+
+    # Vectors can be left out of the results
+    def test_without_vectors(self):
+        selected = batch().documents([1], [0.7], include_vectors=False)
+
+        assert selected[0].vector is None
+        assert selected[0].to_dict() == {"text": "t1", "url": "u", "similarity": 0.7}
+
+    # Documents are slotted records without a per-instance dict
+    def test_documents_are_slotted(self):
+        assert not hasattr(Document(text="a", url="u"), "__dict__")
+
+    # The whole batch is validated at once
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            DocumentBatch(["a", "b"], ["u", "u"], [[1.0, 2.0]])
+        with pytest.raises(ValueError):
+            DocumentBatch(["a"], ["u"], [[1.0, float("nan")]])
+        with pytest.raises(ValueError):
+            DocumentBatch(["a", "b"], ["u", "u"], [[1.0, 2.0], [1.0]])
+        with pytest.raises(TypeError):
+            DocumentBatch([None], ["u"], [[1.0]])
+
+    # The retriever can leave vectors out of what it returns
+    def test_retriever_without_vectors(self):
+        retriever = fake_retriever()
+
+        documents = asyncio.run(
+            retriever.get_most_similar([1.0, 2.0, 3.0], batch(), k=2, include_vectors=False)
+        )
+
+        assert len(documents) == 2
+        assert all(doc.vector is None for doc in documents)
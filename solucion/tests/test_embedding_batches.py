@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import openai
+import pytest
+
+from retrieval.embeddings import OpenAIEmbeddings
+
+
+class FakeAPI:
+    """Stand-in for `openai.Embedding.acreate` that records concurrency."""
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.inputs = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, input, model):
+        if self.failures:
+            self.failures -= 1
+            raise openai.error.RateLimitError("slow down")
+        self.inputs.append(input)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        # The API may return items out of order, with their index
+        data = [{"index": i, "embedding": [float(text)]} for i, text in enumerate(input)]
+        return {"data": list(reversed(data))}
+
+
+def chunks(count, size=4):
+    # Each chunk is `size` characters, i.e. one token with the fallback estimate
+    return [str(i).zfill(size) for i in range(count)]
+
+
+class TestEmbeddingBatches:
+    # Batches are cut at the token budget
+    def test_batches_by_tokens(self):
+        embeddings = OpenAIEmbeddings(max_batch_tokens=3)
+
+        assert embeddings.batches(chunks(7)) == [[0, 1, 2], [3, 4, 5], [6]]
+
+    # Batches also respect the maximum number of inputs per request
+    def test_batches_by_inputs(self):
+        embeddings = OpenAIEmbeddings(max_batch_tokens=100, max_batch_inputs=2)
+
+        assert embeddings.batches(chunks(5)) == [[0, 1], [2, 3], [4]]
+
+    # An oversized chunk gets its own batch instead of blocking the rest
+    def test_oversized_chunk_alone(self):
+        embeddings = OpenAIEmbeddings(max_batch_tokens=2)
+
+        assert embeddings.batches(["aaaa", "a" * 40, "aaaa"]) == [[0], [1], [2]]
+
+    # Batches run concurrently up to the limit and vectors keep input order
+    def test_concurrency_limit_and_order(self, mocker):
+        api = FakeAPI(delay=0.05)
+        mocker.patch("openai.Embedding.acreate", new=api)
+        embeddings = OpenAIEmbeddings(max_batch_tokens=2, max_concurrency=4)
+
+        start = time.perf_counter()
+        vectors = asyncio.run(embeddings.run(chunks(16)))
+        elapsed = time.perf_counter() - start
+
+        assert [v[0] for v in vectors] == [float(i) for i in range(16)]
+        assert len(api.inputs) == 8
+        assert api.max_in_flight == 4
+        assert elapsed < 8 * 0.05
+
+    # Rate-limited requests are retried with backoff
+    def test_retries_rate_limits(self, mocker):
+        api = FakeAPI(failures=2)
+        mocker.patch("openai.Embedding.acreate", new=api)
+        embeddings = OpenAIEmbeddings(backoff=0)
+
+        vectors = asyncio.run(embeddings.run(chunks(2)))
+
+        assert [v[0] for v in vectors] == [0.0, 1.0]
+        assert embeddings.api_calls == 3
+
+    # The error surfaces once the retries are exhausted
+    def test_gives_up_after_max_retries(self, mocker):
+        mocker.patch("openai.Embedding.acreate", new=FakeAPI(failures=10))
+        embeddings = OpenAIEmbeddings(max_retries=2, backoff=0)
+
+        with pytest.raises(openai.error.RateLimitError):
+            asyncio.run(embeddings.run(chunks(2)))
+
+    # Retry-After from the provider takes precedence over the backoff
+    def test_retry_after_header(self):
+        error = openai.error.RateLimitError("slow down", headers={"retry-after": "2"})
+
+        assert OpenAIEmbeddings().retry_delay(error, 0) == 2.0
@@ -0,0 +1,194 @@
+import asyncio
+
+import numpy as np
+
+from cache import EmbeddingCache
+from retrieval.embeddings import OpenAIEmbeddings
+from util.tokens import count_tokens
+
+
+def fake_response(input, model):
+    return {"data": [{"embedding": [float(len(text)), 0.5, -1.0]} for text in input]}
+
+
+def run(embeddings, chunks):
+    return asyncio.run(embeddings.run(chunks))
+
+
+class TestEmbeddingCache:
+    # Vectors are stored as float32 bytes and decoded back to lists
+    def test_stores_float32(self):
+        cache = EmbeddingCache()
+        key = cache.key("model", "hola")
+        cache.set(key, [0.25, -1.5, 3.0])
+        cache._memory.clear()
+
+        assert cache.size == 3 * np.dtype(np.float32).itemsize
+        assert cache.get(key) == [0.25, -1.5, 3.0]
+
+    # The key depends on both the model and the text
+    def test_key_includes_model(self):
+        assert EmbeddingCache.key("a", "hola") != EmbeddingCache.key("b", "hola")
+        assert EmbeddingCache.key("a", "hola") == EmbeddingCache.key("a", "hola")
+
+    # The cache survives a restart
+    def test_persists(self, tmp_path):
+        path = tmp_path / "embeddings.sqlite3"
+        cache = EmbeddingCache(path)
+        cache.set(cache.key("m", "hola"), [1.0, 2.0])
+        cache.close()
+
+        assert EmbeddingCache(path).get(EmbeddingCache.key("m", "hola")) == [1.0, 2.0]
+
+    # An insert below the limits runs a fixed number of statements, none scanning the table
+    def test_set_does_not_scan(self, tmp_path):
+        cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=1000)
+        for i in range(200):
+            cache.set(cache.key("m", str(i)), [float(i)] * 8)
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+
+        cache.set(cache.key("m", "new"), [1.0] * 8)
+        cache.set(cache.key("m", "0"), [2.0] * 4)
+
+        assert len(statements) == 4
+        assert not any("COUNT" in sql or "ORDER BY" in sql for sql in statements)
+        assert len(cache) == 201
+        assert cache.size == (200 * 8 + 8 - 8 + 4) * 4
+
+    # The running totals match the table after evictions, deletes and a reopen
+    def test_totals_survive_eviction_and_reopen(self, tmp_path):
+        path = tmp_path / "embeddings.sqlite3"
+        cache = EmbeddingCache(path, max_entries=50, memory_entries=4)
+        for i in range(120):
+            cache.set(cache.key("m", str(i)), [float(i)] * (i % 5 + 1))
+        cache.delete(cache.key("m", "119"))
+        count, size = cache._conn.execute(
+            "SELECT COUNT(*), SUM(size) FROM entries"
+        ).fetchone()
+
+        assert len(cache) == count <= 50
+        assert cache.size == size
+        cache.close()
+        reopened = EmbeddingCache(path)
+        assert (len(reopened), reopened.size) == (count, size)
+
+    # A batch is read and written in one transaction each, with one eviction check
+    def test_batches_share_a_transaction(self, tmp_path):
+        cache = EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=10, memory_entries=2)
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+
+        cache.set_many((cache.key("m", str(i)), [float(i)]) for i in range(15))
+        cache._memory.clear()
+        values = cache.get_many([cache.key("m", "14"), cache.key("m", "x")])
+
+        assert values == [[14.0], None]
+        assert statements.count("BEGIN") == statements.count("COMMIT") == 2
+        assert sum("ORDER BY" in sql for sql in statements) == 1
+        assert len(cache) <= 10
+
+
+class TestCachedOpenAIEmbeddings:
+    # Only the chunks not seen before are sent, and the order is preserved
+    def test_only_misses_are_requested(self, mocker):
+        acreate = mocker.patch("openai.Embedding.acreate", side_effect=fake_response)
+        embeddings = OpenAIEmbeddings(cache=EmbeddingCache())
+
+        run(embeddings, ["a", "bb"])
+        vectors = run(embeddings, ["ccc", "a", "ccc", "bb"])
+
+        assert acreate.call_count == 2
+        assert acreate.call_args.kwargs["input"] == ["ccc"]
+        assert [v[0] for v in vectors] == [3.0, 1.0, 3.0, 2.0]
+
+    # The cache is read and written once per call, off the event loop
+    def test_cache_access_is_batched(self, mocker):
+        mocker.patch("openai.Embedding.acreate", side_effect=fake_response)
+        cache = EmbeddingCache()
+        get = mocker.spy(cache, "get")
+        get_many = mocker.spy(cache, "get_many")
+        set_many = mocker.spy(cache, "set_many")
+
+        run(OpenAIEmbeddings(cache=cache), ["a", "bb", "a"])
+
+        assert get.call_count == 0
+        assert get_many.call_count == set_many.call_count == 1
+        assert len(set_many.call_args.args[0]) == 2
+
+    # A call fully answered by the cache saves an API request
+    def test_all_hits_skip_the_api(self, mocker):
+        acreate = mocker.patch("openai.Embedding.acreate", side_effect=fake_response)
+        embeddings = OpenAIEmbeddings(cache=EmbeddingCache())
+
+        run(embeddings, ["a", "bb"])
+        run(embeddings, ["bb", "a"])
+
+        assert acreate.call_count == 1
+        assert embeddings.pop_stats() == {
+            "hits": 2,
+            "misses": 2,
+            "hit_rate": 0.5,
+            "api_calls": 1,
+            "saved_calls": 1,
+            "saved_inputs": 2,
+            "saved_tokens": 2,
+        }
+
+    # Chunks answered by the cache count as saved inputs and tokens, also in calls that reach the API
+    def test_partial_hits_count_saved_inputs(self, mocker):
+        mocker.patch("openai.Embedding.acreate", side_effect=fake_response)
+        embeddings = OpenAIEmbeddings(cache=EmbeddingCache())
+
+        run(embeddings, ["aaaaa"])
+        embeddings.pop_stats()
+        run(embeddings, ["ccc", "aaaaa", "ccc"])
+
+        stats = embeddings.pop_stats()
+        assert (stats["hits"], stats["misses"], stats["api_calls"]) == (1, 2, 1)
+        assert stats["saved_calls"] == 0
+        assert stats["saved_inputs"] == 2
+        assert stats["saved_tokens"] == count_tokens("aaaaa") + count_tokens("ccc")
+
+    # Concurrent turns sharing a client keep their own stats
+    def test_concurrent_turns_keep_own_stats(self, mocker):
+        async def slow_response(input, model):
+            await asyncio.sleep(0.01)
+            return fake_response(input, model)
+
+        mocker.patch("openai.Embedding.acreate", side_effect=slow_response)
+        embeddings = OpenAIEmbeddings(cache=EmbeddingCache())
+
+        async def turn(chunks):
+            with embeddings.track_stats():
+                await embeddings.run(chunks)
+                await asyncio.sleep(0.02)
+                return embeddings.pop_stats()
+
+        async def main():
+            return await asyncio.gather(turn(["a", "b"]), turn(["c", "d", "e"]))
+
+        first, second = asyncio.run(main())
+        assert (first["misses"], first["api_calls"]) == (2, 1)
+        assert (second["misses"], second["api_calls"]) == (3, 1)
+        assert embeddings.pop_stats()["api_calls"] == 0
+
+    # Stats are reset after each report so they cover a single turn
+    def test_stats_are_per_turn(self, mocker):
+        mocker.patch("openai.Embedding.acreate", side_effect=fake_response)
+        embeddings = OpenAIEmbeddings(cache=EmbeddingCache())
+
+        run(embeddings, ["a"])
+        embeddings.pop_stats()
+
+        assert embeddings.pop_stats()["api_calls"] == 0
+
+    # Without a cache every call goes to the API
+    def test_no_cache(self, mocker):
+        acreate = mocker.patch("openai.Embedding.acreate", side_effect=fake_response)
+        embeddings = OpenAIEmbeddings()
+
+        run(embeddings, ["a"])
+        run(embeddings, ["a"])
+
+        assert acreate.call_count == 2
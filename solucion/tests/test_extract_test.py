@@ -18,7 +18,7 @@ class TestExtractTextFromUrl:
         mock_response = mocker.Mock()
         mock_response.text = html_content
         mock_response.raise_for_status = mocker.Mock()
-        mocker.patch('requests.get', return_value=mock_response)
+        mocker.patch('requests.Session.get', return_value=mock_response)
 
         result = extract_text_from_url(url)
         expected_result = "Paragraph 1\nParagraph 2"
@@ -27,7 +27,7 @@ class TestExtractTextFromUrl:
     # Handle an empty URL input gracefully
     def test_handle_empty_url_input(self, mocker):
         url = ""
-        mocker.patch('requests.get', side_effect=requests.RequestException("Invalid URL"))
+        mocker.patch('requests.Session.get', side_effect=requests.RequestException("Invalid URL"))
 
         result = extract_text_from_url(url)
         expected_result = "No se pudo extraer contenido relevante."
@@ -40,7 +40,7 @@ class TestExtractTextFromUrl:
         mock_response = mocker.Mock()
         mock_response.text = html_content
         mock_response.raise_for_status = mocker.Mock()
-        mocker.patch('requests.get', return_value=mock_response)
+        mocker.patch('requests.Session.get', return_value=mock_response)
 
         result = extract_text_from_url(url)
         expected_result = "Single Paragraph"
@@ -53,7 +53,7 @@ class TestExtractTextFromUrl:
         mock_response = mocker.Mock()
         mock_response.text = html_content
         mock_response.raise_for_status = mocker.Mock()
-        mocker.patch('requests.get', return_value=mock_response)
+        mocker.patch('requests.Session.get', return_value=mock_response)
 
         result = extract_text_from_url(url)
         expected_result = "Paragraph 1\nParagraph 2"
@@ -64,8 +64,21 @@ class TestExtractTextFromUrl:
         url = "http://example.com"
         mock_response = mocker.Mock()
         mock_response.raise_for_status.side_effect = requests.RequestException("404 Client Error: Not Found")
-        mocker.patch('requests.get', return_value=mock_response)
+        mocker.patch('requests.Session.get', return_value=mock_response)
 
         result = extract_text_from_url(url)
         expected_result = "Error al extraer el contenido."  
         assert result == expected_result, "Expected specific error message for non-200 status code"
+
+    # Access errors go to the log instead of the console
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_access_error_is_logged(self, mocker, streaming):
+        mocker.patch('requests.Session.get', side_effect=requests.ConnectionError("connection refused"))
+        mock_print = mocker.patch('builtins.print')
+        warning = mocker.patch('orchestrator.main.logger.warning')
+
+        result = extract_text_from_url("http://example.com", streaming=streaming)
+
+        assert result == "Error al extraer el contenido."
+        mock_print.assert_not_called()
+        warning.assert_called_once_with("Error al acceder a la URL http://example.com: connection refused")
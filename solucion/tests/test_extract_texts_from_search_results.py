@@ -0,0 +1,102 @@
+import sys
+import time
+from pathlib import Path
+import pytest
+
+# Agregar la carpeta src al PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+# Importar la función que se va a probar
+from orchestrator.main import extract_texts_from_search_results
+
+SEARCH_RESULTS = [
+    {'title': 'Result 1', 'link': 'http://example.com/1'},
+    {'title': 'Result 2', 'link': 'http://example.com/2'},
+    {'title': 'Result 3', 'link': 'http://example.com/3'},
+]
+
+# Demoras simuladas por URL: la primera página es la más lenta
+DELAYS = {
+    'http://example.com/1': 0.3,
+    'http://example.com/2': 0.1,
+    'http://example.com/3': 0.2,
+}
+
+
+def fake_extract(url, timeout=None, streaming=False, page_cache=None):
+    time.sleep(DELAYS[url])
+    return f"Contenido de {url}"
+
+
+class TestExtractTextsFromSearchResults:
+    # Results keep the search ranking even when pages finish out of order
+    def test_results_keep_rank_order(self, mocker):
+        mocker.patch('orchestrator.main.search_google', return_value=SEARCH_RESULTS)
+        mocker.patch('orchestrator.main.extract_text_from_url', side_effect=fake_extract)
+
+        result = extract_texts_from_search_results("test query")
+
+        assert [item['link'] for item in result] == [r['link'] for r in SEARCH_RESULTS]
+        assert result[0]['content'] == "Contenido de http://example.com/1"
+
+    # Progress lines are printed in completion order, not rank order
+    def test_progress_printed_as_pages_finish(self, mocker):
+        mocker.patch('orchestrator.main.search_google', return_value=SEARCH_RESULTS)
+        mocker.patch('orchestrator.main.extract_text_from_url', side_effect=fake_extract)
+        mock_print = mocker.patch('builtins.print')
+
+        extract_texts_from_search_results("test query")
+
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        assert printed == [
+            "Extrayendo contenido de: http://example.com/2",
+            "Extrayendo contenido de: http://example.com/3",
+            "Extrayendo contenido de: http://example.com/1",
+        ]
+
+    # The sequential path also reports each page once it has been extracted
+    def test_sequential_progress_after_each_page(self, mocker):
+        events = []
+        mocker.patch('orchestrator.main.search_google', return_value=SEARCH_RESULTS)
+        mocker.patch('orchestrator.main.extract_text_from_url', side_effect=lambda url, *args: events.append(url))
+        mocker.patch('builtins.print', side_effect=events.append)
+
+        extract_texts_from_search_results("test query", concurrent=False)
+
+        assert events[:2] == ["http://example.com/1", "Extrayendo contenido de: http://example.com/1"]
+
+    # Total latency is close to the slowest page, not the sum of all pages
+    def test_latency_bounded_by_slowest_page(self, mocker):
+        mocker.patch('orchestrator.main.search_google', return_value=SEARCH_RESULTS)
+        mocker.patch('orchestrator.main.extract_text_from_url', side_effect=fake_extract)
+
+        start = time.perf_counter()
+        extract_texts_from_search_results("test query")
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < sum(DELAYS.values())
+
+    # Pages that miss the deadline get the error message instead of blocking the turn
+    def test_slow_page_hits_deadline(self, mocker):
+        mocker.patch('orchestrator.main.search_google', return_value=SEARCH_RESULTS)
+        mocker.patch('orchestrator.main.extract_text_from_url', side_effect=fake_extract)
+
+        result = extract_texts_from_search_results("test query", timeout=0.25)
+
+        assert result[0]['content'] == "Error al extraer el contenido."
+        assert result[1]['content'] == "Contenido de http://example.com/2"
+
+    # The sequential mode is still available
+    def test_sequential_mode(self, mocker):
+        mocker.patch('orchestrator.main.search_google', return_value=SEARCH_RESULTS)
+        mocker.patch('orchestrator.main.extract_text_from_url', side_effect=fake_extract)
+
+        result = extract_texts_from_search_results("test query", concurrent=False)
+
+        assert [item['title'] for item in result] == ['Result 1', 'Result 2', 'Result 3']
+
+    # No search results means nothing to extract
+    def test_no_search_results(self, mocker):
+        mocker.patch('orchestrator.main.search_google', return_value=[])
+
+        assert extract_texts_from_search_results("test query") == []
@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+import pytest
+
+from retrieval.scraper import HedgedScraper, Scraper
+from util.metrics import LatencyHistogram, WindowedHistogram
+
+URL = "http://example.com/manzanos"
+
+
+class DelayedScraper(Scraper):
+    def __init__(self, delay, text="poda de manzanos", error=None):
+        super().__init__()
+        self.delay = delay
+        self.text = text
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def fetch(self, url):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return {"url": url, "text": self.text}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fetch(scraper, url=URL):
+    start = time.perf_counter()
+    result = asyncio.run(scraper.fetch(url))
+    return result, time.perf_counter() - start
+
+
+class TestHedgedScraper:
+    # A fast primary answers alone and the secondary is never called
+    def test_fast_primary(self):
+        primary, secondary = DelayedScraper(0.01), DelayedScraper(0.01, text="otro")
+        scraper = HedgedScraper(primary, secondary, default_delay=0.2)
+
+        result, _ = fetch(scraper)
+
+        assert result == {"url": URL, "text": "poda de manzanos"}
+        assert secondary.calls == 0
+        assert scraper.hedged == 0
+
+    # A slow primary is raced by the secondary, which wins and cancels it
+    def test_slow_primary_is_hedged(self):
+        primary, secondary = DelayedScraper(5.0), DelayedScraper(0.01, text="respuesta local")
+        scraper = HedgedScraper(primary, secondary, default_delay=0.05)
+
+        result, elapsed = fetch(scraper)
+
+        assert result["text"] == "respuesta local"
+        assert elapsed < 1.0
+        assert primary.cancelled == 1
+        assert scraper.hedged == 1
+        assert scraper.secondary_wins == 1
+
+    # The primary still wins if it finishes before the hedge
+    def test_primary_wins_race(self):
+        primary, secondary = DelayedScraper(0.1), DelayedScraper(5.0, text="otro")
+        scraper = HedgedScraper(primary, secondary, default_delay=0.05)
+
+        result, elapsed = fetch(scraper)
+
+        assert result["text"] == "poda de manzanos"
+        assert elapsed < 1.0
+        assert secondary.cancelled == 1
+        assert scraper.secondary_wins == 0
+
+    # A primary that fails or returns no text is hedged immediately
+    @pytest.mark.parametrize("kwargs", [{"text": None}, {"error": RuntimeError("caído")}])
+    def test_failed_primary(self, kwargs):
+        primary, secondary = DelayedScraper(0.0, **kwargs), DelayedScraper(0.01, text="local")
+        scraper = HedgedScraper(primary, secondary, default_delay=5.0)
+
+        result, elapsed = fetch(scraper)
+
+        assert result["text"] == "local"
+        assert elapsed < 1.0
+
+    # When neither backend has text the primary's empty answer is returned
+    def test_both_empty(self):
+        scraper = HedgedScraper(DelayedScraper(0.0, text=None), DelayedScraper(0.0, text=None))
+
+        result, _ = fetch(scraper)
+
+        assert result == {"url": URL, "text": None}
+
+    # The hedge delay follows the primary's latency percentile once there are samples
+    def test_delay_from_histogram(self):
+        scraper = HedgedScraper(DelayedScraper(0), DelayedScraper(0), default_delay=2.0, min_samples=10)
+        assert scraper.hedge_delay() == 2.0
+
+        for _ in range(19):
+            scraper.latencies["primary"].record(0.1)
+        scraper.latencies["primary"].record(3.0)
+
+        assert scraper.hedge_delay() == pytest.approx(0.1, rel=0.1)
+
+    # Once the primary slows down, the old fast samples age out of the delay
+    def test_delay_follows_recent_latencies(self):
+        clock = FakeClock()
+        scraper = HedgedScraper(
+            DelayedScraper(0), DelayedScraper(0), min_samples=10, window=60, clock=clock
+        )
+        for _ in range(100):
+            scraper.latencies["primary"].record(0.1)
+        clock.now += 61
+        for _ in range(20):
+            scraper.latencies["primary"].record(2.0)
+
+        assert scraper.hedge_delay() == pytest.approx(2.0, rel=0.1)
+
+    # A primary that loses the race is recorded with the time it took until cancelled
+    def test_cancelled_primary_is_recorded(self):
+        primary, secondary = DelayedScraper(5.0), DelayedScraper(0.01, text="local")
+        scraper = HedgedScraper(primary, secondary, default_delay=0.05)
+
+        fetch(scraper)
+
+        latencies = scraper.latencies["primary"].recent()
+        assert latencies.count == 1
+        assert latencies.mean >= 0.05
+
+
+class TestLatencyHistogram:
+    # Percentiles are accurate to the bucket width
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for i in range(1, 101):
+            histogram.record(i / 100)
+
+        assert histogram.percentile(50) == pytest.approx(0.5, rel=0.1)
+        assert histogram.percentile(95) == pytest.approx(0.95, rel=0.1)
+        assert histogram.mean == pytest.approx(0.505)
+
+    # An empty histogram reports zero and out-of-range values land in the edge buckets
+    def test_edges(self):
+        histogram = LatencyHistogram()
+        assert histogram.percentile(95) == 0.0
+
+        histogram.record(0.0)
+        histogram.record(1000.0)
+
+        assert histogram.percentile(1) <= 0.001
+        assert histogram.percentile(100) >= 60.0
+
+
+class TestWindowedHistogram:
+    # Samples older than the window are forgotten, recent ones are kept
+    def test_window(self):
+        clock = FakeClock()
+        histogram = WindowedHistogram(window=60, slices=6, clock=clock)
+        histogram.record(1.0)
+        clock.now += 30
+        histogram.record(0.01)
+
+        assert histogram.count == 2
+        clock.now += 40
+        assert histogram.count == 1
+        assert histogram.percentile(100) == pytest.approx(0.01, rel=0.1)
+        clock.now += 60
+        assert histogram.count == 0
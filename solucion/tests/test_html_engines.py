@@ -0,0 +1,54 @@
+from pathlib import Path
+import pytest
+
+from extraction.engines import available_engines, get_engine
+
+FIXTURES = sorted((Path(__file__).resolve().parent / "fixtures" / "html").glob("*.html"))
+
+
+class TestHtmlEngines:
+    # BeautifulSoup is always there as a fallback
+    def test_beautifulsoup_available(self):
+        assert "beautifulsoup" in available_engines()
+        assert get_engine("beautifulsoup") is get_engine("beautifulsoup")
+
+    # Unknown engine names are rejected
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            get_engine("regex")
+
+    # Every installed engine gives the same output as BeautifulSoup on the recorded pages
+    @pytest.mark.parametrize("name", available_engines())
+    @pytest.mark.parametrize("fixture", FIXTURES, ids=lambda path: path.stem)
+    def test_output_matches_beautifulsoup(self, name, fixture):
+        html = fixture.read_text(encoding="utf-8")
+        engine, reference = get_engine(name), get_engine("beautifulsoup")
+
+        assert engine.article_text(html) == reference.article_text(html)
+        assert engine.text(html) == reference.text(html)
+
+    # The default engine, used when HTML_ENGINE is unset, keeps the previous output on the recorded pages
+    @pytest.mark.parametrize("fixture", FIXTURES, ids=lambda path: path.stem)
+    def test_default_engine_matches_beautifulsoup(self, fixture):
+        html = fixture.read_text(encoding="utf-8")
+        reference = get_engine("beautifulsoup")
+
+        assert get_engine().name == available_engines()[0]
+        assert get_engine().article_text(html) == reference.article_text(html)
+        assert get_engine().text(html) == reference.text(html)
+
+    # Unclosed paragraphs are closed like a browser does; html.parser nests them (documented in the README)
+    @pytest.mark.parametrize("name", [name for name in available_engines() if name != "beautifulsoup"])
+    def test_unclosed_paragraphs(self, name):
+        html = "<p>uno<p>dos"
+
+        assert get_engine(name).article_text(html) == "uno\ndos"
+        assert get_engine("beautifulsoup").article_text(html) == "unodos\ndos"
+
+    # Pages without paragraphs fall back to every text node
+    @pytest.mark.parametrize("name", available_engines())
+    def test_article_text_fallback(self, name):
+        html = "<html><body><div>Solo</div><span>texto</span><script>x=1</script></body></html>"
+
+        assert get_engine(name).article_text(html) == "Solo\ntexto"
+        assert get_engine(name).article_text("") == "No se pudo extraer contenido relevante."
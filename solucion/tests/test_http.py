@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+from util import http
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+class TestSharedHttpClient:
+    # The sync session is created once per process
+    def test_sync_session_is_shared(self):
+        assert http.get_session() is http.get_session()
+
+    # Sequential requests to the same host reuse one keep-alive connection
+    def test_sync_connections_are_reused(self, server_url):
+        http.close()
+        http.sync_stats.reset()
+
+        for _ in range(5):
+            assert http.get_session().get(server_url, timeout=5).text == "ok"
+
+        assert http.connection_stats()["sync"] == {"requests": 5, "new": 1, "reused": 4}
+        http.close()
+
+    # The async session is shared inside a loop and connections are reused
+    def test_async_connections_are_reused(self, server_url):
+        async def run():
+            http.async_stats.reset()
+            session = http.get_async_session()
+            assert http.get_async_session() is session
+            for _ in range(5):
+                async with http.get_async_session().get(server_url) as response:
+                    assert await response.text() == "ok"
+            await http.aclose()
+            assert session.closed
+
+        asyncio.run(run())
+
+        assert http.connection_stats()["async"] == {"requests": 5, "new": 1, "reused": 4}
+
+    # Loops running at the same time in different threads keep their own sessions
+    def test_concurrent_loops_have_own_sessions(self, server_url):
+        started = threading.Barrier(2)
+
+        async def worker():
+            session = http.get_async_session()
+            await asyncio.get_running_loop().run_in_executor(None, started.wait)
+            async with http.get_async_session().get(server_url) as response:
+                assert await response.text() == "ok"
+            assert http.get_async_session() is session
+            assert not session.closed
+            await http.aclose()
+            return session
+
+        with ThreadPoolExecutor(2) as executor:
+            sessions = list(executor.map(lambda _: asyncio.run(worker()), range(2)))
+
+        assert sessions[0] is not sessions[1]
+        assert all(session.closed for session in sessions)
+
+    # A session left behind by a finished event loop is closed when replaced
+    def test_async_session_of_old_loop_is_closed(self):
+        async def session():
+            return http.get_async_session()
+
+        first = asyncio.run(session())
+        second = asyncio.run(session())
+
+        assert first is not second
+        assert first.closed
+
+        async def close():
+            session = http.get_async_session()
+            await http.aclose()
+            return session
+
+        third = asyncio.run(close())
+        assert second.closed
+        assert third.closed
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ORCHESTRATOR = Path(__file__).resolve().parent.parent / "src" / "orchestrator"
+# Cumulative time of `import retrieval` and of `import main`, both measured
+# around 0.28 s; retrieval took 1.1 s when LangChain, openai and aiohttp were
+# loaded eagerly.
+BUDGET_SECONDS = 0.75
+# Loaded on first use only. numpy (about 0.08 s) is left out on purpose: it
+# backs DocumentBatch, the vector cache and util.similarity, which every
+# query goes through, so deferring it would only move the cost to the first
+# question. main also loads requests eagerly, for the sequential extraction.
+LAZY_MODULES = ["langchain", "openai", "aiohttp", "requests", "mocks", "pandas", "sklearn", "bs4"]
+
+
+def import_times(module):
+    """Cumulative `-X importtime` microseconds per loaded module, from a fresh interpreter."""
+
+    env = {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith(("GOOGLE_", "HEADER_"))
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ORCHESTRATOR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime:
+    # retrieval and main import without configuration and without their heavy dependencies
+    @pytest.mark.parametrize(
+        "module, eager", [("retrieval", set()), ("main", {"requests"})]
+    )
+    def test_heavy_dependencies_are_lazy(self, module, eager):
+        loaded = {name.split(".")[0] for name in import_times(module)}
+
+        assert [name for name in LAZY_MODULES if name in loaded - eager] == []
+
+    # The cold start stays within budget (best of three runs, to absorb noise)
+    @pytest.mark.parametrize("module", ["retrieval", "main"])
+    def test_cold_start_budget(self, module):
+        best = min(import_times(module)[module] for _ in range(3)) / 1e6
+
+        assert best < BUDGET_SECONDS, f"import {module} took {best:.3f}s"
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm import HuggingFaceClient
+from util import http
+from llm.streaming import AsyncTokenStream, StreamError, TokenStream, aiter_tokens, iter_tokens
+
+
+def frame(text, special=False):
+    token = {"id": 1, "text": text, "logprob": -0.1, "special": special}
+    return ("data:" + json.dumps({"token": token, "generated_text": None})).encode("utf-8")
+
+
+class TestTokenStream:
+    # TGI frames are decoded into clean tokens, skipping keep-alives and special tokens
+    def test_parses_sse_frames(self):
+        lines = [frame("París"), b"", b": keep-alive", frame(" es"), frame(" la capital"), frame("</s>", special=True)]
+
+        assert list(iter_tokens(lines)) == ["París", " es", " la capital"]
+
+    # Non SSE answers fall back to the generated text or the raw line
+    def test_parses_non_streaming_answers(self):
+        lines = [json.dumps([{"generated_text": "Respuesta completa"}]).encode("utf-8"), b"line 1"]
+
+        assert list(iter_tokens(lines)) == ["Respuesta completa", "line 1\n"]
+
+    # Error frames are raised instead of being printed as text
+    def test_error_frame_raises(self):
+        with pytest.raises(StreamError):
+            list(iter_tokens([b'data:{"error": "Model is overloaded"}']))
+
+    # Malformed frames raise StreamError instead of a raw JSON error
+    @pytest.mark.parametrize("line", [b"data: {not json", b"data: [1, 2]", b'data: {"token": "Hola"}'])
+    def test_malformed_frame_raises(self, line):
+        with pytest.raises(StreamError):
+            list(iter_tokens([frame("Hola"), line]))
+
+    # The full answer and the timing stats are available once the stream ends
+    def test_records_stats(self):
+        stream = TokenStream(iter_tokens([frame("Hola"), frame(" mundo")]))
+
+        assert list(stream) == ["Hola", " mundo"]
+        assert stream.text == "Hola mundo"
+        assert stream.stats.tokens == 2
+        assert stream.stats.time_to_first_token is not None
+        assert stream.stats.total_time >= stream.stats.time_to_first_token
+        assert stream.stats.tokens_per_second > 0
+
+    # The async generator API yields the same tokens
+    def test_async_stream(self):
+        async def lines():
+            for line in [frame("Hola"), frame(" mundo")]:
+                yield line
+
+        async def collect():
+            stream = AsyncTokenStream(aiter_tokens(lines()))
+            tokens = [token async for token in stream]
+            return tokens, stream
+
+        tokens, stream = asyncio.run(collect())
+        assert tokens == ["Hola", " mundo"]
+        assert stream.text == "Hola mundo"
+        assert stream.stats.tokens == 2
+
+
+class LoadingModelHandler(BaseHTTPRequestHandler):
+    """Answers like a model that is still loading."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = b'{"error": "Model is currently loading"}'
+        self.send_response(503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StallingModelHandler(BaseHTTPRequestHandler):
+    """Sends one token and then stops answering."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        self.wfile.write(frame("Hola") + b"\n\n")
+        self.wfile.flush()
+        time.sleep(1)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/generate"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def loading_model_url():
+    yield from serve(LoadingModelHandler)
+
+
+@pytest.fixture
+def stalling_model_url():
+    yield from serve(StallingModelHandler)
+
+
+def astream_tokens(client):
+    async def collect():
+        tokens = []
+        try:
+            async for token in await client.astream("hola"):
+                tokens.append(token)
+        finally:
+            await http.aclose()
+        return tokens
+
+    return asyncio.run(collect())
+
+
+class TestHuggingFaceClient:
+    # Rejected requests give their connection back, so the pool never runs dry
+    def test_rejections_release_the_pool(self, loading_model_url):
+        client = HuggingFaceClient(loading_model_url, "key", connect_timeout=1, read_timeout=1)
+
+        for _ in range(25):
+            with pytest.raises(StreamError) as error:
+                client.stream("hola")
+            assert error.value.status_code == 503
+
+    # The response is closed once its tokens are consumed, and the request has a timeout
+    def test_stream_closes_response(self, mocker):
+        response = mocker.Mock(status_code=200)
+        response.iter_lines.return_value = iter([frame("Hola")])
+        post = mocker.patch("requests.Session.post", return_value=response)
+
+        stream = HuggingFaceClient("http://llm", "key").stream("hola")
+
+        assert list(stream) == ["Hola"]
+        response.close.assert_called_once()
+        assert post.call_args.kwargs["timeout"] == (10, 120)
+
+    # Connection errors of the async client are raised as StreamError
+    def test_astream_connection_error(self):
+        with socket.socket() as unused:
+            unused.bind(("127.0.0.1", 0))
+            port = unused.getsockname()[1]
+        client = HuggingFaceClient(f"http://127.0.0.1:{port}/generate", "key", connect_timeout=1)
+
+        with pytest.raises(StreamError):
+            astream_tokens(client)
+
+    # A model that stops sending tokens raises StreamError once the read timeout passes
+    def test_astream_read_timeout(self, stalling_model_url):
+        client = HuggingFaceClient(stalling_model_url, "key", connect_timeout=1, read_timeout=0.2)
+
+        with pytest.raises(StreamError):
+            astream_tokens(client)
@@ -0,0 +1,121 @@
+import io
+import json
+import logging
+import logging.handlers
+import time
+
+import pytest
+
+from util.logger import DeferredQueueHandler, logger, setup_logging, shutdown_logging
+
+
+class SlowStream(io.StringIO):
+    def write(self, text):
+        time.sleep(0.05)
+        return super().write(text)
+
+
+def config(name, stream, level="INFO"):
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {"memory": {"()": lambda: logging.StreamHandler(stream)}},
+        "loggers": {name: {"handlers": ["memory"], "level": level, "propagate": False}},
+    }
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    root_handlers, root_level = logging.root.handlers[:], logging.root.level
+    handlers, level, propagate = logger.handlers[:], logger.level, logger.propagate
+    yield
+    shutdown_logging()
+    logging.root.handlers[:] = root_handlers
+    logging.root.setLevel(root_level)
+    logger.handlers[:] = handlers
+    logger.setLevel(level)
+    logger.propagate = propagate
+
+
+class TestSetupLogging:
+    # Records go through a queue and are written once the listener drains it
+    def test_handlers_run_behind_a_queue(self):
+        stream = io.StringIO()
+        setup_logging(config("test.queue", stream))
+        test_logger = logging.getLogger("test.queue")
+
+        assert [type(h) for h in test_logger.handlers] == [DeferredQueueHandler]
+        test_logger.info("páginas: %d", 3)
+        test_logger.debug("filtrado por nivel")
+        shutdown_logging()
+
+        assert stream.getvalue() == "páginas: 3\n"
+        assert [type(h) for h in test_logger.handlers] == [logging.StreamHandler]
+
+    # A slow handler does not slow down the caller
+    def test_slow_handler_does_not_block(self):
+        setup_logging(config("test.slow", SlowStream()))
+        test_logger = logging.getLogger("test.slow")
+
+        start = time.perf_counter()
+        for i in range(10):
+            test_logger.info("mensaje %d", i)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.05
+
+    # The message is fixed when logged, even if its arguments change later
+    def test_message_resolved_when_logged(self):
+        stream = io.StringIO()
+        setup_logging(config("test.args", stream))
+        urls = ["http://example.com/a"]
+
+        logging.getLogger("test.args").info("urls: %s", urls)
+        urls.append("http://example.com/b")
+        shutdown_logging()
+
+        assert stream.getvalue() == "urls: ['http://example.com/a']\n"
+
+    # JSON output writes one object per record, with the traceback
+    def test_json_output(self):
+        stream = io.StringIO()
+        setup_logging(config("test.json", stream), json_output=True)
+        try:
+            raise ValueError("roto")
+        except ValueError:
+            logging.getLogger("test.json").exception("falló %s", "la búsqueda")
+        shutdown_logging()
+
+        entry = json.loads(stream.getvalue())
+        assert entry["level"] == "ERROR"
+        assert entry["logger"] == "test.json"
+        assert entry["message"] == "falló la búsqueda"
+        assert "ValueError: roto" in entry["exc_info"]
+
+    # Levels per logger are read from a logging.conf style file
+    def test_file_config(self, tmp_path):
+        path = tmp_path / "logging.conf"
+        path.write_text(
+            "[loggers]\nkeys=root,scraper\n\n"
+            "[handlers]\nkeys=console\n\n"
+            "[formatters]\nkeys=plain\n\n"
+            "[logger_root]\nlevel=WARNING\nhandlers=console\n\n"
+            "[logger_scraper]\nlevel=ERROR\nhandlers=console\nqualname=test.scraper\npropagate=0\n\n"
+            "[handler_console]\nclass=StreamHandler\nformatter=plain\nargs=(sys.stderr,)\n\n"
+            "[formatter_plain]\nformat=%(message)s\n",
+            encoding="utf-8",
+        )
+
+        setup_logging(path)
+
+        scraper = logging.getLogger("test.scraper")
+        assert scraper.level == logging.ERROR
+        assert [type(h) for h in scraper.handlers] == [DeferredQueueHandler]
+        assert [type(h) for h in logging.root.handlers] == [DeferredQueueHandler]
+
+    # The default configuration applies to the orchestrator logger
+    def test_default_config(self):
+        setup_logging()
+
+        assert logger.name == "orchestrator"
+        assert [type(h) for h in logger.handlers] == [DeferredQueueHandler]
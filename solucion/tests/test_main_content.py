@@ -0,0 +1,91 @@
+from pathlib import Path
+import pytest
+
+from extraction import StreamingExtractor, extract_main_content, get_engine
+from extraction.boilerplate import NEGATIVE
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "html"
+
+
+def fixture(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+class TestMainContent:
+    # The article body is kept and the page chrome is dropped
+    @pytest.mark.parametrize("name, kept, dropped", [
+        (
+            "gardening_apple_trees.html",
+            ["al inicio de la primavera", "Poda de formación", "Gala combina con Fuji"],
+            ["Usamos cookies", "Plantas de interior", "Calendario de poda", "Excelente guía", "Todos los derechos"],
+        ),
+        (
+            "news_inflation_report.html",
+            ["alza del 3,5%", "Las regiones"],
+            ["cookies propias", "Dólar blue", "plazo fijo con la mejor tasa", "Las más leídas", "suscribite"],
+        ),
+        (
+            "encyclopedia_buenos_aires.html",
+            ["Juan de Garay", "templado húmedo"],
+            ["Crear una cuenta", "Página aleatoria", "Política de privacidad", "Capitales de América del Sur"],
+        ),
+        (
+            "docs_text_splitters.html",
+            ["Recursively split by character", "token limit"],
+            ["Version 2.0 is out", "Vector stores", "Edit this page", "Discord"],
+        ),
+    ])
+    def test_keeps_article_drops_boilerplate(self, name, kept, dropped):
+        text = extract_main_content(fixture(name))
+
+        for phrase in kept:
+            assert phrase in text
+        for phrase in dropped:
+            assert phrase not in text
+
+    # Main content is much smaller than the full page text
+    def test_smaller_than_full_text(self):
+        html = fixture("encyclopedia_buenos_aires.html")
+
+        assert len(extract_main_content(html)) < 0.9 * len(get_engine("beautifulsoup").text(html))
+
+    # The streaming extractor gives the same result when fed in chunks
+    def test_streaming_main_content(self):
+        html = fixture("news_inflation_report.html")
+        data = html.encode("utf-8")
+        extractor = StreamingExtractor(main_content=True)
+        for i in range(0, len(data), 500):
+            extractor.feed(data[i:i + 500])
+        extractor.close()
+
+        assert extractor.main_text == extract_main_content(html)
+
+    # Pages without markup structure still return their text
+    def test_plain_page(self):
+        assert extract_main_content("<html><body><p>Un párrafo con varias palabras.</p></body></html>") == "Un párrafo con varias palabras."
+        assert extract_main_content("") == ""
+
+    # Boilerplate class names match whole words only
+    @pytest.mark.parametrize("names, negative", [
+        ("site-nav", True),
+        ("ad_slot top", True),
+        ("share-buttons", True),
+        ("main-menu", True),
+        ("comments", True),
+        ("heads", False),
+        ("canvas", False),
+        ("stock", False),
+        ("photocredit", False),
+        ("shared-content", False),
+    ])
+    def test_negative_names(self, names, negative):
+        assert bool(NEGATIVE.search(names)) is negative
+
+    # Content inside containers whose names only contain a boilerplate word is kept
+    def test_keeps_lookalike_classes(self):
+        html = (
+            '<html><body><div class="shared-content"><p>La poda de invierno fortalece los manzanos jóvenes.</p></div>'
+            '<div class="nav"><p>Inicio Contacto Secciones</p></div></body></html>'
+        )
+
+        assert extract_main_content(html) == "La poda de invierno fortalece los manzanos jóvenes."
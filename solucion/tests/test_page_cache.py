@@ -0,0 +1,108 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import pytest
+
+# Agregar la carpeta src al PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from orchestrator.main import extract_text_from_url
+from cache import PageCache
+from cache.page import CachedPage
+
+
+class Site:
+    version = "v1"
+    responses = []
+
+
+class EtagHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        etag = f'"{Site.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            Site.responses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = f"<html><body><p>Contenido {Site.version}</p></body></html>".encode("utf-8")
+        Site.responses.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Wed, 21 Oct 2015 07:28:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site_url():
+    Site.version = "v1"
+    Site.responses = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EtagHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/page"
+    server.shutdown()
+    server.server_close()
+
+
+class TestPageCache:
+    # A second fetch is revalidated and the stored text is reused on 304
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_revalidation_reuses_text(self, site_url, streaming):
+        cache = PageCache()
+
+        first = extract_text_from_url(site_url, streaming=streaming, page_cache=cache)
+        second = extract_text_from_url(site_url, streaming=streaming, page_cache=cache)
+
+        assert first == second == "Contenido v1"
+        assert Site.responses == [200, 304]
+        assert cache.metrics()["not_modified"] == 1
+        assert cache.metrics()["hit_rate"] == 0.5
+
+    # A changed page replaces the stored text
+    def test_changed_page_is_refetched(self, site_url):
+        cache = PageCache()
+        extract_text_from_url(site_url, page_cache=cache)
+        Site.version = "v2"
+
+        assert extract_text_from_url(site_url, page_cache=cache) == "Contenido v2"
+        assert cache.metrics()["changed"] == 1
+        assert cache.get(PageCache.key(site_url, "article")).etag == '"v2"'
+
+    # Fresh pages are served without any request
+    def test_fresh_page_skips_network(self, site_url):
+        cache = PageCache(max_age=60)
+        extract_text_from_url(site_url, page_cache=cache)
+
+        assert extract_text_from_url(site_url, page_cache=cache) == "Contenido v1"
+        assert Site.responses == [200]
+
+    # The byte budget evicts the least recently used pages
+    def test_byte_budget(self):
+        cache = PageCache(max_bytes=2000, memory_entries=1)
+        for i in range(20):
+            cache.set(f"|http://example.com/{i}", CachedPage(text="x" * 300))
+
+        assert cache.size <= 2000
+        assert cache.get("|http://example.com/0") is None
+        assert cache.get("|http://example.com/19").text == "x" * 300
+
+    # Validators are turned into conditional request headers
+    def test_conditional_headers(self):
+        page = CachedPage(text="t", etag='"abc"', last_modified="Wed, 21 Oct 2015 07:28:00 GMT")
+
+        assert PageCache.conditional_headers(page) == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+        }
+        assert PageCache.conditional_headers(None) == {}
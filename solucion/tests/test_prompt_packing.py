@@ -0,0 +1,79 @@
+import pytest
+
+from prompt.packing import pack_context, split_into_chunks
+from util.tokens import count_tokens, split_offset, truncate_to_tokens
+
+FILLER = "\n".join(f"Párrafo de relleno {i} sobre temas generales sin relación." for i in range(200))
+
+class ByteEncoder:
+    """Tokenizer with two UTF-8 bytes per token, so tokens can end inside a character."""
+
+    def encode(self, text, disallowed_special=()):
+        data = text.encode("utf-8")
+        return [data[i:i + 2] for i in range(0, len(data), 2)]
+
+    def decode_bytes(self, tokens):
+        return b"".join(tokens)
+
+    def decode(self, tokens):
+        return self.decode_bytes(tokens).decode("utf-8", errors="replace")
+
+
+EXTRACTED_TEXTS = [
+    {"title": "Relleno", "link": "http://example.com/relleno", "content": FILLER},
+    {
+        "title": "Manzanos",
+        "link": "http://example.com/manzanos",
+        "content": FILLER + "\nEl mejor momento para plantar un manzano es al inicio de la primavera.",
+    },
+]
+
+
+class TestPackContext:
+    # The packed context never exceeds the token budget
+    def test_respects_budget(self):
+        packed = pack_context("¿Cuándo plantar un manzano?", EXTRACTED_TEXTS, max_tokens=300)
+
+        assert packed.tokens_used <= 300
+        assert packed.tokens_available > packed.tokens_used
+        assert count_tokens(packed.text) <= 300
+
+    # The chunk that answers the question is picked, with its attribution
+    def test_keeps_most_relevant_chunk_with_source(self):
+        packed = pack_context("¿Cuándo plantar un manzano?", EXTRACTED_TEXTS, max_tokens=200, chunk_tokens=50)
+
+        assert "inicio de la primavera" in packed.text
+        assert "Título: Manzanos\nEnlace: http://example.com/manzanos" in packed.text
+        assert {"title": "Manzanos", "link": "http://example.com/manzanos"} in packed.sources
+
+    # Everything fits when the budget is large enough
+    def test_large_budget_keeps_everything(self):
+        packed = pack_context("manzano", EXTRACTED_TEXTS, max_tokens=100000)
+
+        assert packed.tokens_used == packed.tokens_available
+        assert [source["title"] for source in packed.sources] == ["Relleno", "Manzanos"]
+
+    # Items without content still get a placeholder
+    def test_missing_content(self):
+        packed = pack_context("Spain", [{"title": "Spain", "link": "http://example.com/spain"}])
+
+        assert "Contenido no disponible." in packed.text
+
+    # Long paragraphs are cut to the chunk size
+    def test_split_long_paragraph(self):
+        chunks = split_into_chunks("palabra " * 1000, chunk_tokens=100)
+
+        assert len(chunks) > 1
+        assert all(count_tokens(chunk) <= 100 for chunk in chunks)
+
+    # Cuts fall on whole characters even when a token ends inside one, and no text is lost
+    def test_split_on_token_boundaries(self, mocker):
+        mocker.patch("util.tokens._encoder", return_value=ByteEncoder())
+        text = "ñandú camión " * 40
+
+        assert split_offset("ñandú", 1) == 1
+        assert truncate_to_tokens("ñandú", 3) == "ñand"
+        chunks = split_into_chunks(text, chunk_tokens=9)
+        assert all(count_tokens(chunk) <= 9 for chunk in chunks)
+        assert " ".join(chunks).split() == text.split()
+        assert "".join(split_into_chunks("añ" * 30, chunk_tokens=4)) == "añ" * 30
@@ -0,0 +1,210 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from yarl import URL
+
+from cache import NegativeCache
+from models.search import SearchDoc, SearchResult
+from retrieval.retriever import Retriever
+from retrieval.scraper import ResilientScraper, Scraper
+from util.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+from tests.fakes import FakeEmbeddings, LineSplitter
+
+
+def http_error(status, retry_after=None):
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    url = URL("http://caido.com/pagina")
+    request = aiohttp.RequestInfo(url, "GET", {}, url)
+    return aiohttp.ClientResponseError(request, (), status=status, headers=headers)
+
+
+class FlakyScraper(Scraper):
+    """Raises the queued errors in order, then answers with text."""
+
+    def __init__(self, errors=()):
+        super().__init__()
+        self.errors = list(errors)
+        self.calls = []
+
+    async def fetch(self, url):
+        self.calls.append(url)
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"url": url, "text": "poda de manzanos"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fetch(scraper, url="http://caido.com/pagina"):
+    return asyncio.run(scraper.fetch(url))
+
+
+class TestResilientScraper:
+    # Transient errors are retried with backoff until the page arrives
+    def test_retries_transient(self, mocker):
+        sleep = mocker.patch("retrieval.scraper.asyncio.sleep", new=mocker.AsyncMock())
+        inner = FlakyScraper([aiohttp.ClientConnectionError(), http_error(503)])
+        scraper = ResilientScraper(inner, max_retries=2)
+
+        result = fetch(scraper)
+
+        assert result["text"] == "poda de manzanos"
+        assert len(inner.calls) == 3
+        assert sleep.await_count == 2
+        assert scraper.retries == 2
+
+    # Retry-After is honored on 429 answers
+    def test_retry_after(self, mocker):
+        sleep = mocker.patch("retrieval.scraper.asyncio.sleep", new=mocker.AsyncMock())
+        scraper = ResilientScraper(FlakyScraper([http_error(429, retry_after="1.5")]))
+
+        fetch(scraper)
+
+        sleep.assert_awaited_once_with(1.5)
+
+    # A Retry-After longer than the backoff cap fails the page and keeps the URL out that long
+    def test_long_retry_after(self, mocker):
+        sleep = mocker.patch("retrieval.scraper.asyncio.sleep", new=mocker.AsyncMock())
+        clock = FakeClock()
+        inner = FlakyScraper([http_error(503, retry_after="600")])
+        scraper = ResilientScraper(inner, negative_cache=NegativeCache(ttl=300, clock=clock))
+
+        result = fetch(scraper)
+        clock.now += 400
+        skipped = fetch(scraper)
+
+        assert result["text"] is None
+        assert skipped["text"] is None
+        assert len(inner.calls) == 1
+        assert sleep.await_count == 0
+        assert scraper.retries == 0
+        clock.now += 201
+        assert fetch(scraper)["text"] == "poda de manzanos"
+
+    # Timeouts and permanent errors are not retried and do not raise
+    @pytest.mark.parametrize("error", [asyncio.TimeoutError(), http_error(404), ValueError("html roto")])
+    def test_no_retry(self, error):
+        inner = FlakyScraper([error])
+        scraper = ResilientScraper(inner)
+
+        result = fetch(scraper)
+
+        assert result == {"url": "http://caido.com/pagina", "text": None}
+        assert len(inner.calls) == 1
+        assert scraper.failures == 1
+
+    # A URL that just failed is skipped without calling the scraper
+    def test_negative_cache(self):
+        inner = FlakyScraper([asyncio.TimeoutError()])
+        scraper = ResilientScraper(inner)
+
+        fetch(scraper)
+        result = fetch(scraper)
+
+        assert result["text"] is None
+        assert len(inner.calls) == 1
+        assert scraper.skipped == 1
+
+    # A domain that keeps failing is skipped in microseconds
+    def test_open_circuit_skips_domain(self):
+        inner = FlakyScraper([asyncio.TimeoutError()] * 3)
+        scraper = ResilientScraper(inner, breaker=CircuitBreaker(threshold=3))
+        for i in range(3):
+            fetch(scraper, f"http://caido.com/{i}")
+
+        start = time.perf_counter()
+        result = fetch(scraper, "http://caido.com/otra")
+        elapsed = time.perf_counter() - start
+
+        assert result["text"] is None
+        assert len(inner.calls) == 3
+        assert elapsed < 0.05
+        assert scraper.stats()["open_circuits"] == ["caido.com"]
+        assert fetch(scraper, "http://sano.com/pagina")["text"] == "poda de manzanos"
+
+    # A failing page no longer fails the whole retrieval
+    def test_retriever_survives_errors(self):
+        class BrokenSearcher:
+            async def run(self, query):
+                return SearchResult(
+                    items=[SearchDoc(link="http://caido.com/a"), SearchDoc(link="http://sano.com/b")]
+                )
+
+        class PartlyBroken(Scraper):
+            async def fetch(self, url):
+                if "caido" in url:
+                    raise aiohttp.ClientConnectionError()
+                return {"url": url, "text": "poda de manzanos"}
+
+        for pipelined in (False, True):
+            retriever = Retriever(
+                BrokenSearcher(), PartlyBroken(), FakeEmbeddings(), LineSplitter(), pipelined=pipelined
+            )
+
+            async def run():
+                results = await retriever.searcher.run("manzanos")
+                return await retriever.search_for_documents(results, [0.1, 0.2, 0.3, 0.4], 5)
+
+            documents = asyncio.run(run())
+
+            assert [d.url for d in documents] == ["http://sano.com/b"]
+
+
+class TestCircuitBreaker:
+    # Opens after the threshold, lets one probe through after the cooldown
+    def test_states(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(threshold=2, cooldown=10, clock=clock)
+
+        breaker.failure("a.com")
+        assert breaker.state("a.com") == CLOSED
+        breaker.failure("a.com")
+        assert breaker.state("a.com") == OPEN
+        assert not breaker.allow("a.com")
+
+        clock.now = 10
+        assert breaker.state("a.com") == HALF_OPEN
+        assert breaker.allow("a.com")
+        assert not breaker.allow("a.com")
+
+        breaker.success("a.com")
+        assert breaker.state("a.com") == CLOSED
+
+    # A failed probe keeps the circuit open for another cooldown
+    def test_failed_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(threshold=1, cooldown=10, clock=clock)
+        breaker.failure("a.com")
+        clock.now = 10
+        assert breaker.allow("a.com")
+
+        breaker.failure("a.com")
+
+        assert breaker.state("a.com") == OPEN
+        clock.now = 19
+        assert not breaker.allow("a.com")
+
+
+class TestNegativeCache:
+    # Entries expire after the ttl and the oldest go first beyond the limit
+    def test_expiry_and_limit(self):
+        clock = FakeClock()
+        cache = NegativeCache(ttl=5, max_entries=2, clock=clock)
+        cache.add("a")
+        cache.add("b")
+        cache.add("c")
+
+        assert "a" not in cache
+        assert "b" in cache
+        clock.now = 5
+        assert "c" not in cache
+        assert len(cache) == 1
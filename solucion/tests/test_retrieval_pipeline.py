@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from cache import VectorCache
+from retrieval.pipeline import RetrievalPipeline, StageTimes
+from retrieval.retriever import Retriever
+from util.similarity import TopK
+
+from tests.fakes import FakeEmbeddings, FakeScraper, FakeSearcher, LineSplitter
+
+# Demoras simuladas por página: la última es la más lenta
+PAGES = {
+    "http://example.com/1": (0.01, "manzanos en invierno\npoda de ramas secas\nriego moderado"),
+    "http://example.com/2": (0.02, "plagas del manzano\ncontrol de pulgones"),
+    "http://example.com/3": (0.3, "cosecha de manzanas\nalmacenamiento en frío\nvariedades tardías"),
+}
+DIMENSION = 8
+
+
+def embed(text):
+    rng = np.random.default_rng(sum(map(ord, text)))
+    return rng.standard_normal(DIMENSION).tolist()
+
+
+def make_retriever(pipelined, cache=None):
+    return Retriever(
+        FakeSearcher(PAGES),
+        FakeScraper(PAGES),
+        FakeEmbeddings(embed, delay=0.01),
+        LineSplitter(),
+        cache=cache,
+        pipelined=pipelined,
+    )
+
+
+def retrieve(retriever, k=4):
+    async def run():
+        results = await retriever.searcher.run("manzanos")
+        return await retriever.search_for_documents(results, [embed("manzanos")], k)
+
+    return asyncio.run(run())
+
+
+class TestRetrievalPipeline:
+    # The pipelined mode returns the same documents as the sequential one
+    def test_same_results_as_sequential(self):
+        sequential = retrieve(make_retriever(False))
+        pipelined = retrieve(make_retriever(True))
+
+        assert [(d.text, d.url) for d in pipelined] == [(d.text, d.url) for d in sequential]
+        assert [round(d.similarity, 5) for d in pipelined] == [round(d.similarity, 5) for d in sequential]
+
+    # A failing stage raises the same exception in both modes, not an ExceptionGroup
+    def test_same_error_as_sequential(self):
+        class BrokenEmbeddings(FakeEmbeddings):
+            async def run(self, chunks):
+                raise ConnectionError("embedding API down")
+
+        for pipelined in (False, True):
+            retriever = Retriever(
+                FakeSearcher(PAGES), FakeScraper(PAGES), BrokenEmbeddings(), LineSplitter(), pipelined=pipelined
+            )
+
+            with pytest.raises(ConnectionError, match="embedding API down"):
+                retrieve(retriever)
+
+    # Embedding starts before the slowest page has been downloaded
+    def test_embedding_overlaps_scraping(self):
+        embeddings = FakeEmbeddings(embed, delay=0.01)
+        pipeline = RetrievalPipeline(FakeScraper(PAGES), LineSplitter(), embeddings)
+
+        start = time.perf_counter()
+        _, times, _ = asyncio.run(pipeline.run(list(PAGES), embed("manzanos"), k=3))
+
+        first_embedding = embeddings.calls[0][0] - start
+        assert first_embedding < PAGES["http://example.com/3"][0]
+        assert times.overlap("scrape", "embed") > 0
+
+    # Chunks are embedded in micro-batches no larger than the limit
+    def test_micro_batches(self):
+        embeddings = FakeEmbeddings(embed, delay=0.01)
+        pipeline = RetrievalPipeline(FakeScraper(PAGES), LineSplitter(), embeddings, micro_batch=2)
+
+        asyncio.run(pipeline.run(list(PAGES), embed("manzanos"), k=3))
+
+        sizes = [len(chunks) for _, chunks in embeddings.calls]
+        assert max(sizes) <= 2
+        assert sum(sizes) == 8
+
+    # Embedded chunks are added to the semantic cache as they arrive
+    def test_fills_cache(self):
+        cache = VectorCache(DIMENSION)
+
+        retrieve(make_retriever(True, cache=cache))
+
+        assert len(cache) == 8
+
+
+class TestTopK:
+    # The running top-k keeps the best scores across batches, best first
+    def test_keeps_best(self):
+        best = TopK(3)
+        best.extend(np.array([0.1, 0.5, 0.3]), ["a", "b", "c"])
+        best.extend(np.array([0.4, 0.05, 0.9]), ["d", "e", "f"])
+
+        assert best.items() == [(0.9, "f"), (0.5, "b"), (0.4, "d")]
+
+    # Ties keep the item that arrived first
+    def test_ties(self):
+        best = TopK(1)
+        best.push(0.5, "first")
+        best.push(0.5, "second")
+
+        assert best.items() == [(0.5, "first")]
+
+
+class TestStageTimes:
+    # Overlap is the time both stages were running
+    def test_overlap(self):
+        clock = iter([0.0, 1.0, 3.0, 4.0])
+        times = StageTimes(clock=lambda: next(clock))
+        times.start("scrape")
+        times.start("embed")
+        times.stop("scrape")
+        times.stop("embed")
+
+        assert times.duration("scrape") == 3.0
+        assert times.overlap("scrape", "embed") == 2.0
@@ -0,0 +1,107 @@
+import sys
+import time
+from pathlib import Path
+import pytest
+from unittest.mock import Mock
+
+# Agregar la carpeta src al PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from orchestrator.main import search_google
+from cache import SearchCache
+
+LINKS = [{'title': 'Result 1', 'link': 'http://example.com/1'}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSearchCache:
+    # Queries that only differ in case or spacing share an entry; locales do not
+    def test_key_normalization(self):
+        assert SearchCache.key("  Capital  de FRANCIA ", "ar", "es") == SearchCache.key("capital de francia", "ar", "es")
+        assert SearchCache.key("capital", "ar", "es") != SearchCache.key("capital", "mx", "es")
+
+    # Entries expire after the TTL
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = SearchCache(ttl=60, clock=clock)
+        cache.set("q", LINKS)
+
+        clock.now += 30
+        assert cache.get("q") == LINKS
+        clock.now += 31
+        assert cache.get("q") is None
+        assert len(cache) == 0
+
+    # The least recently used entries are evicted past the size bound
+    def test_lru_bound(self):
+        clock = FakeClock()
+        cache = SearchCache(max_entries=10, memory_entries=2, clock=clock)
+        for i in range(10):
+            clock.now += 1
+            cache.set(f"q{i}", [i])
+        clock.now += 1
+        cache.get("q0")
+        clock.now += 1
+        cache.set("q10", [10])
+
+        assert len(cache) <= 10
+        assert cache.get("q0") == [0]
+        assert cache.get("q1") is None
+
+    # Entries survive a restart
+    def test_persistence(self, tmp_path):
+        path = tmp_path / "search.sqlite3"
+        cache = SearchCache(path)
+        cache.set("q", LINKS)
+        cache.close()
+
+        assert SearchCache(path).get("q") == LINKS
+
+    # Hits and misses are counted, and hits are well under a millisecond
+    def test_stats_and_hit_latency(self):
+        cache = SearchCache()
+        cache.get("q")
+        cache.set("q", LINKS)
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            cache.get("q")
+        elapsed = (time.perf_counter() - start) / 1000
+
+        assert cache.stats.hits == 1000
+        assert cache.stats.misses == 1
+        assert elapsed < 0.001
+
+
+class TestSearchGoogleCache:
+    # A repeated query does not hit the search API
+    def test_repeat_query_skips_network(self, mocker):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'organic': LINKS}
+        mock_post = mocker.patch('requests.Session.post', return_value=mock_response)
+        cache = SearchCache()
+
+        first = search_google("test query", cache)
+        second = search_google("Test  Query", cache)
+
+        assert first == second == LINKS
+        mock_post.assert_called_once()
+
+    # Errors are not cached
+    def test_errors_not_cached(self, mocker):
+        mock_response = Mock()
+        mock_response.status_code = 500
+        mock_response.text = "Server Error"
+        mocker.patch('requests.Session.post', return_value=mock_response)
+        cache = SearchCache()
+
+        assert search_google("test query", cache) == []
+        assert len(cache) == 0
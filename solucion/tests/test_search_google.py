@@ -1,3 +1,4 @@
+import logging
 import sys
 from pathlib import Path
 import pytest
@@ -21,7 +22,7 @@ class TestSearchGoogle:
                 {'title': 'Result 2', 'link': 'http://example.com/2'}
             ]
         }
-        mocker.patch('requests.post', return_value=mock_response)
+        mocker.patch('requests.Session.post', return_value=mock_response)
     
         query = "test query"
         expected_links = [
@@ -37,7 +38,7 @@ class TestSearchGoogle:
         mock_response = Mock()
         mock_response.status_code = 200
         mock_response.json.return_value = {'organic': []}
-        mocker.patch('requests.post', return_value=mock_response)
+        mocker.patch('requests.Session.post', return_value=mock_response)
     
         query = ""
         result = search_google(query)
@@ -57,7 +58,7 @@ class TestSearchGoogle:
                 {'title': 'Result 6', 'link': 'http://example.com/6'}
             ]
         }
-        mocker.patch('requests.post', return_value=mock_response)
+        mocker.patch('requests.Session.post', return_value=mock_response)
 
         query = "test query"
         expected_links = [
@@ -71,19 +72,20 @@ class TestSearchGoogle:
         result = search_google(query)
         assert result == expected_links, "Expected only 5 links to be returned"
 
-    # Manages HTTP errors by printing error messages and returning an empty list
-    def test_manage_http_errors(self, mocker):
+    # Manages HTTP errors by logging error messages and returning an empty list
+    def test_manage_http_errors(self, mocker, caplog):
         mock_response = Mock()
         mock_response.status_code = 400
         mock_response.text = "Bad Request"
-        mocker.patch('requests.post', return_value=mock_response)
+        mocker.patch('requests.Session.post', return_value=mock_response)
     
         query = "error query"
     
-        with patch('builtins.print') as mock_print:
+        with caplog.at_level(logging.WARNING, logger="orchestrator"):
             result = search_google(query)
-            mock_print.assert_called_with("Error en la búsqueda: 400 - Bad Request")
-            assert result == [], "Expected an empty list on HTTP error"
+        assert caplog.messages == ["Error en la búsqueda: 400 - Bad Request"]
+        assert caplog.records[0].levelname == "WARNING"
+        assert result == [], "Expected an empty list on HTTP error"
 
     # Validates the presence and correctness of the API key
     def test_valid_api_key(self, mocker):
@@ -95,7 +97,7 @@ class TestSearchGoogle:
                 {'title': 'Result 2', 'link': 'http://example.com/2'}
             ]
         }
-        mocker.patch('requests.post', return_value=mock_response)
+        mocker.patch('requests.Session.post', return_value=mock_response)
     
         serper_api_key = "valid_key"  # Este valor no se utiliza en la prueba
         query = "test query"
@@ -0,0 +1,133 @@
+import asyncio
+
+from cache import VectorCache
+from retrieval.retriever import Retriever
+
+from tests.fakes import FakeEmbeddings, FakeScraper, FakeSearcher, LineSplitter
+
+PAGES = {"http://example.com/manzanos": (0.0, "poda del manzano en invierno\nriego del manzano")}
+VOCABULARY = ["manzano", "poda", "invierno", "riego", "inflación", "precios"]
+
+
+def embed(text):
+    words = text.lower().split()
+    return [float(words.count(word)) + 0.01 for word in VOCABULARY]
+
+
+def make_retriever(cache):
+    return Retriever(
+        FakeSearcher(PAGES), FakeScraper(PAGES), FakeEmbeddings(embed), LineSplitter(), cache=cache
+    )
+
+
+def collect(retriever, query, **kwargs):
+    async def run():
+        return [event async for event in retriever.get_context(query, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def sources(events):
+    return [event["data"] for event in events if event["event"] == "source"]
+
+
+class TestSemanticCache:
+    # The first query goes to the web and fills the cache
+    def test_first_query_comes_from_web(self):
+        cache = VectorCache(len(VOCABULARY))
+        retriever = make_retriever(cache)
+
+        events = collect(retriever, "poda del manzano", k=2)
+
+        assert sources(events) == ["web"]
+        assert len(cache) == 2
+        assert retriever.searcher.calls == 1
+
+    # A similar follow-up is answered from the cache without searching again
+    def test_similar_query_hits_cache(self):
+        retriever = make_retriever(VectorCache(len(VOCABULARY)))
+        collect(retriever, "poda del manzano", k=1)
+
+        events = collect(retriever, "manzano poda invierno", k=1, cache_treshold=0.8)
+
+        assert sources(events) == ["cache"]
+        assert [e["event"] for e in events] == ["source", "context"]
+        assert "poda del manzano" in events[-1]["data"]
+        assert retriever.searcher.calls == 1
+
+    # An unrelated query scores below the threshold and goes back to the web
+    def test_unrelated_query_misses_cache(self):
+        retriever = make_retriever(VectorCache(len(VOCABULARY)))
+        collect(retriever, "poda del manzano", k=1)
+
+        events = collect(retriever, "inflación y precios", k=1)
+
+        assert sources(events) == ["web"]
+        assert retriever.searcher.calls == 2
+
+    # Without a cache the retriever behaves as before
+    def test_no_cache(self):
+        retriever = make_retriever(None)
+
+        collect(retriever, "poda del manzano", k=1)
+        events = collect(retriever, "poda del manzano", k=1)
+
+        assert sources(events) == ["web"]
+        assert retriever.searcher.calls == 2
+
+
+class TestVectorCache:
+    # Chunks with the same url and text are stored once
+    def test_deduplicates_chunks(self):
+        cache = VectorCache(2)
+        doc = {"text": "a", "url": "u", "vector": [1.0, 0.0]}
+
+        assert cache.add([doc, doc]) == 1
+        assert cache.add([doc]) == 0
+        assert len(cache) == 1
+
+    # Past max_entries the oldest chunks are dropped
+    def test_drops_oldest(self):
+        cache = VectorCache(2, max_entries=2)
+        cache.add([{"text": str(i), "url": "u", "vector": [1.0, float(i)]} for i in range(3)])
+
+        assert len(cache) == 2
+        assert cache.texts == ["1", "2"]
+
+    # Once full, new chunks overwrite the oldest ones in place
+    def test_eviction_wraps_around(self):
+        cache = VectorCache(2, max_entries=3)
+        for i in range(5):
+            cache.add([{"text": str(i), "url": "u", "vector": [1.0, float(i)]}])
+
+        assert cache.texts == ["2", "3", "4"]
+        assert [round(y / x) for x, y in cache.vectors] == [2, 3, 4]
+        assert cache.search([0.0, 1.0], k=1)[0].text == "4"
+        assert cache.add([{"text": "0", "url": "u", "vector": [1.0, 0.0]}]) == 1
+        assert cache.texts == ["3", "4", "0"]
+
+    # Search returns the best matches first with cosine similarity
+    def test_search_orders_by_similarity(self):
+        cache = VectorCache(2)
+        cache.add([
+            {"text": "x", "url": "u", "vector": [1.0, 0.0]},
+            {"text": "y", "url": "u", "vector": [0.0, 3.0]},
+            {"text": "xy", "url": "u", "vector": [1.0, 1.0]},
+        ])
+
+        results = cache.search([0.0, 1.0], k=2)
+
+        assert [doc.text for doc in results] == ["y", "xy"]
+        assert abs(results[0].similarity - 1.0) < 1e-6
+
+    # The cache survives a save and reload
+    def test_save_and_load(self, tmp_path):
+        cache = VectorCache(2, path=tmp_path / "vectors")
+        cache.add([{"text": "a", "url": "u", "vector": [1.0, 0.0]}])
+        cache.save()
+
+        reloaded = VectorCache(2, path=tmp_path / "vectors")
+
+        assert reloaded.texts == ["a"]
+        assert reloaded.search([1.0, 0.0], k=1)[0].text == "a"
+        assert reloaded.add([{"text": "a", "url": "u", "vector": [1.0, 0.0]}]) == 0
@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+
+from util import similarity
+
+from tests.fakes import fake_retriever
+
+
+def reference_scores(query, vectors):
+    query = np.asarray(query, dtype=np.float64)
+    vectors = np.asarray(vectors, dtype=np.float64)
+    return vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+
+
+class TestSimilarity:
+    # Scores match the textbook cosine similarity
+    def test_cosine_scores(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.standard_normal((50, 8))
+        query = rng.standard_normal(8)
+
+        scores = similarity.cosine_scores(query, similarity.as_matrix(vectors))
+
+        assert np.allclose(scores, reference_scores(query, vectors), atol=1e-5)
+
+    # top_k returns the best indices in descending score order
+    def test_top_k(self):
+        scores = np.array([0.1, 0.9, 0.4, 0.7, 0.2], dtype=np.float32)
+
+        assert similarity.top_k(scores, 3).tolist() == [1, 3, 2]
+        assert similarity.top_k(scores, 10).tolist() == [1, 3, 2, 4, 0]
+        assert similarity.top_k(scores, 0).tolist() == []
+
+    # Zero vectors do not produce NaN scores
+    def test_zero_vector(self):
+        scores = similarity.cosine_scores([1.0, 0.0], similarity.as_matrix([[0.0, 0.0], [2.0, 0.0]]))
+
+        assert scores.tolist() == [0.0, 1.0]
+
+
+class TestGetMostSimilar:
+    # The vectorized engine returns the same documents as a brute-force ranking
+    def test_matches_reference(self):
+        rng = np.random.default_rng(2)
+        vectors = rng.standard_normal((200, 16)).tolist()
+        query = rng.standard_normal(16).tolist()
+        data = [{"text": str(i), "url": "u", "vector": v} for i, v in enumerate(vectors)]
+        retriever = fake_retriever()
+
+        documents = asyncio.run(retriever.get_most_similar([query], data, k=5))
+
+        expected = np.argsort(-reference_scores(query, vectors))[:5]
+        assert [int(doc.text) for doc in documents] == expected.tolist()
+        assert np.allclose(documents[0].vector, vectors[expected[0]])
+        assert abs(documents[0].similarity - reference_scores(query, vectors)[expected[0]]) < 1e-5
+
+    # No documents means no results
+    def test_empty(self):
+        retriever = fake_retriever()
+
+        assert asyncio.run(retriever.get_most_similar([1.0], [], k=5)) == []
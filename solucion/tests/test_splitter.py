@@ -0,0 +1,91 @@
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from extraction import get_engine
+from retrieval.splitter import SEPARATORS, LangChainSplitter, NativeSplitter
+from util.tokens import cached_count_tokens
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "html"
+
+
+def fixture_texts():
+    engine = get_engine()
+    return [engine.text(path.read_text(encoding="utf-8")) for path in sorted(FIXTURES.glob("*.html"))]
+
+
+def langchain_chunks(text, chunk_size, chunk_overlap, length_function=len):
+    return RecursiveCharacterTextSplitter(
+        separators=SEPARATORS,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+    ).split_text(text)
+
+
+class TestNativeSplitter:
+    # Chunk boundaries match LangChain on real pages, measured in characters
+    @pytest.mark.parametrize("chunk_size,chunk_overlap", [(50, 0), (200, 40), (500, 50), (1000, 1000)])
+    def test_matches_langchain_chars(self, chunk_size, chunk_overlap):
+        splitter = NativeSplitter(chunk_size, chunk_overlap)
+
+        for text in fixture_texts():
+            assert splitter.split_text(text) == langchain_chunks(text, chunk_size, chunk_overlap)
+
+    # Chunk boundaries also match when lengths are tokens
+    @pytest.mark.parametrize("chunk_size,chunk_overlap", [(20, 5), (120, 20)])
+    def test_matches_langchain_tokens(self, chunk_size, chunk_overlap):
+        splitter = NativeSplitter(chunk_size, chunk_overlap, cached_count_tokens)
+
+        for text in fixture_texts():
+            expected = langchain_chunks(text, chunk_size, chunk_overlap, cached_count_tokens)
+            assert splitter.split_text(text) == expected
+
+    # Separators fall back from paragraphs to lines, words and characters
+    def test_separator_fallback(self):
+        text = "uno dos\ntres\n\n" + "x" * 12 + "\n\ncuatro"
+
+        assert NativeSplitter(5, 0).split_text(text) == langchain_chunks(text, 5, 0)
+
+    # Empty and whitespace-only pages produce no chunks
+    def test_empty(self):
+        assert NativeSplitter(10, 2).split_text("") == []
+        assert NativeSplitter(10, 2).split_text(" \n\n \n") == []
+
+    # Overlap larger than the chunk size is rejected like in LangChain
+    def test_invalid_overlap(self):
+        with pytest.raises(ValueError):
+            NativeSplitter(10, 20)
+
+    # Large pages are split off the event loop
+    def test_large_pages_use_executor(self):
+        threads = set()
+
+        def length(text):
+            threads.add(threading.get_ident())
+            return len(text)
+
+        async def split(text):
+            return await NativeSplitter(50, 0, length, offload_chars=100).split(text)
+
+        asyncio.run(split("palabra " * 10))
+        assert threads == {threading.get_ident()}
+
+        threads.clear()
+        asyncio.run(split("palabra " * 100))
+        assert threading.get_ident() not in threads
+
+
+class TestLangChainSplitter:
+    # The LangChain splitter is built once and reused for every page
+    def test_reuses_splitter(self, mocker):
+        splitter = LangChainSplitter(100, 10, len)
+        built = mocker.patch("langchain.text_splitter.RecursiveCharacterTextSplitter")
+
+        asyncio.run(splitter.split("a b c"))
+        asyncio.run(splitter.split("d e f"))
+
+        built.assert_not_called()
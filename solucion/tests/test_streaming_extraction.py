@@ -0,0 +1,88 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import MagicMock
+from bs4 import BeautifulSoup
+
+# Agregar la carpeta src al PYTHONPATH
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from orchestrator.main import extract_text_from_url
+from extraction import StreamingExtractor, is_html
+
+HTML = (
+    "<html><head><title>Título</title><style>p {color: red}</style></head>"
+    "<body><p>Primer &amp; párrafo</p><script>var x = 1;</script>"
+    "<div><p>Segundo <b>párrafo</b></p></div></body></html>"
+)
+
+
+def streamed_response(chunks, content_type="text/html; charset=utf-8"):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.headers = {"Content-Type": content_type}
+    response.iter_content.return_value = iter(chunks)
+    return response
+
+
+def split_bytes(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestStreamingExtractor:
+    # Text matches BeautifulSoup even when chunks split tags and multibyte characters
+    def test_matches_beautifulsoup(self):
+        extractor = StreamingExtractor()
+        for chunk in split_bytes(HTML.encode("utf-8"), 7):
+            extractor.feed(chunk)
+        extractor.close()
+
+        soup = BeautifulSoup(HTML, "html.parser")
+        assert extractor.paragraphs == [p.get_text() for p in soup.find_all("p")]
+        assert extractor.strings == list(soup.stripped_strings)
+
+    # Feeding stops once the byte budget is reached
+    def test_byte_budget(self):
+        extractor = StreamingExtractor(max_bytes=20)
+        assert extractor.feed(b"<p>" + b"a" * 10) is True
+        assert extractor.feed(b"b" * 10 + b"</p>") is False
+        assert extractor.truncated
+
+    # Only HTML content types are parsed
+    def test_is_html(self):
+        assert is_html("text/html; charset=utf-8")
+        assert is_html(None)
+        assert not is_html("application/pdf")
+
+
+class TestExtractTextFromUrlStreaming:
+    # Paragraphs are extracted from a streamed body
+    def test_streaming_extraction(self, mocker):
+        response = streamed_response(split_bytes(HTML.encode("utf-8"), 16))
+        mocker.patch('requests.Session.get', return_value=response)
+
+        result = extract_text_from_url("http://example.com", streaming=True)
+
+        assert result == "Primer & párrafo\nSegundo párrafo"
+
+    # The download stops at the byte budget instead of reading the whole page
+    def test_stops_at_budget(self, mocker):
+        chunks = iter([b"<p>" + b"x" * 1024 + b"</p>"] * 10_000)
+        response = streamed_response(chunks)
+        mocker.patch('requests.Session.get', return_value=response)
+        mocker.patch('orchestrator.main.EXTRACTION_MAX_BYTES', 10 * 1024)
+
+        result = extract_text_from_url("http://example.com", streaming=True)
+
+        assert 0 < len(result) <= 11 * 1024
+        assert len(list(chunks)) > 9_000
+
+    # Non HTML responses are skipped before reading the body
+    def test_skips_non_html(self, mocker):
+        response = streamed_response([b"%PDF-1.4"], content_type="application/pdf")
+        mocker.patch('requests.Session.get', return_value=response)
+
+        result = extract_text_from_url("http://example.com/file.pdf", streaming=True)
+
+        assert result == "No se pudo extraer contenido relevante."
+        response.iter_content.assert_not_called()
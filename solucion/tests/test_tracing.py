@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+from llm.streaming import TokenStream
+from orchestrator.main import extract_text_from_url
+from retrieval.retriever import Retriever
+from util.tracing import Tracer, tracer
+
+from tests.fakes import FakeEmbeddings, FakeScraper, FakeSearcher, LineSplitter
+
+PAGES = {
+    "http://example.com/rapida": (0.01, "poda de manzanos\nriego en verano"),
+    "http://example.com/media": (0.02, "plagas del manzano"),
+}
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestTracer:
+    # Spans opened inside another become its children, also inside new tasks
+    def test_nesting_across_tasks(self, tmp_path):
+        traces = Tracer(jsonl_path=tmp_path / "trace.jsonl")
+
+        async def fetch(url):
+            with traces.span("fetch", url=url):
+                await asyncio.sleep(0)
+
+        async def turn():
+            with traces.span("turn"):
+                await asyncio.gather(*(asyncio.create_task(fetch(url)) for url in ("a", "b")))
+
+        asyncio.run(turn())
+
+        spans = read_spans(tmp_path / "trace.jsonl")
+        root = next(span for span in spans if span["name"] == "turn")
+        fetches = [span for span in spans if span["name"] == "fetch"]
+        assert root["parent_id"] is None
+        assert [span["parent_id"] for span in fetches] == [root["span_id"]] * 2
+        assert {span["trace_id"] for span in spans} == {root["trace_id"]}
+        assert sorted(span["attributes"]["url"] for span in fetches) == ["a", "b"]
+
+    # Every turn is written once it ends, and errors are recorded on the span
+    def test_errors_and_separate_traces(self, tmp_path):
+        traces = Tracer(jsonl_path=tmp_path / "trace.jsonl")
+        with traces.span("turn"):
+            pass
+        with pytest.raises(ValueError):
+            with traces.span("turn"):
+                raise ValueError("roto")
+
+        first, second = read_spans(tmp_path / "trace.jsonl")
+        assert first["trace_id"] != second["trace_id"]
+        assert second["attributes"] == {"error": "ValueError"}
+
+    # Histograms are exported as cumulative Prometheus buckets
+    def test_prometheus(self):
+        traces = Tracer()
+        for seconds in (0.01, 0.02, 0.5):
+            traces.record("search", seconds)
+
+        text = traces.prometheus()
+
+        assert '# TYPE orchestrator_span_seconds histogram' in text
+        assert 'orchestrator_span_seconds_bucket{span="search",le="0.016"} 1' in text
+        assert 'orchestrator_span_seconds_bucket{span="search",le="0.032"} 2' in text
+        assert 'orchestrator_span_seconds_bucket{span="search",le="+Inf"} 3' in text
+        assert 'orchestrator_span_seconds_count{span="search"} 3' in text
+        assert 'orchestrator_span_seconds_sum{span="search"} 0.530000' in text
+        assert traces.snapshot()["search"]["count"] == 3
+
+
+class TestInstrumentation:
+    @pytest.fixture
+    def trace_file(self, tmp_path, mocker):
+        path = tmp_path / "trace.jsonl"
+        mocker.patch.object(tracer, "jsonl_path", path)
+        return path
+
+    # A retriever turn is one trace with a span per stage and per page
+    @pytest.mark.parametrize("pipelined", [False, True])
+    def test_retriever_turn(self, trace_file, pipelined):
+        retriever = Retriever(
+            FakeSearcher(PAGES), FakeScraper(PAGES), FakeEmbeddings(), LineSplitter(), pipelined=pipelined
+        )
+
+        async def run():
+            return [event async for event in retriever.get_context("manzanos")]
+
+        asyncio.run(run())
+
+        spans = read_spans(trace_file)
+        by_id = {span["span_id"]: span for span in spans}
+        root = next(span for span in spans if span["parent_id"] is None)
+        assert root["name"] == "retrieval"
+        assert root["attributes"] == {"query": "manzanos", "source": "web", "dropped": 0}
+        names = [span["name"] for span in spans]
+        assert names.count("fetch") == len(PAGES)
+        assert {"query_embedding", "search", "split", "embed"} <= set(names)
+        for span in spans:
+            if span["parent_id"] is not None:
+                assert span["duration"] <= by_id[span["parent_id"]]["duration"] + 1e-6
+
+    # Streaming an answer records the time to the first token and the total
+    def test_llm_stream(self, trace_file):
+        with tracer.span("answer"):
+            list(TokenStream(iter(["Hola", " mundo"]), started=0.0))
+
+        names = [span["name"] for span in read_spans(trace_file)]
+        assert names == ["llm_first_token", "llm", "answer"]
+
+    # Parsing a page is its own span inside the turn, also when the page is streamed
+    @pytest.mark.parametrize("streaming", [False, True])
+    def test_parse_span(self, trace_file, mocker, streaming):
+        html = "<html><body><p>Poda de manzanos</p></body></html>"
+        response = mocker.MagicMock(text=html, headers={"Content-Type": "text/html"})
+        response.__enter__.return_value = response
+        response.iter_content.return_value = iter([html.encode("utf-8")])
+        mocker.patch("requests.Session.get", return_value=response)
+
+        with tracer.span("turn"):
+            assert extract_text_from_url("http://example.com", streaming=streaming) == "Poda de manzanos"
+
+        spans = read_spans(trace_file)
+        assert [span["name"] for span in spans] == ["parse", "turn"]
+        assert spans[0]["parent_id"] == spans[1]["span_id"]